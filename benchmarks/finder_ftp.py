@@ -0,0 +1,94 @@
+"""
+Benchmark of the Finder ftp walker: one ftp connection against a pool of connections.
+
+A tree of directories is generated in a temporary folder and served by a local pyftpdlib server 
+(pip install pyftpdlib). A latency may be added to each ftp command to emulate a remote server.
+
+usage: python -m benchmarks.finder_ftp [--dirs 10000] [--connections 8] [--latency 0.005]
+"""
+import argparse, logging, os, shutil, tempfile, threading, time
+from ftplib import FTP
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.handlers import FTPHandler
+from pyftpdlib.servers import ThreadedFTPServer
+from pycroaktools.files import Finder
+
+
+def generateTree(folder, dirs, dirsPerFolder=10):
+    """creates dirs folders, each one with one file, dirsPerFolder subfolders per folder"""
+    folders = [folder]
+    created = 0
+    while created < dirs:
+        current = folders.pop(0)
+        os.makedirs(current, exist_ok=True)
+        open(os.path.join(current, 'data.csv'), 'w').close()
+        created += 1
+        folders += [os.path.join(current, 'folder{}'.format(index)) for index in range(dirsPerFolder)]
+
+
+def startServer(folder, latency):
+    authorizer = DummyAuthorizer()
+    authorizer.add_anonymous(folder)
+
+    class Handler(FTPHandler):
+        def pre_process_command(self, line, cmd, arg):
+            time.sleep(latency)
+            return super().pre_process_command(line, cmd, arg)
+
+    Handler.authorizer = authorizer
+    server = ThreadedFTPServer(('127.0.0.1', 0), Handler)
+    server.max_cons = 256
+    thread = threading.Thread(target=server.serve_forever, kwargs={'timeout': 0.1})
+    thread.start()
+    return server, thread
+
+
+def timeSearch(port, connections):
+    def connect():
+        connection = FTP()
+        connection.connect('127.0.0.1', port)
+        connection.login()
+        return connection
+
+    settings = {'parent': '/', 'regex': r'\.csv$', 'stopWhenFound': False,
+                'ftpFactory': connect, 'ftpConnections': connections}
+    finder = Finder(settings)
+    start = time.perf_counter()
+    results = finder.findFilesInFtp()
+    elapsed = time.perf_counter() - start
+    finder._getFtpLister().close()
+    return elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dirs', type=int, default=10000)
+    parser.add_argument('--connections', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.005, help='seconds added to each ftp command')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    folder = tempfile.mkdtemp()
+    server, thread = None, None
+    try:
+        print('generating {} folders in {}...'.format(args.dirs, folder))
+        generateTree(folder, args.dirs)
+        server, thread = startServer(folder, args.latency)
+        port = server.socket.getsockname()[1]
+
+        singleTime, singleResults = timeSearch(port, 1)
+        print('1 connection: {:.2f}s, {} files found'.format(singleTime, len(singleResults)))
+        poolTime, poolResults = timeSearch(port, args.connections)
+        print('{} connections: {:.2f}s, {} files found'.format(args.connections, poolTime, len(poolResults)))
+
+        assert singleResults == poolResults
+        print('speedup: x{:.2f}'.format(singleTime / poolTime))
+    finally:
+        if server:
+            server.close_all()
+            thread.join()
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Micro-benchmark of the Finder name matching: re.search against the Matcher fast paths.
+
+A listing of generated file names is matched against common patterns, with both methods,
+and results are checked to be identical.
+
+usage: python -m benchmarks.finder_matcher [--names 1000000]
+"""
+import argparse, random, re, time
+from pycroaktools.files.matcher import Matcher
+
+PATTERNS = [r'.*\.csv$', r'\.(csv|txt)$', r'^report', r'^config\.yml$', r'data', r'^report_\d+\.csv$']
+
+
+def generateNames(count):
+    random.seed(0)
+    stems = ['report_{}', 'data{}', 'config', 'image{}', 'notes_{}', 'REPORT_{}']
+    extensions = ['.csv', '.txt', '.yml', '.png', '.CSV', '.md']
+    return [random.choice(stems).format(index) + random.choice(extensions) for index in range(count)]
+
+
+def timeRegex(compiled, names):
+    start = time.perf_counter()
+    search = compiled.search
+    results = [name for name in names if search(name)]
+    return time.perf_counter() - start, results
+
+
+def timeMatcher(matcher, names):
+    start = time.perf_counter()
+    results = matcher.filter(names)
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--names', type=int, default=1000000)
+    args = parser.parse_args()
+
+    names = generateNames(args.names)
+    for caseSensitive in [True, False]:
+        for pattern in PATTERNS:
+            compiled = re.compile(pattern, 0 if caseSensitive else re.IGNORECASE)
+            matcher = Matcher(pattern, caseSensitive)
+            regexTime, regexResults = timeRegex(compiled, names)
+            matcherTime, matcherResults = timeMatcher(matcher, names)
+            assert regexResults == matcherResults
+            print('{:<22} case sensitive={!s:<5} {:<8}: re {:.3f}s, matcher {:.3f}s, speedup x{:.2f}'.format(
+                pattern, caseSensitive, matcher.kind, regexTime, matcherTime, regexTime / matcherTime))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark of the Finder walkers: os.walk (default) against the threaded os.scandir walker.
+
+A tree of files is generated in a temporary folder (or in the given folder if it does not exist yet), then
+the same search is played with both walkers.
+
+usage: python -m benchmarks.finder_walk [--files 1000000] [--threads 8] [--folder path]
+"""
+import argparse, os, shutil, tempfile, time
+from pycroaktools.files import Finder
+
+
+def generateTree(folder, files, filesPerFolder=1000, foldersPerFolder=10):
+    """creates a tree of empty files: folders contain filesPerFolder files and foldersPerFolder subfolders"""
+    folders = [folder]
+    created = 0
+    while created < files:
+        current = folders.pop(0)
+        os.makedirs(current, exist_ok=True)
+        for index in range(min(filesPerFolder, files - created)):
+            extension = '.csv' if index % 100 == 0 else '.txt'
+            open(os.path.join(current, 'file{}{}'.format(index, extension)), 'w').close()
+        created += filesPerFolder
+        folders += [os.path.join(current, 'folder{}'.format(index)) for index in range(foldersPerFolder)]
+
+
+def timeSearch(settings):
+    start = time.perf_counter()
+    results = Finder(settings).findFiles()
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=1000000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--folder', default=None, help='folder of the tree, kept after the benchmark')
+    args = parser.parse_args()
+
+    folder = args.folder if args.folder else tempfile.mkdtemp()
+    try:
+        if not os.path.exists(os.path.join(folder, 'file0.csv')):
+            print('generating {} files in {}...'.format(args.files, folder))
+            generateTree(folder, args.files)
+
+        settings = {'parent': folder, 'regex': r'\.csv$', 'stopWhenFound': False}
+        walkTime, walkResults = timeSearch(settings)
+        print('os.walk: {:.2f}s, {} files found'.format(walkTime, len(walkResults)))
+
+        settings['threads'] = args.threads
+        scandirTime, scandirResults = timeSearch(settings)
+        print('scandir with {} threads: {:.2f}s, {} files found'.format(args.threads, scandirTime, len(scandirResults)))
+
+        assert sorted(walkResults) == sorted(scandirResults)
+        print('speedup: x{:.2f}'.format(walkTime / scandirTime))
+    finally:
+        if not args.folder:
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
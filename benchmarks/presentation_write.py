@@ -0,0 +1,79 @@
+"""
+Benchmark of the html writing of many presentations: the former writer (template parts read for each presentation,
+sections built by string concatenation and written directly in the html file) against HtmlWriter
+(template parts read once, sections joined from fragments, buffered write in a temporary file then renamed),
+plain, minified and compressed.
+
+usage: python -m benchmarks.presentation_write [--presentations 2000] [--slides 40]
+"""
+import argparse, logging, os, shutil, tempfile, time
+from pycroaktools.presentation import Presentation, Slides, Slide, HtmlWriter
+
+
+class LegacyPresentation(Presentation):
+    """replica of the former html writing"""
+
+    def writePresentation(self, presName, slides, slideIds=None, outputFolder=None, links=None, version=0.0):
+        file = os.path.join(outputFolder, presName)
+        with open(file, mode='w') as output:
+            for part in ('firstPart.txt', 'secondPart.txt'):
+                if part == 'secondPart.txt':
+                    for slideId in slideIds:
+                        output.write(self._concatenateSection(slides.getSlideContents(slideId, version)))
+                with open(self.resource_path(os.path.join('assets', part))) as template:
+                    output.write(template.read())
+        return file
+
+    def _concatenateSection(self, slideContents):
+        content = '<section>\n'
+        for slideContent in slideContents:
+            content += '\n<section data-markdown>\n<textarea data-template>'
+            content += slideContent
+            content += '\n</textarea>'
+            content += '</section>\n'
+        content += '\n</section>'
+        return content
+
+
+def build(count):
+    slides = Slides()
+    for slideId in range(count):
+        for part in range(2):
+            slide = Slide(slideId, 'slide {}'.format(slideId), part)
+            slide.setContent('# slide {} part {}\n'.format(slideId, part) + '- some bullet point text\n' * 10)
+            slides.addSlide(slide)
+    return slides
+
+
+def run(presentation, slides, folder, presentations, size):
+    start = time.perf_counter()
+    for index in range(presentations):
+        slideIds = [(index + offset) % len(slides.slides) for offset in range(size)]
+        file = presentation.writePresentation('presentation{}.html'.format(index), slides, slideIds, folder)
+    total = sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
+    return time.perf_counter() - start, total, file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--presentations', type=int, default=2000)
+    parser.add_argument('--slides', type=int, default=40)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    slides = build(200)
+    writers = [('former writer', LegacyPresentation()),
+               ('HtmlWriter', Presentation()),
+               ('HtmlWriter minified', Presentation(writer=HtmlWriter(minify=True))),
+               ('HtmlWriter compressed', Presentation(writer=HtmlWriter(compress=True, compressLevel=1)))]
+    for name, presentation in writers:
+        folder = tempfile.mkdtemp()
+        try:
+            seconds, size, _ = run(presentation, slides, folder, args.presentations, args.slides)
+            print('{}: {:.2f}s, {:.1f}MB'.format(name, seconds, size / 1e6))
+        finally:
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark of the slide catalog: the former catalog (files listed with Path.rglob, each file read to parse its header,
+then read again to get its content) against Slides.catalog (each file read once by a pool of threads, its body kept).
+
+A folder of markdown slides is generated, half of them with a header, half of them named id_title_part_version.
+Both catalogs are built, then the content of every slide is retrieved as for a presentation.
+The catalog is then built twice with a manifest: the first run records the folder, the second one only checks
+the modification time and size of each file.
+Use --folder to run it on an existing folder (e.g. a network share) instead.
+
+usage: python -m benchmarks.slides_catalog [--slides 10000] [--workers 16] [--folder FOLDER]
+"""
+import argparse, logging, os, shutil, tempfile, time
+from pathlib import Path
+from pycroaktools.presentation import Slides, SlideGenerator
+
+
+def generate(folder, count):
+    for slideId in range(count):
+        subFolder = os.path.join(folder, 'chapter{}'.format(slideId // 500))
+        os.makedirs(subFolder, exist_ok=True)
+        body = '# slide {}\n'.format(slideId) + 'Lorem ipsum dolor sit amet, consectetur adipiscing elit.\n' * 20
+        if slideId % 2:
+            with open(os.path.join(subFolder, 'slide{}.md'.format(slideId)), 'w') as file:
+                file.write('---\ntitle: slide {0}\nid: {0}\nversion: 0.5\n---\n{1}'.format(slideId, body))
+        else:
+            with open(os.path.join(subFolder, '{}_slide {}_0_0.md'.format(slideId, slideId)), 'w') as file:
+                file.write(body)
+
+
+def legacyCatalog(folder):
+    """replica of the former Slides.catalog"""
+    slides = Slides()
+    for file in (x for x in Path(folder).rglob('*.*') if x.is_file()):
+        slide = SlideGenerator().fromHeader(file)
+        if not slide:
+            slide = SlideGenerator().fromFilename(file)
+        if slide:
+            slides.addSlide(slide)
+    return slides
+
+
+def contents(slides):
+    return sum(len(slide.getContent()) for versions in slides.slides.values()
+               for parts in versions.values() for slide in parts.values())
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--slides', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--folder')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    folder = args.folder or tempfile.mkdtemp()
+    if not args.folder:
+        generate(folder, args.slides)
+    try:
+        legacyTime, legacy = timed(legacyCatalog, folder)
+        legacyRender, legacySize = timed(contents, legacy)
+        print('former catalog: {:.2f}s + contents {:.2f}s'.format(legacyTime, legacyRender))
+        slides = Slides()
+        catalogTime, _ = timed(slides.catalog, folder, False, args.workers)
+        render, size = timed(contents, slides)
+        print('single read catalog ({} threads): {:.2f}s + contents {:.2f}s'.format(args.workers, catalogTime, render))
+        assert size == legacySize
+        manifest = os.path.join(tempfile.mkdtemp(), 'slides.json')
+        try:
+            coldTime, _ = timed(Slides().catalog, folder, False, args.workers, manifest)
+            warm = Slides()
+            warmTime, _ = timed(warm.catalog, folder, False, args.workers, manifest)
+            print('catalog with manifest: first run {:.2f}s, next run {:.2f}s'.format(coldTime, warmTime))
+            assert contents(warm) == legacySize
+        finally:
+            shutil.rmtree(os.path.dirname(manifest))
+    finally:
+        if not args.folder:
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
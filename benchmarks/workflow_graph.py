@@ -0,0 +1,133 @@
+"""
+Benchmark of the Workflow graph storage: the former object graph (one Step object with two dictionaries per step)
+against the compact CSR Graph behind the Workflow API.
+
+A layered workflow definition is generated (each step points to 1 to 3 steps of the next layer), then both storages
+are built from it and traversed (next and previous steps of every step), measuring time and memory with tracemalloc.
+The graph is traversed through the Step API and through node indexes, as the Workflow methods do.
+The first traversal through the Step API creates the Step objects, the next ones reuse them.
+
+usage: python -m benchmarks.workflow_graph [--steps 100000] [--width 100]
+"""
+import argparse, random, time, tracemalloc
+from pycroaktools.workflow.graph import Graph
+from pycroaktools.workflow.step import Step
+
+
+class LegacyStep:
+    """replica of the former Step class, storing its links in dictionaries"""
+
+    def __init__(self, stepId, title=None):
+        self.stepId = stepId
+        self.nexts = dict()
+        self.previouses = dict()
+        self.title = title if title else 'step '+str(stepId)
+
+    def getNexts(self):
+        return list(self.nexts.values())
+
+    def getPreviouses(self):
+        return list(self.previouses.values())
+
+    def addNext(self, nextStep):
+        if nextStep.stepId not in self.nexts:
+            self.nexts[nextStep.stepId] = nextStep
+        if self.stepId not in nextStep.previouses:
+            nextStep.previouses[self.stepId] = self
+
+
+def generate(steps, width):
+    """returns the step ids and the list of (stepId, nextId) links of a layered workflow"""
+    random.seed(0)
+    ids = list(range(1, steps + 1))
+    links = []
+    for stepId in ids:
+        layerEnd = ((stepId - 1) // width + 1) * width
+        if layerEnd + width > steps:
+            continue
+        links += [(stepId, nextId) for nextId in random.sample(range(layerEnd + 1, layerEnd + width + 1), random.randint(1, 3))]
+    return ids, links
+
+
+def buildLegacy(ids, links):
+    steps = {stepId: LegacyStep(stepId) for stepId in ids}
+    for stepId, nextId in links:
+        steps[stepId].addNext(steps[nextId])
+    return steps
+
+
+def traverseLegacy(steps):
+    return sum(len(step.getNexts()) + len(step.getPreviouses()) for step in steps.values())
+
+
+def buildGraph(ids, links):
+    indexes = {stepId: index for index, stepId in enumerate(ids)}
+    return Graph(ids, ['step '+str(stepId) for stepId in ids],
+                 [indexes[stepId] for stepId, _ in links], [indexes[nextId] for _, nextId in links])
+
+
+def getSteps(graph):
+    return [Step.view(graph, index) for index in range(len(graph))]
+
+
+def traverseSteps(steps):
+    return sum(len(step.getNexts()) + len(step.getPreviouses()) for step in steps)
+
+
+def traverseIndexes(graph):
+    return sum(len(graph.successors(index)) + len(graph.predecessors(index)) for index in range(len(graph)))
+
+
+def best(function, *args, repeat=5):
+    """returns the shortest duration of the function, in seconds"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def measure(function, *args):
+    """returns the function result, its duration and the memory it allocated and kept, in MB"""
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = function(*args)
+    kept = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, kept / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--steps', type=int, default=100000)
+    parser.add_argument('--width', type=int, default=100)
+    args = parser.parse_args()
+
+    ids, links = generate(args.steps, args.width)
+    print('{} steps, {} links'.format(len(ids), len(links)))
+    # the legacy objects are built last, so that they do not slow down the garbage collections of the first traversal
+    graph, graphBuild, graphMemory = measure(buildGraph, ids, links)
+    start = time.perf_counter()
+    steps = getSteps(graph)
+    stepCount = traverseSteps(steps)
+    firstTraversal = time.perf_counter() - start
+    tracemalloc.start()
+    traverseSteps(getSteps(buildGraph(ids, links)))
+    stepMemory = tracemalloc.get_traced_memory()[0] / 2 ** 20
+    tracemalloc.stop()
+    legacy, legacyBuild, legacyMemory = measure(buildLegacy, ids, links)
+    print('build: legacy {:.2f}s {:.1f}MB kept, graph {:.2f}s {:.1f}MB kept'.format(
+        legacyBuild, legacyMemory, graphBuild, graphMemory))
+    print('first traversal through steps, creating the Step objects: {:.2f}s, {:.1f}MB more kept'.format(
+        firstTraversal, stepMemory - graphMemory))
+    legacyCount, indexCount = traverseLegacy(legacy), traverseIndexes(graph)
+    assert legacyCount == stepCount == indexCount
+    print('traversal (best of 5): legacy {:.2f}s, graph through steps {:.2f}s, graph through indexes {:.2f}s'.format(
+        best(traverseLegacy, legacy), best(traverseSteps, steps), best(traverseIndexes, graph)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark of the Workflow loading: the former row by row build against the column operations build,
+and the csv path (read_csv + build) against the binary file of Workflow.save, read or memory mapped by Workflow.load.
+
+A layered workflow csv file is generated, read with pandas, then given to both builds.
+The workflow is then saved and loaded back.
+
+usage: python -m benchmarks.workflow_load [--steps 200000] [--width 100]
+(--steps 500000 gives about 1M links)
+"""
+import argparse, os, tempfile, time
+from pandas import DataFrame, read_csv
+from pycroaktools.workflow import Workflow
+from benchmarks.workflow_graph import LegacyStep, generate
+
+
+def legacyBuild(workflow: DataFrame):
+    """replica of the former Workflow._build, without its error handling"""
+    steps = dict()
+    for index, stepId in enumerate(workflow.stepId):
+        stepId = int(stepId)
+        steps[stepId] = LegacyStep(stepId, workflow.title[index])
+    for index, stepId in enumerate(workflow.stepId):
+        stepId = int(stepId)
+        for nextStep in str(workflow.nexts[index]).split('-'):
+            try:
+                nextStep = int(float(nextStep))
+            except ValueError:
+                continue
+            steps[stepId].addNext(steps[nextStep])
+    return steps
+
+
+def writeCsv(file, steps, width):
+    ids, links = generate(steps, width)
+    nexts = {stepId: [] for stepId in ids}
+    for stepId, nextId in links:
+        nexts[stepId].append(str(nextId))
+    DataFrame({'stepId': ids, 'title': ['step '+str(stepId) for stepId in ids],
+               'nexts': ['-'.join(nexts[stepId]) for stepId in ids]}).to_csv(file, index=False)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--steps', type=int, default=200000)
+    parser.add_argument('--width', type=int, default=100)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    file = os.path.join(folder, 'workflow.csv')
+    writeCsv(file, args.steps, args.width)
+    readTime, data = timed(read_csv, file)
+    print('read_csv: {:.2f}s'.format(readTime))
+    legacyTime, legacy = timed(legacyBuild, data)
+    print('row by row build: {:.2f}s'.format(legacyTime))
+    buildTime, workflow = timed(Workflow, data)
+    print('column build: {:.2f}s, csv path: {:.2f}s'.format(buildTime, readTime + buildTime))
+    assert len(legacy) == len(workflow.steps)
+
+    binary = os.path.join(folder, 'workflow.bin')
+    saveTime, _ = timed(workflow.save, binary)
+    print('save: {:.2f}s, {:.1f}MB (csv {:.1f}MB)'.format(
+        saveTime, os.path.getsize(binary) / 2 ** 20, os.path.getsize(file) / 2 ** 20))
+    readTime, read = timed(Workflow.load, binary, False)
+    mapTime, mapped = timed(Workflow.load, binary)
+    print('load: read {:.3f}s, memory mapped {:.3f}s'.format(readTime, mapTime))
+    countTime, count = timed(mapped.countPaths)
+    assert count == workflow.countPaths() == read.countPaths()
+    print('countPaths on the memory mapped workflow: {:.2f}s'.format(countTime))
+    del read, mapped
+    for name in (file, binary):
+        os.remove(name)
+    os.rmdir(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,7 +10,7 @@ class DataFiles:
     The way resource files are retrieved is based on regex. It uses Finder class to do so.
     """
 
-    def __init__(self, parent: str, settings: dict, depth=0, caseSensitive=False):
+    def __init__(self, parent: str, settings: dict, depth=0, caseSensitive=False, cache=None):
         """
         constructor: it defines the parent folder where resource files should be searched (except ofr external files).
         and the it associates key/value pair for resources.
@@ -26,25 +26,29 @@ class DataFiles:
                 or
                 - 'tip': title of the dialog that will pop open to select the file
                 - 'type': file extension of the searched file to bu used in this dialog
+        cache: optional DirectoryIndex (or path of its database) keeping the directory listings between searches. See Finder class.
          """
 
         finder_settings = {'parent': parent,
-                           'depth': depth, 'caseSensitive': caseSensitive}
+                           'depth': depth, 'caseSensitive': caseSensitive, 'cache': cache}
+
+        files = settings['files'] if 'files' in settings else dict()
+        fileset = settings['fileset'] if 'fileset' in settings else dict()
+        patterns = {('files', name): files[name] for name in files}
+        patterns.update({('fileset', name): fileset[name] for name in fileset})
+        found = Finder(finder_settings).findMany(patterns) if patterns else dict()
 
         self.files = dict()
-        if 'files' in settings:
-            for name in settings['files']:
-                finder_settings['regex'] = settings['files'][name]
-                self.files[name] = self._getFile(finder_settings)
-                logging.info('file {} found'.format(self.files[name]))
+        for name in files:
+            self.files[name] = self._checkFound(found[('files', name)], parent, files[name])[0]
+            logging.info('file {} found'.format(self.files[name]))
 
         self.fileset = dict()
-        if 'fileset' in settings:
-            for name in settings['fileset']:
-                finder_settings['regex'] = settings['fileset'][name]
-                self.fileset[name] = self._getFiles(finder_settings)
-                logging.info('fileset: {}'.format(self.fileset[name]))
+        for name in fileset:
+            self.fileset[name] = self._checkFound(found[('fileset', name)], parent, fileset[name])
+            logging.info('fileset: {}'.format(self.fileset[name]))
 
+        externals = dict()
         if 'externalfiles' in settings:
             for name in settings['externalfiles']:
                 parameters = settings['externalfiles'][name]
@@ -56,10 +60,14 @@ class DataFiles:
                         filetypes=filetypes, title=tip)
                     logging.info('file {} selected'.format(self.files[name]))
                 else:
-                    finder_settings['parent'] = ['in']
-                    finder_settings['regex'] = parameters['ref']
-                    self.files[name] = self._getFile(finder_settings)
-                    logging.info('file {} found'.format(self.files[name]))
+                    externals.setdefault(parameters['in'], dict())[name] = parameters['ref']
+
+        for folder, patterns in externals.items():
+            finder_settings['parent'] = folder
+            found = Finder(finder_settings).findMany(patterns)
+            for name in patterns:
+                self.files[name] = self._checkFound(found[name], folder, patterns[name])[0]
+                logging.info('file {} found'.format(self.files[name]))
 
     def _openDialog(self, title='open', filetypes=None):
         root = Tk()
@@ -68,16 +76,11 @@ class DataFiles:
         root.destroy()
         return filepath
 
-    def _getFiles(self, finder_settings):
-        foundfiles = Finder(finder_settings).findFiles()
+    def _checkFound(self, foundfiles, parent, regex):
         if not foundfiles:
-            raise ValueError('no file found in {} with regex {}'.format(
-                finder_settings['parent'], finder_settings['regex']))
+            raise ValueError('no file found in {} with regex {}'.format(parent, regex))
         return foundfiles
 
-    def _getFile(self, finder_settings):
-        return self._getFiles(finder_settings)[0]
-
     def generateDataPack(self, dataprocessing: dict):
         """
         generate a DataPack thanks to these file resources and the processing to be played on them.
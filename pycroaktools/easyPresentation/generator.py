@@ -3,7 +3,7 @@ from webbrowser import open as webopen
 from pandas import read_csv
 import distutils.dir_util as dirutil
 import pycroaktools.applauncher as launcher
-from pycroaktools.presentation import Slides
+from pycroaktools.presentation import Slides, RenderCache, HtmlWriter
 from pycroaktools.workflow import Workflow, Flowchart
 from pycroaktools.easyPresentation.slidesToWorkflow import SlidesToWorkflow
 from pycroaktools.easyPresentation.workflowToPresentation import WorkflowToPresentation
@@ -34,7 +34,8 @@ class Generator(launcher.Settings):
 
         - workflowFile: csv file defining the workflow. See class Workflow for a description of this csv file
 
-        - createFlowchart: if True, a graphical representation of the workflow is generated
+        - createFlowchart: if True, a graphical representation of the workflow is generated in the output folder,
+        as SVG file named after the workflow
 
         - createLinearPresentations: if True, each possible path defined by the workflow generates an individual presentation. 
         Then Each slide has only one next slide. This is a linear sequence from first to last slide.
@@ -43,6 +44,20 @@ class Generator(launcher.Settings):
         Each slide may have multiple next slides. Then links give choices to follow a path or another in the workflow
 
         - displayTitles: if true, each slide displays its title
+
+        - workers: number of linear presentations written at the same time. Default value is 1
+
+        - processes: if True, linear presentations are written by worker processes instead of threads
+
+        - renderCacheFolder: folder where the rendered slides are kept between runs. If None (default), they are kept
+        in memory during the run only
+
+        - manifestFolder: folder where the slides found in slideFolder and imageFolder are recorded (slides.json and images.json),
+        so that the next runs only parse the files added or changed. If None (default), all the files are parsed at each run
+
+        - minify: if True, the indentation, blank lines and comments of the html template are removed from the presentations
+
+        - compress: if True, the presentations are compressed with gzip (.html.gz files) and are not opened in the web browser
         """
 
         self.slideFolder = None
@@ -54,6 +69,12 @@ class Generator(launcher.Settings):
         self.createLinearPresentations = False
         self.createWorkflowPresentation = True
         self.displayTitles = False
+        self.workers = 1
+        self.processes = False
+        self.renderCacheFolder = None
+        self.manifestFolder = None
+        self.minify = False
+        self.compress = False
         self.setProperties(settings)
 
         self._build()
@@ -71,6 +92,9 @@ class Generator(launcher.Settings):
             return
         new = 2
         logging.info('presentation available at {}'.format(filename))
+        if self.compress:
+            logging.warning('{} is compressed with gzip, it is not opened in the web browser'.format(filename))
+            return
         url = "file:///"+os.path.realpath(filename)
         logging.info('opening presentation at url {}'.format(url))
         webopen(url, new=new)
@@ -79,17 +103,20 @@ class Generator(launcher.Settings):
         if not self.imageFolder:
             return
         print(self.imageFolder)
-        slides.catalog(self.imageFolder, images=True)
+        slides.catalog(self.imageFolder, images=True, manifest=self._manifest('images.json'))
 
     def _manageSlides(self):
         slides = Slides(self.displayTitles)
         if self.slideFolder:
-            slides.catalog(self.slideFolder)
+            slides.catalog(self.slideFolder, manifest=self._manifest('slides.json'))
         else:
             self.slideFolder = os.path.join(self.outputFolder, 'slides')
 
         return slides
 
+    def _manifest(self, name):
+        return os.path.join(self.manifestFolder, name) if self.manifestFolder else None
+
     def _manageWorkflow(self, slides: Slides):
         if self.workflowFile:
             try:
@@ -109,13 +136,14 @@ class Generator(launcher.Settings):
 
     def _generate(self, workflow: Workflow, slides: Slides):
         toPres = WorkflowToPresentation(
-            workflow, slides, self.outputFolder)
+            workflow, slides, self.outputFolder, self.workers, self.processes, RenderCache(folder=self.renderCacheFolder),
+            HtmlWriter(self.compress, self.minify))
 
         presentation = None
+        if self.createFlowchart:
+            Flowchart(workflow).toSvg(os.path.join(self.outputFolder, workflow.name + '.svg'))
         for version in self.versions:
             logging.info('version {} ...'.format(version))
-            if self.createFlowchart:
-                Flowchart(workflow).display()
             if self.createLinearPresentations:
                 presentation = toPres.createLinearPresentations(version)
             if self.createWorkflowPresentation:
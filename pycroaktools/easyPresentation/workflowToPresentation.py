@@ -1,6 +1,26 @@
-from pycroaktools.presentation import Presentation, Slides
+import os, logging, time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pycroaktools.presentation import Presentation, Slides, RenderCache, HtmlWriter
 from pycroaktools.workflow import Workflow
 
+_worker = dict()
+"""slides, output folder, render cache and html writer of a worker process"""
+
+
+def _initWorker(context):
+    _worker['context'] = context
+
+
+def _write(presName, slideIds, version, context=None, links=None):
+    """
+    writes a presentation without its assets and returns its file and the time spent.
+    context is the tuple (slides, output folder, render cache, html writer), the one of the worker process by default.
+    """
+    start = time.perf_counter()
+    slides, outputFolder, cache, writer = context if context is not None else _worker['context']
+    file = Presentation(cache, writer).writePresentation(presName, slides, slideIds, outputFolder, links, version)
+    return file, time.perf_counter() - start
+
 
 class WorkflowToPresentation:
     """
@@ -14,11 +34,15 @@ class WorkflowToPresentation:
     Then Each slide has only one next slide. This is a linear sequence from first to last slide.
 
     - createWorkflowPresentation: a unique presentation is generated to represent the workflow. Each slide may has multiple next slides. 
-    Then links give choices to follow a path or another in the workflow
+    Then links give choices to follow a path or another in the workflow. Slides are laid out in topological order
+    (a slide comes before its next slides)
 
+    The revealjs libs and the images are copied once per output folder, whatever the number of presentations and versions.
+    Slide sections are rendered once thanks to a RenderCache shared by all the presentations.
     """
 
-    def __init__(self, workflow: Workflow, slides: Slides, outputFolder):
+    def __init__(self, workflow: Workflow, slides: Slides, outputFolder, workers=1, processes=False, cache: RenderCache = None,
+                 writer: HtmlWriter = None):
         """
         Builds the object
         ---
@@ -26,38 +50,81 @@ class WorkflowToPresentation:
         - workflow: workflow definition
         - slides: slides that should match the workflow
         - outputFolder: folder where the presentations are saved
+        - workers: number of linear presentations written at the same time. Default value is 1 (one after the other)
+        - processes: if True, linear presentations are written by worker processes instead of threads
+        - cache: RenderCache object keeping the rendered slide sections. If None (default), a cache kept in memory is used.
+        Each worker process has its own copy of the cache, sharing only its folder.
+        - writer: HtmlWriter object writing the html files, to minify or compress them. If None (default), html files are written as is.
 
         """
         self.workflow = workflow
         self.slides = slides
         self.outputFolder = outputFolder
+        self.workers = workers
+        self.processes = processes
+        self.cache = cache if cache is not None else RenderCache()
+        self.writer = writer if writer is not None else HtmlWriter()
+        self.timings = dict()
+        """dictionary with key = presentation file and value = time spent writing it, in seconds"""
+        self._prepared = set()
+
+    def _prepare(self):
+        """copies the assets in the output folder if not done yet and returns this folder"""
+        folder = os.path.abspath(self.outputFolder or os.getcwd())
+        if folder not in self._prepared:
+            start = time.perf_counter()
+            Presentation().copyAssets(self.slides, folder)
+            self._prepared.add(folder)
+            logging.info('assets copied in {:.3f}s'.format(time.perf_counter() - start))
+        return folder
+
+    def _context(self, folder):
+        return self.slides, folder, self.cache, self.writer
 
-    def _getPresNames(self, paths, version):
-        presNames = []
-        for path in paths:
-            presName = self.workflow.name+'_v'+str(version)+'_'
-            for step in path:
-                presName += str(step.stepId)+'-'
-            presNames.append(presName[:-1]+'.html')
-        return presNames
+    def _done(self, file, seconds):
+        self.timings[file] = seconds
+        logging.info('{} written in {:.3f}s'.format(file, seconds))
+        return file
+
+    def _getPresName(self, path, version):
+        return self.workflow.name+'_v'+str(version)+'_'+'-'.join(str(step.stepId) for step in path)+'.html'
 
     def createLinearPresentations(self, version):
         """
         Each possible path defined by the workflow generates an individual presentation. 
         Then Each slide has only one next slide. This is a linear sequence from first to last slide.
+        Paths are enumerated one at a time, they are never all kept in memory: with several workers,
+        at most 2 presentations per worker are waiting to be written.
         ---
         Parameters:
         - version: expected version of the presentation. Then this version of the slides is searched and if not
         found the previous one is used.
         """
-        paths = self.workflow.getAllPaths()
-        presNames = self._getPresNames(paths, version)
-
-        for index, path in enumerate(paths):
-            slideIds = [step.stepId for step in path]
-            presentation = Presentation().createPresentation(
-                presNames[index], self.slides, slideIds, self.outputFolder, version=version)
+        folder = self._prepare()
+        jobs = ((self._getPresName(path, version), [step.stepId for step in path]) for path in self.workflow.iterPaths())
+        presentation = None
+        if self.workers <= 1:
+            for presName, slideIds in jobs:
+                presentation = self._done(*_write(presName, slideIds, version, self._context(folder)))
+            return presentation
 
+        if self.processes:
+            executor = ProcessPoolExecutor(self.workers, initializer=_initWorker, initargs=(self._context(folder),))
+            arguments = ()
+        else:
+            executor = ThreadPoolExecutor(self.workers)
+            arguments = (self._context(folder),)
+        pending = set()
+        with executor:
+            for presName, slideIds in jobs:
+                if len(pending) >= 2 * self.workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._done(*future.result())
+                pending.add(executor.submit(_write, presName, slideIds, version, *arguments))
+                presentation = self.writer.getFile(os.path.join(folder, presName))
+            for future in wait(pending).done:
+                self._done(*future.result())
         return presentation
 
     def createWorkflowPresentation(self, version):
@@ -70,7 +137,12 @@ class WorkflowToPresentation:
         found the previous one is used.
         """
         presName = self.workflow.name + '_v' + str(version)+'.html'
-        links = self.workflow.getLinksPerSteps()
+        folder = self._prepare()
+        try:
+            steps = self.workflow.getTopologicalOrder()
+        except ValueError as exp:
+            logging.warning('{}, slides are not sorted'.format(exp))
+            return self._done(*_write(presName, None, version, self._context(folder), self.workflow.getLinksPerSteps()))
+        links = self.workflow.getLinksPerSteps(steps)
 
-        return Presentation().createPresentation(presName, self.slides, outputFolder=self.outputFolder,
-                                                                   links=links, version=version)
+        return self._done(*_write(presName, [step.stepId for step in steps], version, self._context(folder), links))
@@ -1 +1,5 @@
-from pycroaktools.files.finder import Finder
\ No newline at end of file
+from pycroaktools.files.finder import Finder
+from pycroaktools.files.directoryIndex import DirectoryIndex
+from pycroaktools.files.zipTree import ZipTree
+from pycroaktools.files.watcher import Watcher
+from pycroaktools.files.asyncFinder import AsyncFinder, SharedListings
@@ -0,0 +1,226 @@
+"""
+This is an asyncio front-end of the file finder module.
+
+Searches run in the event loop while directory listings are made by the loop executor, a bounded number at a time.
+Concurrent searches over overlapping trees share the listings in progress: a directory requested by several searches
+is listed once.
+
+"""
+import asyncio, heapq, logging, os, posixpath, weakref
+from pycroaktools.files.finder import Finder
+from pycroaktools.files.walker import listDirectory, statDirectory
+
+
+class SharedListings:
+    """
+    The SharedListings class runs directory listings in the event loop executor, at most concurrency at a time,
+    and shares a listing in progress between all the searches requesting the same directory.
+    """
+
+    _defaults = weakref.WeakKeyDictionary()
+
+    def __init__(self, concurrency=16):
+        """
+        builds the object.
+        Parameters
+        ----------
+        concurrency: maximum number of directories listed at the same time. Default value is 16.
+        """
+        self.concurrency = concurrency
+        self.shared = 0
+        """number of listings requested while the same listing was in progress"""
+        self._semaphore = None
+        self._inflight = dict()
+        self._waiting = dict()
+
+    @classmethod
+    def default(cls, concurrency=16):
+        """returns the SharedListings object shared by the searches running in the current event loop"""
+        loop = asyncio.get_event_loop()
+        if loop not in cls._defaults:
+            cls._defaults[loop] = cls(concurrency)
+        return cls._defaults[loop]
+
+    def list(self, lister, path):
+        """
+        returns an awaitable of the Listing of the directory path, returned by lister.
+        Cancelling this awaitable does not cancel a listing shared with other searches.
+        """
+        return asyncio.shield(self.request(lister, path))
+
+    def request(self, lister, path):
+        """
+        returns the task listing the directory path, shared with the other searches requesting it.
+        The search should await it through asyncio.shield, and call release if it gives up before the task is done.
+        """
+        key = (lister, path)
+        task = self._inflight.get(key)
+        if task:
+            self.shared += 1
+            self._waiting[key] += 1
+        else:
+            task = asyncio.ensure_future(self._list(lister, path))
+            self._inflight[key] = task
+            self._waiting[key] = 1
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return task
+
+    def release(self, lister, path, task):
+        """gives up a task returned by request: the listing is cancelled if no other search waits for it"""
+        key = (lister, path)
+        if self._inflight.get(key) is not task:
+            return
+        self._waiting[key] -= 1
+        if not self._waiting[key]:
+            self._forget(key, task)
+            task.cancel()
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiting[key]
+
+    async def _list(self, lister, path):
+        if not self._semaphore:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            return await asyncio.get_event_loop().run_in_executor(None, lister, path)
+
+
+class AsyncFinder(Finder):
+    """
+    The AsyncFinder class offers the Finder searches as coroutines and asynchronous generators.
+    Settings are the Finder ones plus:
+
+    - concurrency: maximum number of directories listed at the same time. Default value is 16.
+
+    - listings: SharedListings object sharing the listings in progress between searches.
+    By default, all the searches of an event loop share the same object.
+    """
+
+    def __init__(self, settings: dict = None):
+        """builds the class according to the settings definition. See Finder class for details"""
+        self.concurrency = 16
+        self.listings = None
+        super().__init__(settings)
+
+    async def _walk(self, lister, top, join=os.path.join):
+        listings = self.listings if self.listings else SharedListings.default(self.concurrency)
+        stack = [(top, 0, listings.request(lister, top))]
+        try:
+            while stack:
+                path, level, task = stack[-1]
+                listing = await asyncio.shield(task)
+                stack.pop()
+                if listing is None:
+                    continue
+                dirs = list(listing.dirs)
+                yield path, dirs, listing.files, listing.infos
+                if self.depth > -1 and level >= self.depth:
+                    continue
+                children = [join(path, name) for name in dirs if name not in listing.links]
+                requests = [(child, level + 1, listings.request(lister, child)) for child in children]
+                stack += reversed(requests)
+        finally:
+            for path, _, task in stack:
+                listings.release(lister, path, task)
+
+    def _walkFileAsync(self):
+        if self.cache:
+            return self._walk(self.cache.lister, self.parent)
+        return self._walk(statDirectory if self._filtering() else listDirectory, self.parent)
+
+    def _walkFTPAsync(self):
+        return self._walk(self._getFtpLister(), self.parent, posixpath.join)
+
+    async def _iterFoundAsync(self, walk, sep, stat):
+        compiled = self._compile()
+        filtering = self._filtering()
+        stopWhenFound = self.stopWhenFound and not self.newest and not self.largest
+        try:
+            async for dirpath, subdirs, files, infos in walk:
+                logging.info('scanning {}'.format(dirpath))
+                names = compiled.filter(files)
+                if not filtering:
+                    found = [(name, None) for name in names]
+                elif infos is None and stat and names:
+                    # the listing has no metadata (e.g. from a DirectoryIndex): the files are stat-ed in the executor
+                    found = await asyncio.get_event_loop().run_in_executor(None, self._select, dirpath, names, infos, stat)
+                else:
+                    found = self._select(dirpath, names, infos, stat)
+                for filename, info in found:
+                    yield self._join(dirpath, filename, sep), info
+                    if stopWhenFound:
+                        return
+                self._prune(subdirs)
+        finally:
+            await walk.aclose()
+
+    async def _iterFilesAsync(self, walk, sep=os.path.sep, stat=None):
+        found = self._iterFoundAsync(walk, sep, stat)
+        if self.newest or self.largest:
+            count, key = self._topKey()
+            heap, index = [], 0
+            async for item in found:
+                entry = (key(item), -index, item[0])
+                index += 1
+                if len(heap) < count:
+                    heapq.heappush(heap, entry)
+                else:
+                    heapq.heappushpop(heap, entry)
+            for _, _, path in sorted(heap, reverse=True):
+                yield path
+            return
+        async for path, _ in found:
+            yield path
+
+    async def _iterFoldersAsync(self, walk, sep=os.path.sep):
+        compiled = self._compile()
+        try:
+            async for dirpath, subdirs, _, _ in walk:
+                logging.info('processing folder {}'.format(dirpath))
+                founds = compiled.filter(subdirs)
+                for subdir in founds:
+                    yield self._join(dirpath, subdir, sep)
+                if founds and self.stopWhenFound:
+                    return
+                self._prune(subdirs, founds)
+        finally:
+            await walk.aclose()
+
+    def iterFilesAsync(self):
+        """
+        asynchronous generator of the files found in os directory according to the settings defined when building the object.
+        """
+        logging.info('looking for {} in {}'.format(self.regex, self.parent))
+        return self._iterFilesAsync(self._walkFileAsync(), stat=self._stat)
+
+    async def findFilesAsync(self):
+        """
+        find files in os directory according to the settings defined when building the object
+        """
+        return [file async for file in self.iterFilesAsync()]
+
+    def iterFoldersAsync(self):
+        """
+        asynchronous generator of the folders found in os directory according to the settings defined when building the object.
+        """
+        return self._iterFoldersAsync(self._walkFileAsync())
+
+    async def findFoldersAsync(self):
+        """
+        find folders in os directory according to the settings defined when building the object
+        """
+        return [folder async for folder in self.iterFoldersAsync()]
+
+    def iterFilesInFtpAsync(self):
+        """
+        asynchronous generator of the files found in ftp location according to the settings defined when building the object.
+        """
+        return self._iterFilesAsync(self._walkFTPAsync(), sep='/')
+
+    async def findFilesInFtpAsync(self):
+        """
+        find files in ftp location according to the settings defined when building the object
+        """
+        return [file async for file in self.iterFilesInFtpAsync()]
@@ -0,0 +1,138 @@
+"""
+This is a persistent directory index module.
+
+It stores directory listings in a SQLite database, together with the modification time of each directory.
+A directory is listed again only if its modification time changed since it was indexed, so that repeated
+searches on the same tree only pay for the directories that changed.
+
+"""
+import logging, os, sqlite3, threading, time, weakref
+from pycroaktools.files.walker import Listing, listDirectory
+
+
+class DirectoryIndex:
+    """
+    The DirectoryIndex class caches directory listings on disk. Its lister method may be given to a Walker
+    (or the index may be given to a Finder with the 'cache' setting).
+    The index keeps at most maxEntries directories, the least recently used ones are evicted first.
+    """
+
+    _SEP = '\0'
+    _shared = weakref.WeakValueDictionary()
+    _sharedLock = threading.Lock()
+
+    def __init__(self, database=':memory:', maxEntries=100000, minAge=2.0):
+        """
+        opens or creates the index.
+        Parameters
+        ----------
+        database: path of the SQLite database file. Default value is ':memory:', the index is then lost when the object is deleted.
+
+        maxEntries: maximum number of directories kept in the index. When exceeded, the least recently used directories are evicted
+        down to 90% of maxEntries.
+
+        minAge: directories modified less than minAge seconds ago are listed but not indexed,
+        since a change in the same time unit would not change their modification time on some file systems.
+        """
+        self.database = database
+        self.maxEntries = maxEntries
+        self.minAge = minAge
+        self.hits = 0
+        """number of directories read from the index"""
+        self.misses = 0
+        """number of directories listed because they were not indexed or modified"""
+        self.evictions = 0
+        """number of directories evicted from the index"""
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(database, check_same_thread=False)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS listings '
+                                 '(path TEXT PRIMARY KEY, mtime INTEGER, dirs TEXT, files TEXT, links TEXT, used INTEGER)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS listings_used ON listings (used)')
+        self._count, clock = self._connection.execute('SELECT COUNT(*), MAX(used) FROM listings').fetchone()
+        self._clock = clock if clock else 0
+        if self._count > self.maxEntries:
+            self._evict()
+
+    @classmethod
+    def shared(cls, database: str):
+        """
+        returns the index of the database file shared by all its users, opened at the first call.
+        The database is closed when the index is no longer used. An in memory database (':memory:') is not shared.
+        """
+        if database == ':memory:':
+            return cls(database)
+        key = os.path.abspath(database)
+        with cls._sharedLock:
+            index = cls._shared.get(key)
+            if index is None:
+                index = cls(database)
+                cls._shared[key] = index
+            return index
+
+    def lister(self, path):
+        """
+        returns the Listing of the directory path, from the index if the directory did not change,
+        or by listing the directory otherwise. Returns None if the directory can't be read.
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError as exp:
+            logging.warning('can\'t list {}: {}'.format(path, exp))
+            return None
+
+        with self._lock:
+            self._clock += 1
+            row = self._connection.execute(
+                'SELECT mtime, dirs, files, links FROM listings WHERE path = ?', (path,)).fetchone()
+            if row and row[0] == mtime:
+                self.hits += 1
+                self._connection.execute('UPDATE listings SET used = ? WHERE path = ?', (self._clock, path))
+                return Listing(self._split(row[1]), self._split(row[2]), self._split(row[3]))
+            self.misses += 1
+
+        listing = listDirectory(path)
+        if listing is None or time.time() - mtime / 1e9 < self.minAge:
+            return listing
+
+        with self._lock:
+            self._connection.execute('INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?, ?)',
+                                     (path, mtime, self._SEP.join(listing.dirs), self._SEP.join(listing.files),
+                                      self._SEP.join(listing.links), self._clock))
+            if not row:
+                self._count += 1
+            if self._count > self.maxEntries:
+                self._evict()
+        return listing
+
+    def _split(self, names):
+        return names.split(self._SEP) if names else []
+
+    def _evict(self):
+        evicted = self._count - self.maxEntries + self.maxEntries // 10
+        self._connection.execute(
+            'DELETE FROM listings WHERE path IN (SELECT path FROM listings ORDER BY used LIMIT ?)', (evicted,))
+        self._count -= evicted
+        self.evictions += evicted
+        logging.info('{} directories evicted from index {}'.format(evicted, self.database))
+
+    def stats(self):
+        """returns a dictionary with the number of hits, misses, evictions and indexed directories"""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'entries': self._count}
+
+    def flush(self):
+        """writes the pending changes in the database"""
+        with self._lock:
+            self._connection.commit()
+
+    def clear(self):
+        """removes all directories from the index"""
+        with self._lock:
+            self._connection.execute('DELETE FROM listings')
+            self._connection.commit()
+            self._count = 0
+
+    def close(self):
+        """writes the pending changes and closes the database"""
+        with self._lock:
+            self._connection.commit()
+            self._connection.close()
@@ -7,12 +7,17 @@ Search is based on regex.
 Many options are available to stop or continue search when a file or folder is found.
 
 """
-import logging, os, re
-from ftplib import FTP
+import heapq, logging, os, posixpath, re
+from contextlib import closing, contextmanager
 from datetime import datetime
-from zipfile import ZipFile
 from pathlib import Path
 from pycroaktools.applauncher import Settings
+from pycroaktools.files.walker import Walker, listDirectory, statDirectory
+from pycroaktools.files.directoryIndex import DirectoryIndex
+from pycroaktools.files.zipTree import ZipTree
+from pycroaktools.files.ftpLister import FtpLister
+from pycroaktools.files.matcher import Matcher
+from pycroaktools.files.watcher import Watcher
 
 class Finder(Settings):
     """
@@ -50,7 +55,35 @@ class Finder(Settings):
         - caseSensitive: if true, the regex is case sensitive. Default value is True.
 
         - ftpConnection: ftp connection to be used when looking in a ftp location. 
-        This connection is returned when calling ftplib FTP(host, user, pwd)
+        This connection is returned when calling ftplib FTP(host, user, pwd). 
+        A FtpLister object may be given instead, to share its connections and its listing cache between finders.
+
+        - ftpFactory: function without argument returning a new ftp connection, e.g. lambda: FTP(host, user, pwd). 
+        It is needed to list ftp directories with more than one connection and to reconnect after an error.
+
+        - ftpConnections: number of ftp connections listing directories in parallel. Default value is 1.
+
+        - threads: number of threads listing os directories in parallel. Subdirectories are then walked in a deterministic order 
+        (names are sorted). Default value is 0: the tree is walked by os.walk in the calling thread.
+
+        - cache: DirectoryIndex object, or path of its database file, used to store directory listings between searches. 
+        Only directories modified since they were indexed are listed again. The finders given the same path share one index,
+        closed when they are deleted. Default value is None (no cache).
+
+        - nestedZips: if True, zip archives found in a zip archive are searched as if they were folders. Default value is False.
+
+        - minSize, maxSize: size range in bytes of the files to find. Default value is None (no limit).
+
+        - modifiedSince: datetime or timestamp. Only files modified since this date are found. Default value is None.
+
+        - newest: if set to n, only the n most recently modified files are found, the most recent first. 
+        The whole tree is then searched, whatever the stopWhenFound value. Default value is None.
+
+        - largest: if set to n, only the n largest files are found, the largest first. 
+        The whole tree is then searched, whatever the stopWhenFound value. Default value is None.
+
+        Sizes and modification dates are read while listing the directories (from the ftp MLSD facts for a ftp location, 
+        the ftp files listed with LIST are never found by these filters). They are not used to search folders.
 
         """
         self.parent = os.getcwd()
@@ -61,99 +94,323 @@ class Finder(Settings):
         self.avoidFolders = []
         self.caseSensitive = True
         self.ftpConnection = None
+        self.ftpFactory = None
+        self.ftpConnections = 1
+        self.threads = 0
+        self.cache = None
+        self.nestedZips = False
+        self.minSize = None
+        self.maxSize = None
+        self.modifiedSince = None
+        self.newest = None
+        self.largest = None
         self.setProperties(settings)
+        if self.newest and self.largest:
+            raise ValueError('newest and largest can\'t be used together')
+        if isinstance(self.cache, str):
+            self.cache = DirectoryIndex.shared(self.cache)
         self.parent = str(Path(self.parent).resolve()
                           ) if self.parent != '/' else self.parent
         self.initialDepth = 0
+        self._ftpLister = None
         
     def getRootFile(self, parent, regex):
         self.parent = parent
         self.depth = 0
         self.caseSensitive = False
         self.regex = regex
-        files = self.findFiles()
-        if files is None:
+        return next(self.iterFiles(), None)
+
+    def _compile(self):
+        return Matcher(self.regex, self.caseSensitive)
+
+    def _join(self, dirpath, name, sep):
+        return dirpath+name if dirpath.endswith(sep) else dirpath+sep+name
+
+    def _prune(self, subdirs, founds=()):
+        """removes from subdirs the folders that should not be searched"""
+        if not self.goIntoFoundFolder:
+            for subdir in founds:
+                subdirs.remove(subdir)
+        for avoidFolder in self.avoidFolders:
+            if avoidFolder in subdirs:
+                subdirs.remove(avoidFolder)
+
+    def _filtering(self):
+        """tells if sizes or modification dates are needed to select the files"""
+        return any(value is not None for value in
+                   [self.minSize, self.maxSize, self.modifiedSince, self.newest, self.largest])
+
+    def _select(self, dirpath, names, infos, stat=None):
+        """
+        returns the (name, (size, mtime)) tuples of the names complying with the size and date filters.
+        infos gives the names metadata. If it is None, metadata are read by calling stat with the file path.
+        """
+        since = self.modifiedSince
+        if since is not None and not isinstance(since, (int, float)):
+            since = since.timestamp()
+        selected = []
+        for name in names:
+            info = infos.get(name) if infos is not None else stat(os.path.join(dirpath, name)) if stat else None
+            if info is None:
+                continue
+            size, mtime = info
+            if (self.minSize is not None and size < self.minSize) or (self.maxSize is not None and size > self.maxSize):
+                continue
+            if since is not None and mtime < since:
+                continue
+            selected.append((name, info))
+        return selected
+
+    def _stat(self, path):
+        try:
+            info = os.stat(path)
+        except OSError:
             return None
-        return files[0]
+        return info.st_size, info.st_mtime
 
-    def _findFiles(self, callback, sep=os.path.sep):
-        foundFiles = []
-        flags = 0 if self.caseSensitive else re.IGNORECASE
-        compiled = re.compile(self.regex, flags)
-        for dirpath, subdirs, files in callback(self.parent):
-            logging.info('scanning {}'.format(dirpath))
-            foundFiles += [dirpath+sep+filename
-                           for filename in files if compiled.search(filename)]
-            if self.stopWhenFound and foundFiles:
-                return [foundFiles[0]]
-            for avoidFolder in self.avoidFolders:
-                if avoidFolder in subdirs:
-                    subdirs.remove(avoidFolder)
-        return foundFiles
+    def _topKey(self):
+        """returns the number of files to keep and the function giving the sort key of a (path, (size, mtime)) tuple"""
+        if self.newest:
+            return self.newest, lambda item: item[1][1]
+        return self.largest, lambda item: item[1][0]
 
-    def findFiles(self):
+    def _top(self, found):
+        """returns the paths of the newest or largest files among the (path, (size, mtime)) tuples, with a bounded heap"""
+        count, key = self._topKey()
+        return [path for path, _ in heapq.nlargest(count, found, key=key)]
+
+    def _iterFound(self, callback, sep, stat):
+        """generates the (path, (size, mtime)) tuples of the found files, (size, mtime) being None without metadata filter"""
+        compiled = self._compile()
+        filtering = self._filtering()
+        stopWhenFound = self.stopWhenFound and not self.newest and not self.largest
+        with closing(callback(self.parent)) as walk:
+            for dirpath, subdirs, files, infos in walk:
+                logging.info('scanning {}'.format(dirpath))
+                names = compiled.filter(files)
+                found = self._select(dirpath, names, infos, stat) if filtering else [(name, None) for name in names]
+                for filename, info in found:
+                    yield self._join(dirpath, filename, sep), info
+                    if stopWhenFound:
+                        return
+                self._prune(subdirs)
+
+    def _iterFiles(self, callback, sep=os.path.sep, stat=None):
+        found = self._iterFound(callback, sep, stat)
+        if self.newest or self.largest:
+            yield from self._top(found)
+            return
+        for path, _ in found:
+            yield path
+
+    def iterFiles(self):
         """
-        find files in os directory according to the settings defined when building the Finder object
+        generates the files found in os directory according to the settings defined when building the Finder object.
+        Each file is yielded as soon as it is found.
         """
         self.initialDepth = self.parent.count(os.path.sep)
         logging.info('looking for {} in {}'.format(self.regex, self.parent))
-        return self._findFiles(self._walkFile)
+        return self._iterFiles(self._walkFile, stat=self._stat)
+
+    def findFiles(self):
+        """
+        find files in os directory according to the settings defined when building the Finder object
+        """
+        return list(self.iterFiles())
+
+    def iterFilesInFtp(self):
+        """
+        generates the files found in ftp location according to the settings defined when building the Finder object
+        """
+        self.initialDepth = self.parent.count('/')
+        return self._iterFiles(self._walkFTP, sep='/')
 
     def findFilesInFtp(self):
         """
         find files in ftp location according to the settings defined when building the Finder object
         """
-        self.initialDepth = self.parent.count('/')
-        return self._findFiles(self._walkFTP, sep='/')
+        return list(self.iterFilesInFtp())
+
+    def iterFilesInZip(self):
+        """
+        generates the files found in a zip archive according to the settings defined when building the Finder object.
+        In this case the "parent" setting should be the zip path
+        """
+        return self._iterFiles(self._walkZip, sep='/')
 
     def findFilesInZip(self):
         """
         find files in a zip archive according to the settings defined when building the Finder object.
         In this case the "parent" setting should be the zip path
         """
-        return self._findFiles(self._walkZip, sep='/')
+        return list(self.iterFilesInZip())
+
+    @contextmanager
+    def openInZip(self, file):
+        """
+        opens a file found by findFilesInZip as a binary stream, to be used in a with statement. The file is not extracted.
+        Parameters
+        ----------
+        file: path of the file as returned by findFilesInZip
+        """
+        with ZipTree(self.parent, nested=self.nestedZips) as tree, tree.open(file) as stream:
+            yield stream
 
-    def _findFolders(self, callback, sep=os.path.sep):
-        folders = []
+    def _compileMany(self, patterns: dict):
+        """
+        compiles the patterns in a single regex made of an alternation of named groups, one group per pattern,
+        used to skip at once the files matching none of them.
+        Returns None if the patterns can't be combined (backreferences, inline flags, duplicated group names).
+        """
+        if len(patterns) < 2 or any(re.search(r'\\[1-9]|\(\?P=', regex) for regex in patterns.values()):
+            return None
         flags = 0 if self.caseSensitive else re.IGNORECASE
+        alternatives = ['(?P<_p{}>{})'.format(index, regex) for index, regex in enumerate(patterns.values())]
+        try:
+            return re.compile('|'.join(alternatives), flags)
+        except re.error:
+            return None
+
+    def _iterMany(self, callback, patterns: dict, sep=os.path.sep):
+        matchers = {name: Matcher(regex, self.caseSensitive) for name, regex in patterns.items()}
+        active = list(patterns)
+        fast = [name for name in active if matchers[name].kind != 'regex']
+        slow = [name for name in active if matchers[name].kind == 'regex']
+        combined = self._compileMany({name: patterns[name] for name in slow})
+        filtering = any(value is not None for value in [self.minSize, self.maxSize, self.modifiedSince])
+        with closing(callback(self.parent)) as walk:
+            for dirpath, subdirs, files, infos in walk:
+                logging.info('scanning {}'.format(dirpath))
+                matched = {name: set(matchers[name].filter(files)) for name in fast}
+                if slow:
+                    candidates = [filename for filename in files if combined.search(filename)] if combined else files
+                    matched.update({name: set(matchers[name].filter(candidates)) for name in slow})
+                hits = set().union(*matched.values())
+                if filtering:
+                    hits = {filename for filename, _ in self._select(dirpath, sorted(hits), infos, self._stat)}
+                for filename in files:
+                    if filename not in hits:
+                        continue
+                    found = [name for name in fast + slow if filename in matched[name]]
+                    for name in found:
+                        yield name, self._join(dirpath, filename, sep)
+                    if not self.stopWhenFound or not found:
+                        continue
+                    fast = [name for name in fast if name not in found]
+                    slow = [name for name in slow if name not in found]
+                    if not fast and not slow:
+                        return
+                    combined = self._compileMany({name: patterns[name] for name in slow})
+                self._prune(subdirs)
+
+    def iterMany(self, patterns: dict):
+        """
+        generates (name, file) tuples for the files found in os directory matching the given patterns.
+        The tree is walked once whatever the number of patterns.
+        When stopWhenFound is set, each pattern stops being searched after its first file.
+        The minSize, maxSize and modifiedSince filters apply, newest and largest don't.
+        Parameters
+        ----------
+        patterns: dictionary with key = arbitrary name and value = regex to look for
+        """
+        self.initialDepth = self.parent.count(os.path.sep)
+        logging.info('looking for {} in {}'.format(', '.join(patterns.values()), self.parent))
+        return self._iterMany(self._walkFile, patterns)
+
+    def findMany(self, patterns: dict):
+        """
+        find files in os directory matching the given patterns with a single search,
+        according to the settings defined when building the Finder object (the regex setting is ignored).
+        Returns a dictionary with key = pattern name and value = list of found files.
+        Parameters
+        ----------
+        patterns: dictionary with key = arbitrary name and value = regex to look for
+        """
+        found = {name: [] for name in patterns}
+        for name, file in self.iterMany(patterns):
+            found[name].append(file)
+        return found
+
+    def watch(self, inotify=None, pollFiles=False):
+        """
+        searches the files in os directory and returns a Watcher object keeping the result up to date
+        while the tree changes. Its poll method returns the added, removed and modified files since the previous call.
+        stopWhenFound is ignored: all the files complying with the regex are watched.
+        Parameters
+        ----------
+        inotify: if True, changes are notified by inotify (Linux only). If False, directories are polled.
+        Default value is None: inotify is used when available.
+
+        pollFiles: if True, when polling, all the found files are stat-ed at each poll to report the files modified in place
+        (see Watcher). Default value is False.
+        """
+        return Watcher(self, inotify, pollFiles=pollFiles)
+
+    def _iterFolders(self, callback, sep=os.path.sep):
         try:
-            compiled = re.compile(self.regex, flags)
-        except:
+            compiled = self._compile()
+        except re.error:
             logging.error('wrong regex search')
             return
-        for dirpath, subdirs, _ in callback(self.parent):
-            logging.info('processing folder {}'.format(dirpath))
-            founds = [subdir for subdir in subdirs if compiled.search(subdir)]
-            if founds and self.stopWhenFound:
-                return founds
-            folders += [dirpath+sep+subdir for subdir in founds]
-            for subdir in founds:
-                if not self.goIntoFoundFolder:
-                    subdirs.remove(subdir)
-            for avoidFolder in self.avoidFolders:
-                if avoidFolder in subdirs:
-                    subdirs.remove(avoidFolder)
-        logging.info('{} folders found'.format(len(folders)))
-        return folders
+        count = 0
+        with closing(callback(self.parent)) as walk:
+            for dirpath, subdirs, _, _ in walk:
+                logging.info('processing folder {}'.format(dirpath))
+                founds = compiled.filter(subdirs)
+                for subdir in founds:
+                    yield self._join(dirpath, subdir, sep)
+                count += len(founds)
+                if founds and self.stopWhenFound:
+                    return
+                self._prune(subdirs, founds)
+        logging.info('{} folders found'.format(count))
+
+    def iterFolders(self):
+        """
+        generates the folders found in the os directory according to the settings defined when building the Finder object.
+        Each folder is yielded as soon as it is found.
+        """
+        self.initialDepth = self.parent.count(os.path.sep)
+        return self._iterFolders(self._walkFile)
 
     def findFolders(self):
         """
         find folders in the os directory according to the settings defined when building the Finder object
         """
-        self.initialDepth = self.parent.count(os.path.sep)
-        return self._findFolders(self._walkFile)
+        return list(self.iterFolders())
+
+    def iterFoldersInFtp(self):
+        """
+        generates the folders found in the ftp location according to the settings defined when building the Finder object
+        """
+        self.initialDepth = self.parent.count('/')
+        return self._iterFolders(self._walkFTP, sep='/')
 
     def findFolderInFtp(self):
         """
         find folders in the ftp location according to the settings defined when building the Finder object
         """
-        self.initialDepth = self.parent.count('/')
-        return self._findFolders(self._walkFTP, sep='/')
+        return list(self.iterFoldersInFtp())
 
     def _walkFile(self, path):
+        """
+        Walk through os directory tree. When sizes or dates are needed, they are read from the scandir entries, 
+        except with a cache (the index doesn't store them): the found files are then stat-ed.
+        """
+        if self.cache:
+            try:
+                yield from Walker(self.cache.lister, self.threads).walk(path, self.depth, infos=True)
+            finally:
+                self.cache.flush()
+            return
+        if self.threads > 0 or self._filtering():
+            lister = statDirectory if self._filtering() else listDirectory
+            yield from Walker(lister, self.threads).walk(path, self.depth, infos=True)
+            return
         for root, dirs, files in os.walk(path):
             num_sep_this = root.count(os.path.sep)
-            yield root, dirs, files
+            yield root, dirs, files, None
             if self.initialDepth + self.depth <= num_sep_this and self.depth > -1:
                 del dirs[:]
 
@@ -161,61 +418,31 @@ class Finder(Settings):
         """
         Walk through Zip archive
         """
-        zipFile = ZipFile(path)
-        itemsInZip = zipFile.namelist()
-        dirs = []
-        nondirs = []
-        for item in itemsInZip:
-            groups = item.split('/')
-            num_sep_this = len(groups) - 2
-            if self.depth < num_sep_this and self.depth > -1:
-                continue
-            if item.endswith('/'):
-                dirs.append(groups[-2])
-            else:
-                nondirs.append(groups[-1])
-            # path = '/'
-            # for index in range(0, len(groups)-1):
-            #     path += groups[index]+'/'
-        yield path, dirs, nondirs
-
-    # def getLastModificationDate(self, file):
-    #     fileInfos = os.stat(file)
-    #     ts = int(fileInfos[8])
-    #     return datetime.utcfromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+        with ZipTree(path, nested=self.nestedZips) as tree:
+            if self._filtering():
+                yield from tree.walk(self.depth, infos=True)
+                return
+            for dirpath, dirs, files in tree.walk(self.depth):
+                yield dirpath, dirs, files, None
 
-    def _listdirFTP(self, _path):
+    def getLastModificationDate(self, file):
         """
-        return files and directory names within a path (directory)
+        returns the last modification date of a file of the os directory, in UTC, as a 'YYYY-mm-dd HH:MM:SS' string
         """
-        file_list, dirs, nondirs = [], [], []
-        try:
-            self.ftpConnection.cwd(_path)
-        except Exception as exp:
-            logging.error(exp.__str__(), _path)
-            return [], []
-        else:
-            self.ftpConnection.retrlines(
-                'LIST', lambda x: file_list.append(x.split()))
-            for info in file_list:
-                ls_type, name = info[0], info[-1]
-                if re.match(r'^\.+$', name):
-                    continue
-                if ls_type.startswith('d'):
-                    dirs.append(name)
-                else:
-                    nondirs.append(name)
-            return dirs, nondirs
+        return datetime.utcfromtimestamp(int(os.stat(file).st_mtime)).strftime('%Y-%m-%d %H:%M:%S')
+
+    def _getFtpLister(self):
+        if isinstance(self.ftpConnection, FtpLister):
+            return self.ftpConnection
+        if not self._ftpLister:
+            self._ftpLister = FtpLister(self.ftpConnection, self.ftpFactory, self.ftpConnections)
+        return self._ftpLister
 
     def _walkFTP(self, path):
         """
-        Walk through FTP server's directory tree, based on a BFS algorithm.
+        Walk through FTP server's directory tree. Directories are listed by a pool of ftp connections 
+        and each listing is kept by the Finder for the next searches, during one minute (see FtpLister cacheTime).
         """
-        dirs, nondirs = self._listdirFTP(path)
-        num_sep_this = path.count('/')
-        if self.initialDepth + self.depth <= num_sep_this and self.depth > -1:
-            del dirs[:]
-        yield path, dirs, nondirs
-        for name in dirs:
-            yield from self._walkFTP(path+'/'+name)
-            self.ftpConnection.cwd('.')
+        lister = self._getFtpLister()
+        threads = lister.connections if lister.connections > 1 else 0
+        yield from Walker(lister, threads, posixpath.join).walk(path, self.depth, infos=True)
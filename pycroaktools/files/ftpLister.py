@@ -0,0 +1,219 @@
+"""
+This is a ftp directory listing module.
+
+It lists ftp directories for a Walker: listings are spread over a pool of ftp connections, use the MLSD command when
+the server supports it (LIST output is parsed otherwise), are retried on a new connection when a transient error
+occurs and are cached by path for a limited time.
+
+"""
+import calendar, logging, queue, threading, time
+from ftplib import error_perm, error_temp, error_reply
+from pycroaktools.files.walker import Listing
+
+
+class FtpLister:
+    """
+    The FtpLister class lists ftp directories. Its instances are callables that may be given as lister to a Walker.
+    """
+
+    def __init__(self, connection=None, factory=None, connections=1, retries=2, cache=True, cacheTime=60.0, maxEntries=100000):
+        """
+        builds the lister.
+        Parameters
+        ----------
+        connection: ftp connection returned when calling ftplib FTP(host, user, pwd). It is the first connection of the pool.
+
+        factory: function without argument returning a new ftp connection. It is needed to open more than one connection
+        and to reconnect after an error.
+
+        connections: maximum number of ftp connections used at the same time. Default value is 1.
+
+        retries: number of times a listing is tried again on a new connection after a transient error. Default value is 2.
+        Retries need a factory: without it, a listing is tried once.
+
+        cache: if True, listings are kept by path and directories are listed only once in cacheTime seconds. Default value is True.
+
+        cacheTime: number of seconds a listing is kept. Default value is 60.
+
+        maxEntries: maximum number of listings kept, the oldest ones are dropped first. Default value is 100000.
+        """
+        if not connection and not factory:
+            raise ValueError('an ftp connection or a connection factory is needed')
+        self.factory = factory
+        self.connections = connections if factory else 1
+        self.retries = retries if factory else 0
+        self.cacheTime = cacheTime
+        self.maxEntries = maxEntries
+        self.useMlsd = None
+        """True if the server supports MLSD, False if it doesn't, None if not known yet"""
+        self._cache = dict() if cache else None
+        self._lock = threading.Lock()
+        self._pool = queue.Queue()
+        self._opened = 0
+        self._connection = connection
+        if connection:
+            self._pool.put(connection)
+            self._opened = 1
+
+    def __call__(self, path):
+        """returns the Listing of the ftp directory path or None if it can't be listed"""
+        if self._cache is not None:
+            cached = self._cache.get(path)
+            if cached and time.monotonic() - cached[0] < self.cacheTime:
+                return cached[1]
+        for attempt in range(self.retries + 1):
+            connection = None
+            try:
+                connection = self._acquire()
+                listing = self._list(connection, path)
+            except error_perm as exp:
+                if connection is not None:
+                    self._pool.put(connection)
+                logging.error('can\'t list {}: {}'.format(path, exp))
+                return None
+            except (error_temp, error_reply, EOFError, OSError) as exp:
+                if connection is not None:
+                    self._discard(connection)
+                logging.warning('listing {} failed (attempt {}): {}'.format(path, attempt + 1, exp))
+                continue
+            self._pool.put(connection)
+            if self._cache is not None:
+                self._store(path, listing)
+            return listing
+        logging.error('can\'t list {} after {} attempts'.format(path, self.retries + 1))
+        return None
+
+    def _store(self, path, listing):
+        """keeps a listing, the cache being ordered from the oldest listing to the newest one"""
+        with self._lock:
+            self._cache.pop(path, None)
+            self._cache[path] = (time.monotonic(), listing)
+            while len(self._cache) > self.maxEntries:
+                del self._cache[next(iter(self._cache))]
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._opened < self.connections
+            if create:
+                self._opened += 1
+        if not create:
+            return self._pool.get()
+        try:
+            return self.factory()
+        except BaseException:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    def _discard(self, connection):
+        """removes a failed connection from the pool. The connection given to the constructor is never closed"""
+        if not self.factory:
+            self._pool.put(connection)
+            return
+        if connection is not self._connection:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        with self._lock:
+            self._opened -= 1
+
+    def _list(self, connection, path):
+        if self.useMlsd is not False:
+            try:
+                listing = self._listMlsd(connection, path)
+                self.useMlsd = True
+                return listing
+            except error_perm as exp:
+                if self.useMlsd or not str(exp).startswith('50'):
+                    raise
+                logging.info('MLSD not supported by the server, LIST is used')
+                self.useMlsd = False
+        return self._listLines(connection, path)
+
+    def _listMlsd(self, connection, path):
+        dirs, files, infos = [], [], dict()
+        for name, facts in connection.mlsd(path, facts=['type', 'size', 'modify']):
+            kind = facts.get('type', 'file').lower()
+            if kind == 'dir':
+                dirs.append(name)
+            elif kind not in ['cdir', 'pdir']:
+                files.append(name)
+                info = self._parseFacts(facts)
+                if info:
+                    infos[name] = info
+        dirs.sort()
+        files.sort()
+        return Listing(dirs, files, infos=infos)
+
+    def _parseFacts(self, facts):
+        """returns (size, modification timestamp) from the MLSD facts, the modify fact being YYYYMMDDHHMMSS[.sss] in UTC"""
+        try:
+            modify = facts['modify']
+            mtime = calendar.timegm(time.strptime(modify[:14], '%Y%m%d%H%M%S'))
+            if '.' in modify:
+                mtime += float('0' + modify[14:])
+            return int(facts['size']), mtime
+        except (KeyError, ValueError):
+            return None
+
+    def _listLines(self, connection, path):
+        lines = []
+        connection.retrlines('LIST ' + path, lines.append)
+        dirs, files = [], []
+        for line in lines:
+            name, isDir = self._parseLine(line)
+            if not name or name in ['.', '..']:
+                continue
+            if isDir:
+                dirs.append(name)
+            else:
+                files.append(name)
+        dirs.sort()
+        files.sort()
+        return Listing(dirs, files)
+
+    def _parseLine(self, line):
+        """parses a LIST line in unix format (drwxr-xr-x 1 owner group size month day time name) or in dos format (date time <DIR>|size name)"""
+        parts = line.split(None, 8)
+        if len(parts) == 9 and parts[0][0] in 'dl-bcps':
+            name = parts[8]
+            if parts[0][0] == 'l':
+                name = name.split(' -> ')[0]
+            return name, parts[0][0] == 'd'
+        parts = line.split(None, 3)
+        if len(parts) == 4:
+            return parts[3], parts[2].upper() == '<DIR>'
+        return None, False
+
+    def clear(self):
+        """empties the listing cache"""
+        if self._cache is not None:
+            with self._lock:
+                self._cache.clear()
+
+    def close(self):
+        """closes the ftp connections opened by the factory"""
+        if not self.factory:
+            return
+        kept = []
+        while True:
+            try:
+                connection = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            if connection is self._connection:
+                kept.append(connection)
+                continue
+            try:
+                connection.quit()
+            except Exception:
+                connection.close()
+            with self._lock:
+                self._opened -= 1
+        for connection in kept:
+            self._pool.put(connection)
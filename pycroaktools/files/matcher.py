@@ -0,0 +1,161 @@
+"""
+This is a file name matching module.
+
+It analyzes the regex used to search files and, when the regex is a common pattern (literal name, prefix, suffix,
+extension set...), replaces the regex search by string comparisons, set lookups or str.startswith/str.endswith checks.
+Any other regex is searched with the re module. In both cases the result is the same than re.search.
+
+"""
+import re
+
+_META = set('.^$*+?{}[]\\|()')
+
+
+def _isEscaped(text, index):
+    """tells if the character at index is escaped, ie preceded by an odd number of backslashes"""
+    count = 0
+    while index - count - 1 >= 0 and text[index - count - 1] == '\\':
+        count += 1
+    return count % 2 == 1
+
+
+def _literal(text):
+    """returns the string matched by a regex made of literal characters only, or None if the regex is not a literal"""
+    chars = []
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if char == '\\':
+            if index + 1 >= len(text) or text[index + 1].isalnum():
+                return None
+            chars.append(text[index + 1])
+            index += 2
+            continue
+        if char in _META:
+            return None
+        chars.append(char)
+        index += 1
+    return ''.join(chars)
+
+
+def _alternatives(text):
+    """returns the strings matched by a regex like literal(literal|literal|...), or None if the regex does not have this form"""
+    if not text.endswith(')') or _isEscaped(text, len(text) - 1):
+        literal = _literal(text)
+        return [literal] if literal is not None else None
+    start = text.rfind('(')
+    if start < 0 or _isEscaped(text, start):
+        return None
+    body = text[start + 1:-1]
+    if body.startswith('?:'):
+        body = body[2:]
+    if '\\|' in body:
+        return None
+    prefix = _literal(text[:start])
+    options = [_literal(option) for option in body.split('|')]
+    if prefix is None or None in options:
+        return None
+    return [prefix + option for option in options]
+
+
+class Matcher:
+    """
+    The Matcher class selects the file names complying with a regex, as re.search does, but with string operations
+    when the regex allows it. Names are filtered by listing, to avoid a function call per name.
+    The kind attribute gives the applied strategy:
+    - 'any': every name complies (regex '.*' or '^.*', without $)
+    - 'equal': the name should be one of the literals (regex ^name$ or ^(name1|name2)$)
+    - 'prefix': the name should start with one of the literals (regex ^name or ^name.*)
+    - 'suffix': the name should end with one of the literals (regex like .*\\.csv$ or .*\\.(csv|txt)$)
+    - 'contains': the name should contain the literal (regex without anchor like report)
+    - 'regex': any other regex, searched with re
+
+    Names containing a line feed, and non ascii names when the search is not case sensitive, are always checked with re.
+    """
+
+    def __init__(self, regex: str, caseSensitive=True):
+        """
+        builds the matcher.
+        Parameters
+        ----------
+        regex: regular expression that file names should comply with. Raises re.error if it is not a valid regex.
+
+        caseSensitive: if true, the regex is case sensitive. Default value is True.
+        """
+        self.pattern = regex
+        self.caseSensitive = caseSensitive
+        self.regex = re.compile(regex, 0 if caseSensitive else re.IGNORECASE)
+        self.kind, literals = self._analyze(regex)
+        if not caseSensitive and literals:
+            if not all(literal.isascii() for literal in literals):
+                self.kind, literals = 'regex', None
+            else:
+                literals = [literal.lower() for literal in literals]
+        self.literals = tuple(literals) if literals else ()
+        if self.kind == 'equal':
+            self.literals = frozenset(self.literals)
+        if self.kind == 'contains':
+            self.literals = self.literals[0]
+
+    def _analyze(self, regex):
+        text = regex
+        startAnchored = text.startswith('^')
+        if startAnchored:
+            text = text[1:]
+        if text.startswith('.*'):
+            text = text[2:]
+            startAnchored = False
+        endAnchored = dollar = False
+        if text.endswith('$') and not _isEscaped(text, len(text) - 1):
+            text = text[:-1]
+            endAnchored = dollar = True
+        if text.endswith('.*') and not _isEscaped(text, len(text) - 2):
+            text = text[:-2]
+            endAnchored = False
+        if not text:
+            # with $, as in ^.*.*$, the regex fails on names containing a line feed
+            return ('any', None) if not startAnchored and not dollar else ('regex', None)
+        literals = _alternatives(text)
+        if not literals or '' in literals:
+            return 'regex', None
+        if startAnchored and endAnchored:
+            return 'equal', literals
+        if startAnchored:
+            return 'prefix', literals
+        if endAnchored:
+            return 'suffix', literals
+        if len(literals) == 1:
+            return 'contains', literals
+        return 'regex', None
+
+    def search(self, name):
+        """tells if the name complies with the regex"""
+        return bool(self.filter((name,)))
+
+    def filter(self, names):
+        """returns the list of names complying with the regex, in the same order"""
+        search = self.regex.search
+        literals = self.literals
+        if self.kind == 'regex':
+            return [name for name in names if search(name)]
+        if self.kind == 'any':
+            return list(names)
+        if self.caseSensitive:
+            if self.kind == 'suffix':
+                return [name for name in names if (name.endswith(literals) if '\n' not in name else search(name))]
+            if self.kind == 'prefix':
+                return [name for name in names if (name.startswith(literals) if '\n' not in name else search(name))]
+            if self.kind == 'equal':
+                return [name for name in names if (name in literals if '\n' not in name else search(name))]
+            return [name for name in names if (literals in name if '\n' not in name else search(name))]
+        if self.kind == 'suffix':
+            return [name for name in names
+                    if (name.lower().endswith(literals) if name.isascii() and '\n' not in name else search(name))]
+        if self.kind == 'prefix':
+            return [name for name in names
+                    if (name.lower().startswith(literals) if name.isascii() and '\n' not in name else search(name))]
+        if self.kind == 'equal':
+            return [name for name in names
+                    if (name.lower() in literals if name.isascii() and '\n' not in name else search(name))]
+        return [name for name in names
+                if (literals in name.lower() if name.isascii() and '\n' not in name else search(name))]
@@ -0,0 +1,137 @@
+"""
+This is a directory walker module.
+
+It walks through a directory tree top-down, like os.walk, but the directory listings are fetched by a pool of threads:
+while the caller processes a directory, the listings of the next directories to visit are already requested.
+The tree is still visited in a deterministic order (depth first, names sorted) and the caller may prune the
+subdirectories to visit by modifying the list of subdirectories it receives, as with os.walk.
+
+"""
+import logging, os
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Listing:
+    """
+    The Listing class describes the content of a directory.
+    """
+    __slots__ = ('dirs', 'files', 'links', 'infos')
+
+    def __init__(self, dirs: list, files: list, links=None, infos=None):
+        """
+        builds the object.
+        Parameters
+        ----------
+        dirs: names of the subdirectories
+        files: names of the files
+        links: names of the subdirectories that are symbolic links. They are listed in dirs but the walker does not go into them.
+        infos: dictionary with key = file name and value = (size in bytes, modification timestamp), or None if not known.
+        Files whose metadata couldn't be read are missing.
+        """
+        self.dirs = dirs
+        self.files = files
+        self.links = links if links else ()
+        self.infos = infos
+
+
+def listDirectory(path, stats=False):
+    """
+    lists an os directory with os.scandir and returns a Listing object with sorted names,
+    or None if the directory can't be read.
+    If stats is True, the listing infos give the size and modification time of the files, read from the scandir entries.
+    """
+    dirs, files, links = [], [], []
+    infos = dict() if stats else None
+    try:
+        entries = list(os.scandir(path))
+    except OSError as exp:
+        logging.warning('can\'t list {}: {}'.format(path, exp))
+        return None
+    for entry in entries:
+        try:
+            isDir = entry.is_dir()
+        except OSError:
+            isDir = False
+        if not isDir:
+            files.append(entry.name)
+            if stats:
+                try:
+                    info = entry.stat()
+                    infos[entry.name] = (info.st_size, info.st_mtime)
+                except OSError:
+                    pass
+            continue
+        dirs.append(entry.name)
+        if entry.is_symlink():
+            links.append(entry.name)
+    dirs.sort()
+    files.sort()
+    return Listing(dirs, files, links, infos)
+
+
+def statDirectory(path):
+    """lists an os directory like listDirectory, with the size and modification time of the files"""
+    return listDirectory(path, stats=True)
+
+
+class Walker:
+    """
+    The Walker class walks through a directory tree with a bounded pool of threads listing the directories.
+    """
+
+    def __init__(self, lister=listDirectory, threads=4, join=os.path.join):
+        """
+        builds the walker.
+        Parameters
+        ----------
+        lister: function called with a directory path that returns a Listing object or None if the directory can't be read.
+        Default lister reads os directories.
+
+        threads: number of threads listing directories. If set to 0, directories are listed one after the other
+        by the calling thread.
+
+        join: function joining a directory path and a name. Default is os.path.join.
+        """
+        self.lister = lister
+        self.threads = threads
+        self.join = join
+
+    def walk(self, top, depth=-1, infos=False):
+        """
+        generates the tuples (dirpath, dirs, files) of the directory tree rooted at top, as os.walk does.
+        Subdirectories removed from dirs by the caller are not visited.
+        Parameters
+        ----------
+        top: root directory of the tree
+
+        depth: if set to n (n as an integer), the walk goes down to the n-th subdirectory.
+        Default value is -1, which means that walk doesn't stop while there is no more subfolder.
+
+        infos: if True, the tuples (dirpath, dirs, files, infos) are generated, infos being the listing infos.
+        """
+        pool = ThreadPoolExecutor(self.threads) if self.threads > 0 else None
+        stack = [(top, 0, self._request(pool, top))]
+        try:
+            while stack:
+                path, level, request = stack.pop()
+                listing = request.result() if pool else self.lister(path)
+                if listing is None:
+                    continue
+                dirs = list(listing.dirs)
+                yield (path, dirs, listing.files, listing.infos) if infos else (path, dirs, listing.files)
+                if depth > -1 and level >= depth:
+                    continue
+                children = [self.join(path, name) for name in dirs if name not in listing.links]
+                requests = [(child, level + 1, self._request(pool, child)) for child in children]
+                stack += reversed(requests)
+        finally:
+            for _, _, request in stack:
+                if request:
+                    request.cancel()
+            if pool:
+                pool.shutdown(wait=False)
+
+    def _request(self, pool, path):
+        if not pool:
+            return None
+        return pool.submit(self.lister, path)
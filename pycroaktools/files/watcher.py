@@ -0,0 +1,345 @@
+"""
+This is a file watching module.
+
+It keeps the result of a Finder search up to date while the searched tree changes and reports the changes as
+added, removed and modified events. Only the changed names are checked again, the tree is never searched again.
+On Linux, changes are notified by inotify (used through ctypes). Elsewhere, or when inotify is not available,
+the watched directories are polled: a directory is listed again only when its modification time changed,
+so that a poll costs one stat per watched directory, plus the listing of the changed directories and a stat of their files.
+
+"""
+import ctypes, ctypes.util, errno, logging, os, select, stat, struct, sys, time
+from pycroaktools.files.walker import listDirectory
+from pycroaktools.files.matcher import Matcher
+
+
+class _Folder:
+    """state of a watched directory: its level under the parent, its modification time and its known content"""
+    __slots__ = ('level', 'mtime', 'dirs', 'files', 'wd')
+
+    def __init__(self, level):
+        self.level = level
+        self.mtime = None
+        self.dirs = set()
+        self.files = set()
+        self.wd = None
+
+
+class _Inotify:
+    """minimal inotify binding through ctypes"""
+
+    MODIFY, ATTRIB, CLOSE_WRITE = 0x2, 0x4, 0x8
+    MOVED_FROM, MOVED_TO, CREATE, DELETE = 0x40, 0x80, 0x100, 0x200
+    DELETE_SELF, MOVE_SELF = 0x400, 0x800
+    Q_OVERFLOW, IGNORED, ONLYDIR = 0x4000, 0x8000, 0x01000000
+    MASK = MODIFY | ATTRIB | CLOSE_WRITE | MOVED_FROM | MOVED_TO | CREATE | DELETE | DELETE_SELF | MOVE_SELF | ONLYDIR
+    _HEADER = struct.Struct('iIII')
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, 'inotify is only available on Linux')
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+
+    def add(self, path):
+        """watches the directory path and returns its watch descriptor"""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code), path)
+        return wd
+
+    def remove(self, wd):
+        """stops watching a directory. The directory may already be gone"""
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout):
+        """returns the (wd, mask, name) events available after waiting at most timeout seconds"""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self._HEADER.unpack_from(data, offset)
+                offset += self._HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                events.append((wd, mask, name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Watcher:
+    """
+    The Watcher class keeps the files found by a Finder search in the os directory up to date.
+    The search settings used are parent, regex, caseSensitive, depth and avoidFolders.
+    stopWhenFound is ignored: all the files complying with the regex are watched.
+    It should be closed after use, or used as a context manager, to release the inotify watches.
+    """
+
+    def __init__(self, finder, inotify=None, minAge=2.0, pollFiles=False):
+        """
+        searches the files and starts watching the tree.
+        Parameters
+        ----------
+        finder: Finder object giving the search settings
+
+        inotify: if True, inotify is used and an OSError is raised if it is not available. If False, directories are polled.
+        Default value is None: inotify is used when available, directories are polled otherwise.
+
+        minAge: when polling, directories modified less than minAge seconds before being listed are listed again at next poll,
+        since a change in the same time unit would not change their modification time on some file systems.
+
+        pollFiles: when polling, a file modified in place does not change the modification time of its directory.
+        If True, all the watched files are stat-ed at each poll to report them as modified, each poll then costing
+        one stat per found file. Default value is False: only the files of the changed directories are checked.
+        """
+        self.parent = finder.parent
+        self.depth = finder.depth
+        self.avoidFolders = list(finder.avoidFolders)
+        self.minAge = minAge
+        self.pollFiles = pollFiles
+        self._matcher = Matcher(finder.regex, finder.caseSensitive)
+        self._folders = dict()
+        self._mtimes = dict()
+        self._watches = dict()
+        self._inotify = None
+        if inotify is not False:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as exp:
+                if inotify:
+                    raise
+                logging.info('inotify not available, directories are polled: {}'.format(exp))
+        self.backend = 'inotify' if self._inotify else 'polling'
+        """'inotify' or 'polling', according to the way changes are detected"""
+        self._scan(self.parent, 0, [])
+
+    @property
+    def files(self):
+        """sorted list of the files currently complying with the search"""
+        return sorted(self._mtimes)
+
+    def poll(self, timeout=0):
+        """
+        returns the list of (event, file) tuples describing the changes since the previous call,
+        where event is 'added', 'removed' or 'modified'.
+        Parameters
+        ----------
+        timeout: maximum number of seconds to wait for a change when using inotify. Default value is 0 (no wait).
+        """
+        events = []
+        if self._inotify:
+            self._pollInotify(timeout, events)
+        else:
+            self._pollDirectories(events)
+        return events
+
+    def watch(self, interval=1.0):
+        """
+        generates the (event, file) tuples as the changes happen, forever.
+        Parameters
+        ----------
+        interval: maximum number of seconds between two checks. Default value is 1.
+        """
+        while True:
+            events = self.poll(interval)
+            yield from events
+            if not events and not self._inotify:
+                time.sleep(interval)
+
+    def _scan(self, path, level, events):
+        """lists path and its subdirectories and adds them to the watched tree"""
+        stack = [(path, level)]
+        while stack:
+            path, level = stack.pop()
+            folder = _Folder(level)
+            self._folders[path] = folder
+            self._addWatch(path, folder)
+            folder.mtime = self._stableMtime(path)
+            listing = listDirectory(path)
+            if listing is None:
+                continue
+            for name in self._matcher.filter(listing.files):
+                self._addFile(path, folder, name, events)
+            if self.depth > -1 and level >= self.depth:
+                continue
+            for name in reversed(listing.dirs):
+                if name in listing.links or name in self.avoidFolders:
+                    continue
+                folder.dirs.add(name)
+                stack.append((os.path.join(path, name), level + 1))
+
+    def _forget(self, path, events):
+        """removes path and its subdirectories from the watched tree"""
+        stack = [path]
+        while stack:
+            path = stack.pop()
+            folder = self._folders.pop(path, None)
+            if not folder:
+                continue
+            if folder.wd is not None and self._watches.get(folder.wd) == path:
+                del self._watches[folder.wd]
+                self._inotify.remove(folder.wd)
+            for name in sorted(folder.files):
+                file = os.path.join(path, name)
+                del self._mtimes[file]
+                events.append(('removed', file))
+            stack += [os.path.join(path, name) for name in sorted(folder.dirs, reverse=True)]
+
+    def _addWatch(self, path, folder):
+        if not self._inotify:
+            return
+        try:
+            folder.wd = self._inotify.add(path)
+            self._watches[folder.wd] = path
+        except OSError as exp:
+            logging.warning('can\'t watch {}: {}'.format(path, exp))
+
+    def _addFile(self, path, folder, name, events, mtime=None):
+        file = os.path.join(path, name)
+        if mtime is None:
+            try:
+                mtime = os.stat(file).st_mtime_ns
+            except OSError:
+                return
+        folder.files.add(name)
+        self._mtimes[file] = mtime
+        events.append(('added', file))
+
+    def _stableMtime(self, path):
+        """returns the modification time of a directory, or None if it is too recent to be relied on"""
+        if self._inotify:
+            return None
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        return mtime if time.time() - mtime / 1e9 >= self.minAge else None
+
+    def _update(self, path, name, events):
+        """checks again the entry name of the watched directory path"""
+        folder = self._folders.get(path)
+        if not folder:
+            return
+        child = os.path.join(path, name)
+        try:
+            info = os.stat(child)
+            isLink = os.path.islink(child)
+        except OSError:
+            info = None
+        if info and stat.S_ISDIR(info.st_mode):
+            if name in folder.files:
+                folder.files.discard(name)
+                del self._mtimes[child]
+                events.append(('removed', child))
+            if name in folder.dirs or isLink or name in self.avoidFolders:
+                return
+            if self.depth > -1 and folder.level >= self.depth:
+                return
+            folder.dirs.add(name)
+            self._scan(child, folder.level + 1, events)
+            return
+        if name in folder.dirs:
+            folder.dirs.discard(name)
+            self._forget(child, events)
+        if info is None or not self._matcher.filter((name,)):
+            if name in folder.files:
+                folder.files.discard(name)
+                del self._mtimes[child]
+                events.append(('removed', child))
+            return
+        if name not in folder.files:
+            self._addFile(path, folder, name, events, info.st_mtime_ns)
+        elif self._mtimes[child] != info.st_mtime_ns:
+            self._mtimes[child] = info.st_mtime_ns
+            events.append(('modified', child))
+
+    def _pollInotify(self, timeout, events):
+        changes = dict()
+        for wd, mask, name in self._inotify.read(timeout):
+            if mask & _Inotify.Q_OVERFLOW:
+                logging.warning('inotify queue overflow, {} is searched again'.format(self.parent))
+                self._rescan(events)
+                return
+            if mask & _Inotify.IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            path = self._watches.get(wd)
+            if path is None:
+                continue
+            if mask & (_Inotify.DELETE_SELF | _Inotify.MOVE_SELF):
+                if path == self.parent:
+                    self._forget(path, events)
+                continue
+            if name:
+                changes[(path, name)] = None
+        for path, name in changes:
+            self._update(path, name, events)
+
+    def _pollDirectories(self, events):
+        for path in list(self._folders):
+            folder = self._folders.get(path)
+            if not folder:
+                continue
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime is not None and mtime == folder.mtime:
+                continue
+            folder.mtime = self._stableMtime(path)
+            listing = listDirectory(path)
+            dirs, files = set(), set()
+            if listing:
+                files = set(self._matcher.filter(listing.files))
+                if self.depth == -1 or folder.level < self.depth:
+                    dirs = set(listing.dirs) - set(listing.links) - set(self.avoidFolders)
+            for name in sorted((folder.dirs ^ dirs) | folder.files | files):
+                self._update(path, name, events)
+        if not self.pollFiles:
+            return
+        for file, mtime in list(self._mtimes.items()):
+            try:
+                current = os.stat(file).st_mtime_ns
+            except OSError:
+                continue
+            if current != mtime:
+                self._mtimes[file] = current
+                events.append(('modified', file))
+
+    def _rescan(self, events):
+        """searches the tree again and reports the differences with the known files"""
+        before = self._mtimes
+        for wd in list(self._watches):
+            self._inotify.remove(wd)
+        self._folders, self._mtimes, self._watches = dict(), dict(), dict()
+        self._scan(self.parent, 0, [])
+        events += [('removed', file) for file in sorted(set(before) - set(self._mtimes))]
+        for file in sorted(self._mtimes):
+            if file not in before:
+                events.append(('added', file))
+            elif before[file] != self._mtimes[file]:
+                events.append(('modified', file))
+
+    def close(self):
+        """stops watching the tree"""
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+            self._watches = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
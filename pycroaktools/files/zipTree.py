@@ -0,0 +1,150 @@
+"""
+This is a zip archive browsing module.
+
+It indexes the members of a zip archive as a directory tree, built once from the archive central directory,
+then walks through this tree like os.walk does in os directories. Zip archives nested in the archive may be walked
+into as well, they are read as streams and never extracted on disk.
+
+"""
+import logging, posixpath, time
+from contextlib import contextmanager
+from zipfile import ZipFile, BadZipFile
+
+
+class ZipTree:
+    """
+    The ZipTree class gives a directory view of a zip archive.
+    It should be closed after use, or used as a context manager, to release the archive.
+    """
+
+    def __init__(self, archive, name=None, nested=False):
+        """
+        opens the archive and indexes its members.
+        Parameters
+        ----------
+        archive: path of the zip archive or file object opened in binary mode
+
+        name: path of the archive used to build the paths returned by walk. Default is archive if it is a path.
+
+        nested: if True, zip archives found in the archive are walked into as if they were folders.
+        """
+        self.path = name if name else str(archive)
+        """path of the archive, root of the walked tree"""
+        self.nested = nested
+        self._zipFile = ZipFile(archive)
+        self._dirs = {'': dict()}
+        self._files = {'': []}
+        self._infos = dict()
+        for info in self._zipFile.infolist():
+            self._index(info)
+
+    def _index(self, info):
+        parts = info.filename.strip('/').split('/')
+        isDir = info.filename.endswith('/')
+        parent = ''
+        for part in parts[:-1] if not isDir else parts:
+            self._addDir(parent, part)
+            parent = parent + '/' + part if parent else part
+        if isDir:
+            return
+        name = parts[-1]
+        self._infos['/'.join(parts)] = info
+        if self.nested and name.lower().endswith('.zip'):
+            self._addDir(parent, name)
+        else:
+            self._files[parent].append(name)
+
+    def _addDir(self, parent, name):
+        subdirs = self._dirs[parent]
+        if name in subdirs:
+            return
+        subdirs[name] = None
+        child = parent + '/' + name if parent else name
+        self._dirs[child] = dict()
+        self._files[child] = []
+
+    def getInfo(self, member):
+        """returns the ZipInfo object of a file, given by its path in the archive"""
+        return self._infos.get(member)
+
+    def walk(self, depth=-1, infos=False):
+        """
+        generates the tuples (dirpath, dirs, files) of the archive directory tree, top-down, as os.walk does.
+        Subdirectories removed from dirs by the caller are not visited.
+        Parameters
+        ----------
+        depth: if set to n (n as an integer), the walk goes down to the n-th subdirectory.
+        Default value is -1, which means that walk doesn't stop while there is no more subfolder.
+
+        infos: if True, the tuples (dirpath, dirs, files, infos) are generated, infos being a dictionary with
+        key = file name and value = (size in bytes, modification timestamp) read from the archive central directory.
+        """
+        stack = [('', 0)]
+        while stack:
+            inner, level = stack.pop()
+            if inner in self._infos:
+                yield from self._walkNested(inner, depth - level if depth > -1 else -1, infos)
+                continue
+            dirs = list(self._dirs[inner])
+            dirpath = self.path + '/' + inner if inner else self.path
+            files = self._files[inner]
+            if infos:
+                yield dirpath, dirs, files, {name: self._stat(inner + '/' + name if inner else name) for name in files}
+            else:
+                yield dirpath, dirs, files
+            if depth > -1 and level >= depth:
+                continue
+            stack += [(inner + '/' + name if inner else name, level + 1) for name in reversed(dirs)]
+
+    def _stat(self, member):
+        info = self._infos[member]
+        return info.file_size, time.mktime(info.date_time + (0, 0, -1))
+
+    def _walkNested(self, member, depth, infos):
+        try:
+            with self._zipFile.open(self._infos[member]) as stream, \
+                    ZipTree(stream, self.path + '/' + member, self.nested) as tree:
+                yield from tree.walk(depth, infos)
+        except BadZipFile:
+            logging.warning('{} is not a valid zip archive'.format(self.path + '/' + member))
+
+    @contextmanager
+    def open(self, member):
+        """
+        opens a file of the archive as a binary stream, to be used in a with statement. The file is not extracted.
+        Parameters
+        ----------
+        member: path of the file in the archive, or full path as returned by walk.
+        Files of nested archives are given by the path of the nested archive followed by their path inside it.
+        """
+        if member.startswith(self.path + '/'):
+            member = member[len(self.path) + 1:]
+        if member in self._infos:
+            with self._zipFile.open(self._infos[member]) as stream:
+                yield stream
+            return
+        archive = self._findArchive(member)
+        if not archive:
+            raise KeyError('no file {} in archive {}'.format(member, self.path))
+        with self._zipFile.open(self._infos[archive]) as stream, \
+                ZipTree(stream, self.path + '/' + archive, self.nested) as tree, \
+                tree.open(member[len(archive) + 1:]) as nestedStream:
+            yield nestedStream
+
+    def _findArchive(self, member):
+        parent = posixpath.dirname(member)
+        while parent:
+            if parent in self._infos:
+                return parent
+            parent = posixpath.dirname(parent)
+        return None
+
+    def close(self):
+        """closes the archive"""
+        self._zipFile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
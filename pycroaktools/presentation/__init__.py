@@ -1,4 +1,6 @@
 from pycroaktools.presentation.presentation import Presentation
 from pycroaktools.presentation.slide import Slide
 from pycroaktools.presentation.slideGenerator import SlideGenerator
-from pycroaktools.presentation.slides import Slides
\ No newline at end of file
+from pycroaktools.presentation.slides import Slides
+from pycroaktools.presentation.renderCache import RenderCache
+from pycroaktools.presentation.htmlWriter import HtmlWriter
@@ -0,0 +1,122 @@
+import os, json, logging, tempfile
+from pycroaktools.presentation.slide import Slide
+
+
+class CatalogManifest:
+    """
+    The CatalogManifest class records in a json file the slides found in a folder by Slides.catalog:
+    for each file, its modification time and size, and the id, title, part and version of its slide (or nothing if the file
+    doesn't define a slide). The next catalog of the folder only parses the files added or changed since the manifest was saved,
+    the slides of the other files are built from the manifest.
+    """
+
+    FORMAT = 1
+
+    def __init__(self, path: str, folder: str, images=False):
+        """
+        builds the object and loads the manifest if it exists and was saved for the same folder.
+        ---
+        Parameters:
+        - path: json file of the manifest
+        - folder: cataloged folder
+        - images: True if the files of the folder are images
+        """
+        self.path = path
+        self.folder = folder
+        self.images = images
+        self.entries = dict()
+        """dictionary with key = file path relative to the folder and value = [modification time (ns), size, slide details or None]"""
+        self.changed = False
+        """True if the entries differ from the saved manifest"""
+        self._prefix = os.path.join(folder, '')
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            self.changed = True
+            return
+        except (OSError, ValueError) as e:
+            logging.warning('catalog manifest {} ignored: {}'.format(self.path, e))
+            self.changed = True
+            return
+        if not isinstance(manifest, dict) or not isinstance(manifest.get('files'), dict):
+            logging.warning('catalog manifest {} ignored: not a manifest'.format(self.path))
+            self.changed = True
+            return
+        if manifest.get('format') != self.FORMAT or manifest.get('folder') != os.path.abspath(self.folder) \
+                or manifest.get('images') != self.images:
+            logging.info('catalog manifest {} was saved for another folder, it is rebuilt'.format(self.path))
+            self.changed = True
+            return
+        self.entries = manifest['files']
+
+    def scan(self):
+        """
+        walks the folder and returns the known slides, as a list of (file, Slide or None), and the files to parse,
+        as a list of (file, modification time, size). Files no longer in the folder are forgotten.
+        """
+        known, toParse, seen = [], [], set()
+        stack = ['']
+        while stack:
+            relative = stack.pop()
+            try:
+                entries = list(os.scandir(os.path.join(self.folder, relative)))
+            except OSError as e:
+                logging.warning('folder {} not cataloged: {}'.format(os.path.join(self.folder, relative), e))
+                continue
+            prefix = relative + os.sep if relative else ''
+            for entry in entries:
+                name = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(name)
+                    continue
+                if '.' not in entry.name or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                seen.add(name)
+                recorded = self.entries.get(name)
+                if recorded and recorded[0] == stat.st_mtime_ns and recorded[1] == stat.st_size:
+                    known.append((entry.path, self._slide(entry.path, recorded[2])))
+                else:
+                    toParse.append((entry.path, stat.st_mtime_ns, stat.st_size))
+        removed = self.entries.keys() - seen
+        if removed:
+            self.changed = True
+            for name in removed:
+                del self.entries[name]
+        return known, toParse
+
+    def _slide(self, file, details):
+        if details is None:
+            return None
+        slide = Slide(details[0], details[1], details[2], details[3], isImage=self.images)
+        slide.associateFile(file)
+        return slide
+
+    def record(self, file, mtime, size, slide: Slide):
+        """records the slide (None if no slide) defined by the file with the given modification time (ns) and size"""
+        details = [slide.id, slide.title, slide.part, slide.version] if slide else None
+        name = file[len(self._prefix):] if file.startswith(self._prefix) else os.path.relpath(file, self.folder)
+        self.entries[name] = [mtime, size, details]
+        self.changed = True
+
+    def save(self):
+        """saves the manifest if it changed. The file is written next to path then renamed"""
+        if not self.changed:
+            return
+        manifest = {'format': self.FORMAT, 'folder': os.path.abspath(self.folder), 'images': self.images, 'files': self.entries}
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                file.write(json.dumps(manifest))
+            os.replace(temporary, self.path)
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        self.changed = False
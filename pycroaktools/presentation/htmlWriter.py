@@ -0,0 +1,93 @@
+import os, io, re, gzip, tempfile, threading
+
+
+def _umask():
+    """returns the file mode creation mask of the process, read at import before any thread writes a file"""
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+class HtmlWriter:
+    """
+    The HtmlWriter class writes the html file of a revealjs presentation: the slide sections surrounded by the template parts
+    (assets firstPart.txt and secondPart.txt).
+    The template parts are read once per process. The file is written through a buffer in a temporary file of the output folder,
+    then renamed: a presentation is either fully written or left unchanged.
+    Optionally, the template parts are minified (indentation, blank lines and comments removed, the slide sections are kept as is)
+    and the file is compressed with gzip.
+    """
+
+    _templates = dict()
+    _lock = threading.Lock()
+    _mode = 0o666 & ~_umask()
+    """permissions of the written files: the ones of a file created by open, the temporary file being private"""
+
+    def __init__(self, compress=False, minify=False, bufferSize=1 << 16, compressLevel=6):
+        """
+        builds the object.
+        ---
+        Parameters:
+        - compress: if True, the file is compressed with gzip and '.gz' is appended to its name
+        - minify: if True, the template parts are minified
+        - bufferSize: size of the write buffer, in bytes
+        - compressLevel: gzip compression level, from 1 (fastest) to 9 (smallest)
+        """
+        self.compress = compress
+        self.minify = minify
+        self.bufferSize = bufferSize
+        self.compressLevel = compressLevel
+
+    @classmethod
+    def getTemplate(cls, path: str, minify=False):
+        """returns the content of a template part, read once per process"""
+        key = (path, minify)
+        template = cls._templates.get(key)
+        if template is None:
+            with open(path, mode='r') as file:
+                template = file.read()
+            if minify:
+                template = cls.minifyTemplate(template)
+            with cls._lock:
+                template = cls._templates.setdefault(key, template)
+        return template
+
+    @staticmethod
+    def minifyTemplate(text: str):
+        """removes the html comments (except conditional ones), the indentation and the blank lines of a template part"""
+        text = re.sub(r'<!--(?!\[if).*?-->', '', text, flags=re.S)
+        return ''.join(line.strip() + '\n' for line in text.splitlines() if line.strip())
+
+    def getFile(self, file: str):
+        """returns the file written for the given html file"""
+        return file + '.gz' if self.compress else file
+
+    def write(self, file: str, sections, template):
+        """
+        writes the presentation and returns its file.
+        ---
+        Parameters:
+        - file: html file of the presentation ('.gz' is appended if compressed)
+        - sections: iterable of the html sections of the slides, written one after the other
+        - template: tuple of the template part files written before and after the sections
+        """
+        head, tail = (self.getTemplate(path, self.minify) for path in template)
+        file = self.getFile(file)
+        folder, name = os.path.split(os.path.abspath(file))
+        descriptor, temporary = tempfile.mkstemp(dir=folder, prefix='.' + name, suffix='.tmp')
+        try:
+            with open(descriptor, mode='wb', buffering=self.bufferSize) as raw:
+                stream = gzip.GzipFile(filename='', fileobj=raw, mode='wb', compresslevel=self.compressLevel, mtime=0) \
+                    if self.compress else raw
+                with io.TextIOWrapper(stream) as output:
+                    output.write(head)
+                    for section in sections:
+                        output.write(section)
+                    output.write(tail)
+            os.chmod(temporary, self._mode)
+            os.replace(temporary, file)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return file
@@ -1,5 +1,7 @@
 import os, sys, logging
 from pycroaktools.presentation.slides import Slides
+from pycroaktools.presentation.renderCache import RenderCache
+from pycroaktools.presentation.htmlWriter import HtmlWriter
 import distutils.dir_util as dirutil
 import distutils.file_util as fileutil
 
@@ -13,6 +15,18 @@ class Presentation:
     Finally this presentation is versioned, it relies on the different slide versions.
     """
 
+    def __init__(self, cache: RenderCache = None, writer: HtmlWriter = None):
+        """
+        builds the object.
+        ---
+        Parameters:
+        - cache: RenderCache object keeping the rendered slide sections. Presentations sharing a cache read and format
+        each slide only once. If None (default), sections are rendered for each presentation.
+        - writer: HtmlWriter object writing the html files, to minify or compress them. If None (default), html files are written as is.
+        """
+        self.cache = cache
+        self.writer = writer if writer is not None else HtmlWriter()
+
     def createPresentation(self, presName, slides: Slides, slideIds=None, outputFolder=None, links=None, version=0.0, imageFolder=None):
         """
         save a revealjs presentation in output folder.
@@ -27,32 +41,40 @@ class Presentation:
         - version: version of the presentation (float) = version of the slides if available or previous version if not. Default value is 0.0
         - imageFolder: folder that contains images to add in the presentation
         """
-        logging.info('create presentation {} '.format(
-            os.path.join(outputFolder, presName)))
         if not outputFolder:
             outputFolder = os.getcwd()
-        self._copyLibs(outputFolder)
+        self.copyAssets(slides, outputFolder)
+        return self.writePresentation(presName, slides, slideIds, outputFolder, links, version)
 
+    def copyAssets(self, slides: Slides, outputFolder: str):
+        """
+        copies in output folder the revealjs libs and the images used by the slides.
+        Presentations written in the same folder share these assets, they may be copied only once before writePresentation calls.
+        """
+        self._copyLibs(outputFolder)
         self._copyImages(slides, outputFolder)
 
+    def writePresentation(self, presName, slides: Slides, slideIds=None, outputFolder=None, links=None, version=0.0):
+        """
+        writes the html file of a revealjs presentation in output folder, without copying the assets (see copyAssets).
+        Parameters are the ones of createPresentation. Returns the written file (with a '.gz' extension if the writer compresses it).
+        """
+        if not outputFolder:
+            outputFolder = os.getcwd()
         file = os.path.join(outputFolder, presName)
+        logging.info('create presentation {} '.format(file))
 
         asset1 = self.resource_path(os.path.join('assets', 'firstPart.txt'))
         asset2 = self.resource_path(os.path.join('assets', 'secondPart.txt'))
 
         if not slideIds:
             slideIds = slides.getDefaultSlideOrder()
+        linked = [target for slideId in slideIds if links and links[slideId] for target in links[slideId]]
+        resolved = slides.getSlides(list(slideIds) + linked, version)
 
-        with open(file, mode='w') as output:
-            self._copyInOutput(output, asset1)
-            for slideId in slideIds:
-                htmlLinks = slides.getMarkdownLinks(
-                    links[slideId], version) if links else None
-                self._writeMarkdownSection(output,
-                                           slides.getSlideContents(slideId, version), htmlLinks)
-            self._copyInOutput(output, asset2)
-
-        return file
+        sections = (self._getSection(slides, slideId, version, slides.getMarkdownLinks(links[slideId], version, resolved)
+                                     if links else None, resolved) for slideId in slideIds)
+        return self.writer.write(file, sections, (asset1, asset2))
 
     def resource_path(self, relative_path):
         """ Get absolute path to resource, works for dev and for PyInstaller """
@@ -92,36 +114,26 @@ class Presentation:
         fileutil.copy_file(slide.filename, newFile, update=True)
         slide.filename = newFile
 
-    def _copyInOutput(self, output, content):
-        with open(content, mode='r') as file:
-            output.write(file.read())
-
-    def _writeMarkdownSection(self, output, slideContents, links=None):
-
-        end = '\n</section>'
-        closeContentSection = '\n</textarea>'
+    def _getSection(self, slides: Slides, slideId, version, links=None, resolved=None):
+        if self.cache is None:
+            return self._renderMarkdownSection(slides.getSlideContents(slideId, version, resolved), links)
+        parts = resolved[slideId] if resolved and slideId in resolved else slides.getSlide(slideId, version)
+        key = self.cache.key([parts[part] for part in sorted(parts)] if parts else None, slides.displayTitles, links, slideId)
+        section = self.cache.get(key)
+        if section is None:
+            section = self.cache.put(key, self._renderMarkdownSection(slides.getSlideContents(slideId, version, resolved), links))
+        return section
+
+    _openPart = '\n<section data-markdown>\n<textarea data-template>'
+    _closePart = '\n</textarea></section>\n'
+    _betweenParts = _closePart + _openPart
+
+    def _renderMarkdownSection(self, slideContents, links=None):
+        """returns the html section of a slide, the links being added to its last part. The markup between parts is pre-joined."""
+        linkText = ''.join(link+'\n' for link in links) if links else ''
         if len(slideContents) == 1:
-            content = '<section data-markdown>\n<textarea data-template>'
-            openSection = ''
-            closeSection = ''
-
-        else:
-            content = '<section>\n'
-            openSection = '\n<section data-markdown>\n<textarea data-template>'
-            closeSection = '</section>\n'
-            end = '\n</section>'
-
-        for index, slideContent in enumerate(slideContents):
-            content += openSection
-            content += slideContent
-
-            if index == len(slideContents) - 1 and links:
-                for link in links:
-                    content += link+'\n'
-                    # content+='\n<div><a href="'+link['href']+'">'+link['text']+'</a></div>\n'
-
-            content += closeContentSection
-            content += closeSection
-
-        content += end
-        output.write(content)
+            return '<section data-markdown>\n<textarea data-template>' + slideContents[0] + linkText + '\n</textarea>\n</section>'
+        if not slideContents:
+            return '<section>\n\n</section>'
+        return ''.join(('<section>\n', self._openPart, self._betweenParts.join(slideContents), linkText, self._closePart,
+                        '\n</section>'))
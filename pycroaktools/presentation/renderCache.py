@@ -0,0 +1,140 @@
+import os, hashlib, logging, tempfile, threading
+from collections import OrderedDict
+
+
+class RenderCache:
+    """
+    The RenderCache class keeps the rendered html sections of the slides, so that a slide shared by many presentations
+    is read and formatted only once.
+    A section is identified by the content of its key: for each slide part, its file with its modification time and size
+    (or its text when it has no file), its title, the display of titles and the links of the section.
+    Changing a slide file or its links gives a new key, then the section is rendered again.
+    The most recently used sections are kept in memory up to maxBytes. If a folder is given, sections are also saved
+    in this folder (one file per section) and reused by the next runs.
+    The cache may be shared by threads. In a worker process, a copy starts empty but uses the same folder.
+    """
+
+    def __init__(self, maxBytes=64 * 2 ** 20, folder=None):
+        """
+        builds the cache.
+        Parameters
+        ----------
+        maxBytes: maximum size of the sections kept in memory (number of characters). Default value is 64MB.
+
+        folder: folder where sections are saved between runs. If None (default), sections are only kept in memory.
+        """
+        self.maxBytes = maxBytes
+        self.folder = folder
+        self.hits = 0
+        """number of sections found in memory"""
+        self.diskHits = 0
+        """number of sections read from the folder"""
+        self.misses = 0
+        """number of sections rendered"""
+        self._sections = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def __getstate__(self):
+        return {'maxBytes': self.maxBytes, 'folder': self.folder}
+
+    def __setstate__(self, state):
+        self.__init__(state['maxBytes'], state['folder'])
+
+    @staticmethod
+    def key(parts, displayTitles=False, links=None, slideId=None):
+        """
+        returns the key of a section.
+        Parameters
+        ----------
+        parts: Slide objects of the section, sorted by part number. None if the slide is missing.
+
+        displayTitles: True if the slide titles are displayed
+
+        links: markdown links added to the section
+
+        slideId: id of the slide, needed to tell apart the sections of missing slides
+        """
+        if parts is None:
+            identity = ['missing', slideId]
+        else:
+            identity = []
+            for slide in parts:
+                if slide.filename and not slide.isImage:
+                    try:
+                        stat = os.stat(slide.filename)
+                        version = (stat.st_mtime_ns, stat.st_size)
+                    except OSError:
+                        version = None
+                    identity.append(('file', os.path.abspath(slide.filename), version, slide.title))
+                else:
+                    identity.append(('image' if slide.isImage else 'content', slide.filename, slide.content, slide.title))
+        identity += [bool(displayTitles), tuple(links) if links else None]
+        return hashlib.sha1(repr(identity).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """returns the section of key, or None if it is not cached"""
+        with self._lock:
+            if key in self._sections:
+                self.hits += 1
+                self._sections.move_to_end(key)
+                return self._sections[key]
+        if not self.folder:
+            return None
+        try:
+            with open(self._file(key), encoding='utf-8') as file:
+                section = file.read()
+        except OSError:
+            return None
+        with self._lock:
+            self.diskHits += 1
+        self._keep(key, section)
+        return section
+
+    def put(self, key, section):
+        """caches the section of key and returns it"""
+        with self._lock:
+            self.misses += 1
+        self._keep(key, section)
+        if self.folder:
+            descriptor, temporary = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                    file.write(section)
+                os.replace(temporary, self._file(key))
+            except OSError as e:
+                logging.warning('section {} not saved: {}'.format(key, e))
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+        return section
+
+    def _keep(self, key, section):
+        with self._lock:
+            if key in self._sections:
+                return
+            self._sections[key] = section
+            self._size += len(section)
+            while self._size > self.maxBytes and self._sections:
+                _, evicted = self._sections.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _file(self, key):
+        return os.path.join(self.folder, key + '.html')
+
+    def stats(self):
+        """returns a dictionary with the number of hits, disk hits, misses, sections kept in memory and their size"""
+        with self._lock:
+            return {'hits': self.hits, 'diskHits': self.diskHits, 'misses': self.misses,
+                    'sections': len(self._sections), 'size': self._size}
+
+    def clear(self):
+        """removes the sections kept in memory and in the folder"""
+        with self._lock:
+            self._sections.clear()
+            self._size = 0
+        if self.folder:
+            for name in os.listdir(self.folder):
+                if name.endswith('.html'):
+                    os.remove(os.path.join(self.folder, name))
@@ -15,10 +15,14 @@ class Slide:
     - version: [optional] float number. A slide may have different versions, then a history may be managed (version 0 is older than version 1). If not set, 0.0 is the default value
     """
 
+    _marker = re.compile('---+')
+
     def __init__(self, id: int, title: str, part=0, version=0, isImage=False):
         """builds the object"""
         self.filename = None
         self.content = None
+        self.body = None
+        """content of the associated file without its header, kept when the file was read to catalog the slide"""
         self.isImage = isImage
         self.id = id
         self.title = title
@@ -31,6 +35,7 @@ class Slide:
         A header may be defined in the markdown file. See The Slides object for more information.
         """
         self.filename = filename
+        self.body = None
 
     def setContent(self, text: str):
         """
@@ -43,23 +48,55 @@ class Slide:
 
     def _getFileContent(self):
         """
-        get markdown file content. 
+        get markdown file content. The file is not read again if its body was kept.
         """
+        if self.body is not None:
+            return self.body
         try:
             with open(self.filename) as file:
                 data = file.read()
         except FileNotFoundError:
             error('file {} not found'.format(self.filename))
+        return self.getBody(data)
 
-        groups = re.split('---+', data)
-
-        if len(groups) < 2:
-            return data
+    @staticmethod
+    def splitHeader(chunks):
+        """
+        finds the header of a slide file, i.e. the text between the first two runs of dashes (---), reading the given chunks
+        (lines of an opened file, or the whole text as a single chunk) until the end of the header only.
+        Returns the header and the offset of the body in the text, or (None, None) if there is no header.
+        A run of dashes must not be split between 2 chunks.
+        """
+        header, offset = None, 0
+        for chunk in chunks:
+            position = 0
+            for marker in Slide._marker.finditer(chunk):
+                if header is not None:
+                    header.append(chunk[position:marker.start()])
+                    return ''.join(header), offset + marker.end()
+                header = []
+                position = marker.end()
+            if header is not None:
+                header.append(chunk[position:])
+            offset += len(chunk)
+        if header is None:
+            return None, None
+        return ''.join(header), offset
 
-        content = ''
-        for group in groups[2:]:
-            content += group
-        return content
+    @staticmethod
+    def getBody(data, offset=None):
+        """
+        returns the content of a slide file without its header. The runs of dashes of the body are removed.
+        ---
+        Parameters:
+        - data: content of the file
+        - offset: offset of the body given by splitHeader, if already known
+        """
+        if offset is None:
+            _, offset = Slide.splitHeader((data,))
+            if offset is None:
+                return data
+        return Slide._marker.sub('', data[offset:])
 
     def _getImageContent(self):
         # def createImageSlideContent(self, slides, outputFolder, image):
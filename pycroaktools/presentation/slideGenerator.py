@@ -61,17 +61,29 @@ class SlideGenerator:
         - id: a unique integer. 2 slides can't have the same id, except if it is split.
         - part: [optional] float number. A Slide may be split in multiple parts. In this case, they have the same id but a different part number. If not set, 0.0 is the default value.
         - version: [optional] float number. A slide may have different versions, then a history may be managed (version 0 is older than version 1). If not set, 0.0 is the default value
+
+        The file is read until the end of its header only.
         """
         with open(file) as f:
-            data = f.read()
+            header, _ = Slide.splitHeader(f)
+        return self._fromHeader(file, header)
 
-        contents = re.split('---+', data)
+    def fromText(self, file, data):
+        """
+        same as fromHeader, the content data of the file being already read. The body of the file is kept in the slide,
+        so that the file is not read again to render the slide.
+        """
+        header, offset = Slide.splitHeader((data,))
+        slide = self._fromHeader(file, header)
+        if slide:
+            slide.body = Slide.getBody(data, offset)
+        return slide
 
-        if len(contents) < 2:
+    def _fromHeader(self, file, header):
+        if header is None:
             return
 
         details = dict()
-        header = contents[1]
         headerLines = header.splitlines()
         for line in headerLines:
             splitLine = line.split(':', 1)
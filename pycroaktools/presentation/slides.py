@@ -1,8 +1,9 @@
-from pathlib import Path
-import logging, sys
+import os, logging, sys
 import bisect as bs
+from concurrent.futures import ThreadPoolExecutor
 from pycroaktools.presentation.slide import Slide
 from pycroaktools.presentation.slideGenerator import SlideGenerator
+from pycroaktools.presentation.catalogManifest import CatalogManifest
 from pycroaktools.applauncher import Configuration, error
 
 
@@ -30,34 +31,47 @@ class Slides:
         The part dictionary is defined by key = slide part number and value = Slide object"""
         self.versions = [0]
         """references in a sorted list the different available versions. Some version may be only available for one or more slides."""
+        self.slideVersions = dict()
+        """dictionary with key = slide id and value = sorted list of the versions of this slide"""
         self.displayTitles = displayTitles
         """if True, the slide title is displayedin slides"""
         self.imageFolders = []
 
-    def catalog(self, folder: str, images=False):
+    def catalog(self, folder: str, images=False, workers=None, manifest=None):
         """
         references slides by the files contained in the given folder if they comply with the rules defined in the class definition
+        Each markdown file is read once: its header is parsed and its body is kept in the slide for the rendering.
+        Files are read and parsed by a pool of threads.
         ---
         Parameters:
         - folder: folder where files to produce slides may be found
         - images: indicates if files are image files if True
+        - workers: number of threads reading the files. If None (default), the ThreadPoolExecutor default is used
+        - manifest: json file where the slides found are recorded (see CatalogManifest). If given, only the files added or
+        changed since the previous catalog are parsed, the other slides are built from the manifest.
         """
         logging.info('search for files to create slides...')
 
         if images:
             self.declareResources(folder)
 
-        path = Path(folder).rglob('*.*')
-        files = [x for x in path if x.is_file()]
+        parse = self._imageSlides if images else self._fileSlides
+        known = CatalogManifest(manifest, folder, images) if manifest else None
+        if known:
+            results, toParse = known.scan()
+            files = [file for file, _, _ in toParse]
+            batches = [files[start:start + 64] for start in range(0, len(files), 64)]
+            logging.info('{} files unchanged, {} files to parse'.format(len(results), len(files)))
+        else:
+            results, batches = [], self._listFiles(folder)
+        with ThreadPoolExecutor(workers) as executor:
+            parsed = [result for batch in executor.map(parse, batches) for result in batch]
+        if known:
+            for (file, slide), (_, mtime, size) in zip(parsed, toParse):
+                known.record(file, mtime, size, slide)
+            known.save()
         counter = 0
-        for file in files:
-            slide = None
-            if images:
-                slide = SlideGenerator().fromImage(file)
-            else:
-                slide = SlideGenerator().fromHeader(file)
-                if not slide:
-                    slide = SlideGenerator().fromFilename(file)
+        for file, slide in results + parsed:
             if not slide:
                 logging.warning(
                     'can\'t retrieve useful information from file {}, slide is not created.'.format(file))
@@ -70,6 +84,40 @@ class Slides:
             logging.warning(
                 'no file found to define slides in {}'.format(folder))
 
+    @staticmethod
+    def _listFiles(folder, batchSize=64):
+        """lists by batches the files of the folder and its sub folders whose name has a dot"""
+        batch = []
+        for dirpath, _, files in os.walk(folder):
+            for name in files:
+                if '.' in name:
+                    batch.append(os.path.join(dirpath, name))
+                    if len(batch) == batchSize:
+                        yield batch
+                        batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _imageSlides(files):
+        generator = SlideGenerator()
+        return [(file, generator.fromImage(file)) for file in files]
+
+    @staticmethod
+    def _fileSlides(files):
+        generator = SlideGenerator()
+        results = []
+        for file in files:
+            with open(file) as f:
+                data = f.read()
+            slide = generator.fromText(file, data)
+            if not slide:
+                slide = generator.fromFilename(file)
+                if slide:
+                    slide.body = Slide.getBody(data)
+            results.append((file, slide))
+        return results
+
     def declareResources(self, imageFolder):
         self.imageFolders.append(imageFolder)
 
@@ -78,8 +126,12 @@ class Slides:
         version = slide.version
         if slide.id not in self.slides:
             self.slides[slide.id] = dict()
+            self.slideVersions[slide.id] = []
         if version not in self.slides[slide.id]:
-            bs.insort(self.versions, version)
+            index = bs.bisect_left(self.versions, version)
+            if index == len(self.versions) or self.versions[index] != version:
+                self.versions.insert(index, version)
+            bs.insort(self.slideVersions[slide.id], version)
             self.slides[slide.id][version] = dict()
         self.slides[slide.id][version][slide.part] = slide
 
@@ -109,73 +161,56 @@ class Slides:
 
     def getSlide(self, slideId, version=0):
         """returns a dictionary with key = part number and value = Slide object corresponding to the slide id and its version. 
-        If no version is provided, version 0.0 is returned."""
-        version = float(version)
+        If no version is provided, version 0.0 is returned.
+        If the slide doesn't have this version, its highest version lower than the given one is returned (or its lowest version if none)."""
         slideId = int(slideId)
 
         if slideId not in self.slides:
             logging.warning('slide {} not found'.format(slideId))
             return None
 
-        try:
-            index = self.versions.index(version)
-        except ValueError:
-            index = len(self.versions) - 1
-
-        while version not in self.slides[slideId] and index >= 0:
-            index -= 1
-            version = self.versions[index]
-
-        if index < 0:
-            return self.slides[slideId][next(iter(self.slides[slideId]))]
-
-        return self.slides[slideId][version]
-
-    def _getSlidePart(self, slideId, part, version=0):
-        """returns a slide part corresponding to the slide id, version and part. If no version is provided, version 0.0 is returned."""
-
-        slide = self.getSlide(slideId, version)
-
-        if slide is None:
-            return None
-
-        part = float(part)
-        try:
-            return slide[part]
-        except KeyError:
-            error("part {} not found for slide {}".format(part, slideId))
-
-        return self.slides[version][slideId][part]
+        versions = self.slideVersions[slideId]
+        index = bs.bisect_right(versions, float(version))
+        return self.slides[slideId][versions[max(index - 1, 0)]]
 
-    def getSlideTitle(self, slideId, version=0):
-        """return the slide title by getting the slide title of its first part"""
-        return self.getSlide(slideId, version)[next(iter(self.getSlide(slideId, version)))].title
-
-    def getSlideContents(self, slideId, version=0):
-        """returns slide contents, ie a list of markdown contents. Each item of the sorted list correspond to a slide part.If no version is provided, version 0.0 is returned."""
+    def getSlides(self, slideIds, version=0):
+        """
+        resolves in one pass the slides of a presentation: returns a dictionary with key = slide id and value = the part dictionary
+        returned by getSlide for the given version, or None if the slide is not found.
+        The result may be given to getSlideContents and getMarkdownLinks so that the slides are not resolved again.
+        """
+        resolved = dict()
+        for slideId in slideIds:
+            if slideId not in resolved:
+                resolved[slideId] = self.getSlide(slideId, version)
+        return resolved
+
+    def getSlideTitle(self, slideId, version=0, resolved=None):
+        """return the slide title by getting the slide title of its first part. resolved is an optional result of getSlides"""
+        slide = resolved[slideId] if resolved and slideId in resolved else self.getSlide(slideId, version)
+        return slide[next(iter(slide))].title
+
+    def getSlideContents(self, slideId, version=0, resolved=None):
+        """returns slide contents, ie a list of markdown contents. Each item of the sorted list correspond to a slide part.If no version is provided, version 0.0 is returned.
+        resolved is an optional result of getSlides"""
         contents = []
-        slide = self.getSlide(slideId, version)
+        slide = resolved[slideId] if resolved and slideId in resolved else self.getSlide(slideId, version)
         if slide is None:
             contents.append('slide {} is missing.'.format(slideId))
             return contents
-        parts = list(slide.keys())
-        parts.sort()
-
-        for part in parts:
-            slidePart = self._getSlidePart(slideId, part, version)
-            if slide is None:
-                contents.append(
-                    'slide {} part {} is missing.'.format(slideId, part))
-            contents.append(slidePart.getContent(self.displayTitles))
+
+        for part in sorted(slide):
+            contents.append(slide[part].getContent(self.displayTitles))
         return contents
 
-    def getMarkdownLinks(self, links, version=0):
-        """returns markdown links correponding to the given link ids. It transforms theses ids as html links in a Presentation."""
+    def getMarkdownLinks(self, links, version=0, resolved=None):
+        """returns markdown links correponding to the given link ids. It transforms theses ids as html links in a Presentation.
+        resolved is an optional result of getSlides"""
         if links is None:
             return None
         mdLinks = ["  \n"]
         for slideId in links:
             href = '#/'+str(links[slideId])
-            text = self.getSlideTitle(slideId, version)
+            text = self.getSlideTitle(slideId, version, resolved)
             mdLinks.append('['+text+']('+href+')')
         return mdLinks
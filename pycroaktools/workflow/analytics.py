@@ -0,0 +1,190 @@
+"""
+This is a graph analytics module.
+
+It computes on a Graph the topological order of the nodes, their levels, the cycles and the strongly connected
+components, and answers reachability queries. Results are memoized until the graph changes (its version changes).
+All the algorithms are iterative and linear in the size of the graph. Removed nodes are ignored.
+
+"""
+from collections import OrderedDict
+from pycroaktools.workflow.graph import Graph
+
+
+class Analytics:
+    """
+    The Analytics class gives the structure of a Graph. Nodes are designated by their index in the graph.
+    """
+
+    def __init__(self, graph: Graph, maxReachable=1024):
+        """
+        builds the object.
+        Parameters
+        ----------
+        graph: analyzed graph
+
+        maxReachable: maximum number of nodes whose reachable nodes are kept for isReachable. Default value is 1024.
+        """
+        self.graph = graph
+        self.maxReachable = maxReachable
+        self._version = None
+        self._results = dict()
+        self._reachable = OrderedDict()
+
+    def _memo(self, name, compute):
+        if self._version != self.graph.version:
+            self._version = self.graph.version
+            self._results.clear()
+            self._reachable.clear()
+        if name not in self._results:
+            self._results[name] = compute()
+        return self._results[name]
+
+    def topologicalOrder(self):
+        """
+        returns the node indexes sorted so that each node comes before its successors (Kahn algorithm).
+        Nodes without predecessor come first, in the order of their definition. Raises ValueError if the graph has a cycle.
+        """
+        order = self._memo('order', self._kahn)
+        if len(order) < self.graph.nodeCount():
+            raise ValueError('the graph is not acyclic, cycle: {}'.format(
+                ' -> '.join(str(self.graph.ids[index]) for index in self.findCycle())))
+        return order
+
+    def _kahn(self):
+        remaining = self.graph.inDegrees().tolist()
+        order = [index for index in self.graph.nodes() if not remaining[index]]
+        successors = self.graph.successors
+        for index in order:
+            for nextIndex in successors(index):
+                remaining[nextIndex] -= 1
+                if not remaining[nextIndex]:
+                    order.append(nextIndex)
+        return order
+
+    def isAcyclic(self):
+        """tells if the graph has no cycle"""
+        return len(self._memo('order', self._kahn)) == self.graph.nodeCount()
+
+    def levels(self):
+        """
+        returns the list of the level of each node index: 0 for the nodes without predecessor,
+        otherwise 1 + the highest level of its predecessors. Raises ValueError if the graph has a cycle.
+        """
+        return self._memo('levels', self._levels)
+
+    def _levels(self):
+        levels = [0] * len(self.graph)
+        successors = self.graph.successors
+        for index in self.topologicalOrder():
+            level = levels[index] + 1
+            for nextIndex in successors(index):
+                if levels[nextIndex] < level:
+                    levels[nextIndex] = level
+        return levels
+
+    def findCycle(self):
+        """returns the node indexes of a cycle, the first node being repeated at the end, or None if the graph is acyclic"""
+        return self._memo('cycle', self._findCycle)
+
+    def _findCycle(self):
+        if self.isAcyclic():
+            return None
+        successors = self.graph.successors
+        state = [0] * len(self.graph)
+        for start in self.graph.nodes():
+            if state[start]:
+                continue
+            path, stack = [start], [iter(successors(start))]
+            state[start] = 1
+            while stack:
+                index = next(stack[-1], None)
+                if index is None:
+                    state[path.pop()] = 2
+                    stack.pop()
+                    continue
+                if state[index] == 1:
+                    return path[path.index(index):] + [index]
+                if not state[index]:
+                    state[index] = 1
+                    path.append(index)
+                    stack.append(iter(successors(index)))
+        return None
+
+    def stronglyConnectedComponents(self):
+        """
+        returns the strongly connected components as lists of node indexes (Tarjan algorithm).
+        A node that is not part of a cycle is a component by itself. Components are given in reverse topological order.
+        """
+        return self._memo('components', self._tarjan)
+
+    def _tarjan(self):
+        successors = self.graph.successors
+        count = len(self.graph)
+        numbers, lowest, onStack = [-1] * count, [0] * count, [False] * count
+        stack, components, number = [], [], 0
+        for start in self.graph.nodes():
+            if numbers[start] >= 0:
+                continue
+            work = [(start, iter(successors(start)))]
+            numbers[start] = lowest[start] = number
+            number += 1
+            stack.append(start)
+            onStack[start] = True
+            while work:
+                index, nexts = work[-1]
+                nextIndex = next(nexts, None)
+                if nextIndex is not None:
+                    if numbers[nextIndex] < 0:
+                        numbers[nextIndex] = lowest[nextIndex] = number
+                        number += 1
+                        stack.append(nextIndex)
+                        onStack[nextIndex] = True
+                        work.append((nextIndex, iter(successors(nextIndex))))
+                    elif onStack[nextIndex]:
+                        lowest[index] = min(lowest[index], numbers[nextIndex])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowest[parent] = min(lowest[parent], lowest[index])
+                if lowest[index] == numbers[index]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        onStack[member] = False
+                        component.append(member)
+                        if member == index:
+                            break
+                    components.append(component[::-1])
+        return components
+
+    def isReachable(self, source, target):
+        """
+        tells if target may be reached from source by following the links. A node reaches itself.
+        The nodes reachable from the last maxReachable sources queried are kept. In an acyclic graph,
+        nodes whose level is not higher than the source level are rejected without traversal.
+        """
+        if source == target:
+            return True
+        self._memo('order', self._kahn)
+        if source in self._reachable:
+            self._reachable.move_to_end(source)
+            return target in self._reachable[source]
+        if self.isAcyclic() and self.levels()[target] <= self.levels()[source]:
+            return False
+        reachable = self._reach(source)
+        self._reachable[source] = reachable
+        if len(self._reachable) > self.maxReachable:
+            self._reachable.popitem(last=False)
+        return target in reachable
+
+    def _reach(self, source):
+        successors = self.graph.successors
+        reachable = {source}
+        stack = [source]
+        while stack:
+            for nextIndex in successors(stack.pop()):
+                if nextIndex not in reachable:
+                    reachable.add(nextIndex)
+                    stack.append(nextIndex)
+        return frozenset(reachable)
@@ -1,35 +1,193 @@
+from xml.sax.saxutils import escape, quoteattr
 import networkx as nx
-# import matplotlib.pyplot as py
 from pycroaktools.workflow.workflow import Workflow
 
 
 class Flowchart():
     """
     The Flowchart class makes use of the networkx library to render a Workflow as a graph.
+    Steps are laid out in layers (Sugiyama-style): each step is placed on the layer given by its level in the workflow,
+    links crossing several layers go through virtual points, and steps are ordered in their layer to reduce crossings.
+    The layout is computed once, then used by display, toSvg and toDot.
     """
 
+    sweeps = 8
+    """number of ordering passes (downward then upward) made to reduce the crossings"""
+
     def __init__(self, workflow: Workflow):
         """
-        Builds the object.
+        Builds the object. Nodes of the graph are the step ids, with the step title as title attribute.
         ---
         Parameters:
         - workflow: Workflow object
         """
         self.title = workflow.name
-        self.graph = nx.Graph()
-        paths = workflow.getAllPaths()
-        for path in paths:
-            for i in range(1, len(path), 1):
-                self.graph.add_edge(path[i-1].title, path[i].title)
+        self.graph = nx.DiGraph()
+        ids, titles = workflow.graph.ids, workflow.graph.titles
+        self.graph.add_nodes_from((ids[index], {'title': titles[index]}) for index in workflow.graph.nodes())
+        sources, targets = workflow.graph.edges()
+        self.graph.add_edges_from((ids[source], ids[target]) for source, target in zip(sources.tolist(), targets.tolist()))
+        self._layout = None
+        self._routes = None
 
     def display(self):
+        """draws the flowchart with matplotlib (through networkx), using the layered layout"""
+        nx.draw(self.graph, with_labels=True, labels=nx.get_node_attributes(self.graph, 'title'), node_size=1500,
+                node_color="skyblue", pos={stepId: (x, -y) for stepId, (x, y) in self.layout().items()})
+
+    def layout(self):
+        """returns a dictionary with key = step id and value = (x, y) position, y being the layer of the step"""
+        if self._layout is None:
+            self._computeLayout()
+        return self._layout
+
+    def _levels(self):
+        """
+        returns the layer of each step: 1 + the highest layer of its previous steps, then steps are moved down
+        just above their nearest next step, so that links cross as few layers as possible.
+        In a cyclic workflow, links closing a cycle are ignored
+        """
+        order = self._forwardOrder()
+        levels = dict.fromkeys(self.graph.nodes, 0)
+        for stepId in order:
+            for nextId in self.graph.successors(stepId):
+                if (stepId, nextId) not in self._back:
+                    levels[nextId] = max(levels[nextId], levels[stepId] + 1)
+        for stepId in reversed(order):
+            nexts = [levels[nextId] for nextId in self.graph.successors(stepId) if (stepId, nextId) not in self._back]
+            if nexts:
+                levels[stepId] = min(nexts) - 1
+        return levels
+
+    def _forwardOrder(self):
+        """returns the steps in topological order of the links which do not close a cycle"""
+        self._back = set()
+        state, order = dict(), []
+        for start in self.graph.nodes:
+            if start in state:
+                continue
+            state[start] = 1
+            stack = [(start, iter(self.graph.successors(start)))]
+            while stack:
+                stepId, nexts = stack[-1]
+                nextId = next(nexts, None)
+                if nextId is None:
+                    state[stepId] = 2
+                    order.append(stepId)
+                    stack.pop()
+                elif nextId not in state:
+                    state[nextId] = 1
+                    stack.append((nextId, iter(self.graph.successors(nextId))))
+                elif state[nextId] == 1:
+                    self._back.add((stepId, nextId))
+        return order[::-1]
+
+    def _computeLayout(self):
+        levels = self._levels()
+        uppers = {stepId: [] for stepId in self.graph.nodes}
+        lowers = {stepId: [] for stepId in self.graph.nodes}
+        layerOf = dict(levels)
+        self._routes = dict()
+        for source, target in self.graph.edges:
+            upper, lower = (source, target) if levels[source] <= levels[target] else (target, source)
+            chain = [upper]
+            for layer in range(levels[upper] + 1, levels[lower]):
+                point = ('virtual', source, target, layer)
+                layerOf[point] = layer
+                uppers[point], lowers[point] = [], []
+                chain.append(point)
+            chain.append(lower)
+            for first, second in zip(chain, chain[1:]):
+                if layerOf[first] < layerOf[second]:
+                    lowers[first].append(second)
+                    uppers[second].append(first)
+            self._routes[(source, target)] = chain if upper == source else chain[::-1]
+
+        layers = [[] for _ in range(max(layerOf.values(), default=-1) + 1)]
+        for vertex, layer in layerOf.items():
+            layers[layer].append(vertex)
+        positions = {vertex: position for layer in layers for position, vertex in enumerate(layer)}
+        for sweep in range(self.sweeps):
+            downward = sweep % 2 == 0
+            neighbours = uppers if downward else lowers
+            for layer in (layers[1:] if downward else layers[-2::-1]):
+                layer.sort(key=lambda vertex: self._barycenter(vertex, neighbours, positions))
+                for position, vertex in enumerate(layer):
+                    positions[vertex] = position
+
+        self._points = dict()
+        for y, layer in enumerate(layers):
+            for position, vertex in enumerate(layer):
+                self._points[vertex] = (position - (len(layer) - 1) / 2, y)
+        self._layout = {stepId: self._points[stepId] for stepId in self.graph.nodes}
+
+    @staticmethod
+    def _barycenter(vertex, neighbours, positions):
+        linked = neighbours[vertex]
+        if not linked:
+            return positions[vertex]
+        return sum(positions[other] for other in linked) / len(linked)
+
+    def toSvg(self, path, boxWidth=160, boxHeight=36, xSpace=30, ySpace=50):
+        """
+        writes the flowchart in the SVG file path, using the layered layout. No display is needed.
+        Titles longer than the box are shortened.
+        """
+        layout = self.layout()
+        xs = [x for x, _ in self._points.values()] or [0]
+        layers = max((y for _, y in self._points.values()), default=0) + 1
+        xStep, yStep = boxWidth + xSpace, boxHeight + ySpace
+        width = (max(xs) - min(xs)) * xStep + boxWidth + 2 * xSpace
+        height = layers * yStep - ySpace + 2 * xSpace
+        left = min(xs)
+        center = lambda point: ((point[0] - left) * xStep + xSpace + boxWidth / 2, point[1] * yStep + xSpace + boxHeight / 2)
+        maxLength = max(1, int(boxWidth / 7))
+
+        lines = ['<svg xmlns="http://www.w3.org/2000/svg" width="{:.0f}" height="{:.0f}" font-family="sans-serif" font-size="12">'.format(width, height),
+                 '<title>{}</title>'.format(escape(str(self.title))),
+                 '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="8" markerHeight="8" orient="auto">'
+                 '<path d="M0,0 L10,5 L0,10 z"/></marker></defs>']
+        for (source, target), chain in self._routes.items():
+            points = [center(self._points[vertex]) for vertex in chain]
+            points[0] = self._border(points[0], points[1], boxWidth, boxHeight)
+            points[-1] = self._border(points[-1], points[-2], boxWidth, boxHeight)
+            lines.append('<polyline points="{}" fill="none" stroke="black" marker-end="url(#arrow)"/>'.format(
+                ' '.join('{:.1f},{:.1f}'.format(x, y) for x, y in points)))
+        for stepId, point in layout.items():
+            x, y = center(point)
+            title = str(self.graph.nodes[stepId]['title'])
+            label = title if len(title) <= maxLength else title[:maxLength - 1] + '\u2026'
+            lines.append('<g id={}><title>{}</title><rect x="{:.1f}" y="{:.1f}" width="{}" height="{}" rx="6" fill="skyblue" stroke="black"/>'
+                         '<text x="{:.1f}" y="{:.1f}" text-anchor="middle" dominant-baseline="middle">{}</text></g>'.format(
+                             quoteattr('step' + str(stepId)), escape(title), x - boxWidth / 2, y - boxHeight / 2,
+                             boxWidth, boxHeight, x, y, escape(label)))
+        lines.append('</svg>')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
 
-        posx = [nx.spectral_layout(self.graph), nx.fruchterman_reingold_layout(self.graph), nx.circular_layout(
-            self.graph), nx.random_layout(self.graph),  nx.spring_layout(self.graph)]
-        # posx = [nx.fruchterman_reingold_layout(self.graph), nx.spring_layout(self.graph)]
+    @staticmethod
+    def _border(point, towards, boxWidth, boxHeight):
+        """returns the point where the line from the center of a box to towards leaves the box"""
+        x, y = point
+        dx, dy = towards[0] - x, towards[1] - y
+        if not dx and not dy:
+            return point
+        scale = min(boxWidth / 2 / abs(dx) if dx else float('inf'), boxHeight / 2 / abs(dy) if dy else float('inf'))
+        return x + dx * scale, y + dy * scale
 
-        for pos in posx:
-            nx.draw(self.graph, with_labels=True, node_size=1500,
-                    node_color="skyblue", pos=pos)
-            # py.title(self.title)
-            # py.show()
+    def toDot(self, path):
+        """writes the flowchart in the Graphviz DOT file path, the steps of a same layer being kept on the same rank"""
+        quote = lambda value: '"' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        layers = dict()
+        for stepId, (_, y) in self.layout().items():
+            layers.setdefault(y, []).append(stepId)
+        lines = ['digraph {} {{'.format(quote(self.title)), '    node [shape=box, style="rounded,filled", fillcolor=skyblue];']
+        for stepId, title in self.graph.nodes(data='title'):
+            lines.append('    {} [label={}];'.format(quote(stepId), quote(title)))
+        for source, target in self.graph.edges:
+            lines.append('    {} -> {};'.format(quote(source), quote(target)))
+        for y in sorted(layers):
+            lines.append('    {{rank=same; {}}}'.format(' '.join(quote(stepId) + ';' for stepId in sorted(layers[y], key=self.layout().get))))
+        lines.append('}')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
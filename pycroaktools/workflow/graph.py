@@ -0,0 +1,322 @@
+"""
+This is a compact graph module.
+
+It stores the steps of a workflow and their links in NumPy arrays, in compressed sparse row (CSR) form:
+the next steps of the node i are targets[offsets[i]:offsets[i+1]], and the previous steps are stored the same way.
+Nodes are numbered in the order of their definition and keep their number, a removed node leaving an unused number.
+The links of the nodes changed after the arrays were built are kept in an overlay of Python lists (one list per
+changed node and direction), until compact() merges them into the arrays. Each change is then O(degree).
+The arrays are mirrored by Python lists at the first traversal, slicing a list being faster than slicing an array.
+
+"""
+from itertools import chain
+import numpy as np
+
+
+class Graph:
+    """
+    The Graph class is the storage of a workflow: node ids and titles, forward and reverse adjacency.
+    Its version attribute is increased by each change, so that derived results can be invalidated.
+    """
+
+    def __init__(self, ids=(), titles=(), sources=(), targets=()):
+        """
+        builds the graph.
+        Parameters
+        ----------
+        ids: step id of each node. A node is then designated by its index in ids.
+
+        titles: title of each node
+
+        sources, targets: indexes of the origin and the end of each link, in the order of definition.
+        Duplicated links are kept once.
+        """
+        self.ids = list(ids)
+        """step id of each node"""
+        self.titles = list(titles)
+        """title of each node"""
+        self.indexes = {stepId: index for index, stepId in enumerate(self.ids)}
+        """dictionary with key = step id and value = node index"""
+        self.version = 0
+        """number of changes made since the graph was built"""
+        self.removed = set()
+        """indexes of the removed nodes. A removed node has no link and its index is not reused"""
+        self.views = dict()
+        """dictionary with key = node index and value = the Step object viewing this node, created at its first access"""
+        self.owned = False
+        """True if an object keeps a reference to the graph (e.g. a Workflow): the graph is never merged into another one"""
+        self._build(np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64))
+
+    @classmethod
+    def fromArrays(cls, ids, titles, forwardOffsets, forwardTargets, reverseOffsets, reverseSources):
+        """
+        returns a graph using the given compressed sparse row arrays as they are (e.g. memory mapped arrays).
+        Parameters
+        ----------
+        ids, titles: step id and title of each node
+
+        forwardOffsets, forwardTargets: next nodes of each node, the next nodes of the node i being
+        forwardTargets[forwardOffsets[i]:forwardOffsets[i+1]]
+
+        reverseOffsets, reverseSources: previous nodes of each node, stored the same way
+        """
+        graph = cls()
+        graph.ids = list(ids)
+        graph.titles = titles
+        graph.indexes = dict(zip(graph.ids, range(len(graph.ids))))
+        graph._baseCount = len(graph.ids)
+        graph._forwardOffsets, graph._forwardTargets = forwardOffsets, forwardTargets
+        graph._reverseOffsets, graph._reverseSources = reverseOffsets, reverseSources
+        graph._reset()
+        return graph
+
+    def _build(self, sources, targets):
+        count = len(self.ids)
+        if len(sources):
+            _, first = np.unique(sources * count + targets, return_index=True)
+            first.sort()
+            sources, targets = sources[first], targets[first]
+        dtype = np.int32 if count < 2 ** 31 else np.int64
+        self._baseCount = count
+        self._forwardOffsets, self._forwardTargets = self._csr(sources, targets, count, dtype)
+        self._reverseOffsets, self._reverseSources = self._csr(targets, sources, count, dtype)
+        self._reset()
+
+    def _reset(self):
+        """resets the list mirrors of the arrays (built by _lists and _viewLists) and the overlay"""
+        self._forwardLists = None
+        self._reverseLists = None
+        self._forwardViews = None
+        self._reverseViews = None
+        self._nexts = dict()
+        self._previouses = dict()
+
+    def _lists(self, forward):
+        """returns the offsets and the values of the arrays of a direction as Python lists, built at the first call"""
+        if forward:
+            if self._forwardLists is None:
+                self._forwardLists = self._forwardOffsets.tolist(), self._forwardTargets.tolist()
+            return self._forwardLists
+        if self._reverseLists is None:
+            self._reverseLists = self._reverseOffsets.tolist(), self._reverseSources.tolist()
+        return self._reverseLists
+
+    def nextViews(self, index, view):
+        """
+        returns the list of the views (see views) of the next nodes of a node. view(graph, index) creates and registers
+        a missing view. The views of all the nodes are created at the first call, then the lists are sliced from a list of
+        views mirroring the arrays.
+        """
+        if index in self._nexts or index >= self._baseCount:
+            return self._overlayViews(self._nexts, index, view)
+        starts, linked = self._forwardViews or self._viewLists(True, view)
+        return linked[starts[index]:starts[index + 1]]
+
+    def previousViews(self, index, view):
+        """returns the list of the views of the previous nodes of a node, see nextViews"""
+        if index in self._previouses or index >= self._baseCount:
+            return self._overlayViews(self._previouses, index, view)
+        starts, linked = self._reverseViews or self._viewLists(False, view)
+        return linked[starts[index]:starts[index + 1]]
+
+    def _overlayViews(self, overlay, index, view):
+        views = self.views
+        return [views.get(node) or view(self, node) for node in overlay.get(index, ())]
+
+    def _viewLists(self, forward, view):
+        views = self.views
+        if len(views) < self.nodeCount():
+            for index in self.nodes():
+                if index not in views:
+                    view(self, index)
+        starts, values = self._lists(forward)
+        lists = starts, [views.get(index) for index in values]
+        if forward:
+            self._forwardViews = lists
+        else:
+            self._reverseViews = lists
+        return lists
+
+    @staticmethod
+    def _csr(keys, values, count, dtype):
+        """returns the offsets and the values sorted by key, the order of definition being kept for a same key"""
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=count), out=offsets[1:])
+        return offsets, values[np.argsort(keys, kind='stable')].astype(dtype)
+
+    def __len__(self):
+        """returns the number of node indexes, removed nodes included"""
+        return len(self.ids)
+
+    def nodeCount(self):
+        """returns the number of nodes, removed nodes excluded"""
+        return len(self.ids) - len(self.removed)
+
+    def nodes(self):
+        """returns the indexes of the nodes, removed nodes excluded, in the order of their definition"""
+        if not self.removed:
+            return range(len(self.ids))
+        removed = self.removed
+        return [index for index in range(len(self.ids)) if index not in removed]
+
+    def addNode(self, stepId, title):
+        """adds a node and returns its index. Raises ValueError if the step id is already used"""
+        if stepId in self.indexes:
+            raise ValueError('step {} is already defined'.format(stepId))
+        index = len(self.ids)
+        self.ids.append(stepId)
+        self.titles.append(title)
+        self.indexes[stepId] = index
+        self.version += 1
+        return index
+
+    def removeNode(self, index):
+        """removes a node and its links. Its step id may then be used by a new node"""
+        if index in self.removed:
+            raise ValueError('step {} is already removed'.format(self.ids[index]))
+        for target in self.successors(index):
+            self.removeEdge(index, target)
+        for source in self.predecessors(index):
+            self.removeEdge(source, index)
+        del self.indexes[self.ids[index]]
+        self.removed.add(index)
+        self.views.pop(index, None)
+        self.version += 1
+
+    def merge(self, other):
+        """
+        moves the nodes and the links of another graph at the end of this graph and returns the index offset of its nodes.
+        The Step objects viewing the nodes of the other graph are moved with them, the other graph is left empty.
+        Raises ValueError if a step id is used by both graphs or if the other graph is owned.
+        """
+        if other.owned:
+            raise ValueError('an owned graph can\'t be merged into another graph')
+        common = self.indexes.keys() & other.indexes.keys()
+        if common:
+            raise ValueError('step {} is defined in both workflows'.format(min(common)))
+        offset = len(self.ids)
+        for index in range(len(other.ids)):
+            self.ids.append(other.ids[index])
+            self.titles.append(other.titles[index])
+        self.indexes.update((stepId, index + offset) for stepId, index in other.indexes.items())
+        self.removed.update(index + offset for index in other.removed)
+        for index in range(len(other.ids)):
+            if other.outDegree(index):
+                self._nexts[index + offset] = [target + offset for target in other.successors(index)]
+            if other.inDegree(index):
+                self._previouses[index + offset] = [source + offset for source in other.predecessors(index)]
+        for index, step in other.views.items():
+            step.graph, step.index = self, index + offset
+            self.views[index + offset] = step
+        self.version += 1
+        other.__init__()
+        return offset
+
+    def addEdge(self, source, target):
+        """adds a link from the node source to the node target. Returns False if the link already exists"""
+        if source in self.removed or target in self.removed:
+            raise ValueError('step {} or step {} is removed'.format(self.ids[source], self.ids[target]))
+        if target in self.successors(source):
+            return False
+        self._changed(self._nexts, source, True).append(target)
+        self._changed(self._previouses, target, False).append(source)
+        self.version += 1
+        return True
+
+    def removeEdge(self, source, target):
+        """removes the link from the node source to the node target. Returns False if there is no such link"""
+        if target not in self.successors(source):
+            return False
+        self._changed(self._nexts, source, True).remove(target)
+        self._changed(self._previouses, target, False).remove(source)
+        self.version += 1
+        return True
+
+    def _changed(self, overlay, index, forward):
+        """returns the overlay list of a node, built from the arrays at the first change"""
+        if index not in overlay:
+            if index < self._baseCount:
+                starts, values = self._lists(forward)
+                overlay[index] = values[starts[index]:starts[index + 1]]
+            else:
+                overlay[index] = []
+        return overlay[index]
+
+    def successors(self, index):
+        """returns the list of the indexes of the next nodes of a node, in the order of definition"""
+        if index in self._nexts:
+            return list(self._nexts[index])
+        if index >= self._baseCount:
+            return []
+        starts, targets = self._forwardLists or self._lists(True)
+        return targets[starts[index]:starts[index + 1]]
+
+    def predecessors(self, index):
+        """returns the list of the indexes of the previous nodes of a node, in the order of definition"""
+        if index in self._previouses:
+            return list(self._previouses[index])
+        if index >= self._baseCount:
+            return []
+        starts, sources = self._reverseLists or self._lists(False)
+        return sources[starts[index]:starts[index + 1]]
+
+    def outDegree(self, index):
+        """returns the number of next nodes of a node"""
+        if index in self._nexts:
+            return len(self._nexts[index])
+        if index >= self._baseCount:
+            return 0
+        starts = (self._forwardLists or self._lists(True))[0]
+        return starts[index + 1] - starts[index]
+
+    def inDegree(self, index):
+        """returns the number of previous nodes of a node"""
+        if index in self._previouses:
+            return len(self._previouses[index])
+        if index >= self._baseCount:
+            return 0
+        starts = (self._reverseLists or self._lists(False))[0]
+        return starts[index + 1] - starts[index]
+
+    def inDegrees(self):
+        """returns the array of the number of previous nodes of each node"""
+        return self._degrees(self._reverseOffsets, self._previouses)
+
+    def outDegrees(self):
+        """returns the array of the number of next nodes of each node"""
+        return self._degrees(self._forwardOffsets, self._nexts)
+
+    def _degrees(self, offsets, overlay):
+        degrees = np.zeros(len(self.ids), dtype=np.int64)
+        degrees[:self._baseCount] = np.diff(offsets)
+        for index, values in overlay.items():
+            degrees[index] = len(values)
+        return degrees
+
+    def edges(self):
+        """returns the arrays of the sources and the targets of all the links, sorted by source"""
+        counts = self.outDegrees()
+        sources = np.repeat(np.arange(len(self.ids), dtype=np.int64), counts)
+        if not self._nexts:
+            return sources, self._forwardTargets.astype(np.int64)
+        nexts = chain.from_iterable(self.successors(index) for index in range(len(self.ids)))
+        return sources, np.fromiter(nexts, dtype=np.int64, count=int(counts.sum()))
+
+    def compact(self):
+        """merges the links added since the graph was built into the arrays, keeping their order"""
+        count = len(self.ids)
+        if not self._nexts and self._baseCount == count:
+            return
+        dtype = np.int32 if count < 2 ** 31 else np.int64
+        forward = [self.successors(index) for index in range(count)]
+        reverse = [self.predecessors(index) for index in range(count)]
+        self._forwardOffsets, self._forwardTargets = self._pack(forward, dtype)
+        self._reverseOffsets, self._reverseSources = self._pack(reverse, dtype)
+        self._baseCount = count
+        self._reset()
+
+    @staticmethod
+    def _pack(lists, dtype):
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(values) for values in lists], out=offsets[1:])
+        return offsets, np.fromiter(chain.from_iterable(lists), dtype=dtype, count=int(offsets[-1]))
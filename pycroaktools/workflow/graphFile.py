@@ -0,0 +1,156 @@
+"""
+This is a graph file module.
+
+It saves a Graph in a binary file and loads it back, memory mapped: the link arrays are used as stored in the file,
+without parsing. The file holds a small JSON header followed by aligned little-endian arrays:
+- ids: step id of each node (int64)
+- forwardOffsets, forwardTargets, reverseOffsets, reverseSources: the links in compressed sparse row form
+- titleOffsets, titleData: string table of the titles, UTF-8 encoded, the title of the node i being
+  titleData[titleOffsets[i]:titleOffsets[i+1]]. Titles are decoded when read.
+
+"""
+import json, os, tempfile
+from collections.abc import Sequence
+import numpy as np
+from pycroaktools.workflow.graph import Graph
+
+MAGIC = b'PYCROAKWF'
+FORMAT = 1
+_ALIGNMENT = 8
+
+
+class StringTable(Sequence):
+    """
+    The StringTable class is a list of strings stored in a UTF-8 buffer and decoded on access.
+    Changed and appended strings are kept aside, the buffer being read only.
+    """
+
+    def __init__(self, offsets, data):
+        """
+        builds the table.
+        Parameters
+        ----------
+        offsets: array of the start of each string in data, followed by the end of the last one
+
+        data: buffer of the UTF-8 encoded strings
+        """
+        self._offsets = memoryview(np.ascontiguousarray(offsets, dtype=np.int64))
+        self._data = memoryview(data)
+        self._count = len(offsets) - 1
+        self._changed = dict()
+        self._appended = []
+
+    def __len__(self):
+        return self._count + len(self._appended)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        index = self._position(index)
+        if index >= self._count:
+            return self._appended[index - self._count]
+        if index in self._changed:
+            return self._changed[index]
+        return str(self._data[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+    def __setitem__(self, index, value):
+        index = self._position(index)
+        if index >= self._count:
+            self._appended[index - self._count] = value
+        else:
+            self._changed[index] = value
+
+    def _position(self, index):
+        position = index + len(self) if index < 0 else index
+        if not 0 <= position < len(self):
+            raise IndexError('string table index out of range')
+        return position
+
+    def append(self, value):
+        self._appended.append(value)
+
+
+def saveGraph(graph: Graph, path, name=None):
+    """
+    saves the graph in the file path, with an optional name. Removed nodes are not saved: the other nodes are numbered again.
+    The file is written next to path then renamed, so that a memory mapped version of path stays valid.
+    """
+    graph.compact()
+    nodes = np.asarray(graph.nodes(), dtype=np.int64)
+    renumber = None
+    if graph.removed:
+        renumber = np.full(len(graph), -1, dtype=np.int64)
+        renumber[nodes] = np.arange(len(nodes))
+    titles = [graph.titles[index].encode('utf-8') for index in nodes.tolist()]
+    titleOffsets = np.zeros(len(titles) + 1, dtype=np.int64)
+    np.cumsum([len(title) for title in titles], out=titleOffsets[1:])
+    arrays = {
+        'ids': np.asarray([graph.ids[index] for index in nodes.tolist()], dtype=np.int64),
+        'forwardOffsets': _keep(graph._forwardOffsets, nodes),
+        'forwardTargets': _renumber(graph._forwardTargets, renumber),
+        'reverseOffsets': _keep(graph._reverseOffsets, nodes),
+        'reverseSources': _renumber(graph._reverseSources, renumber),
+        'titleOffsets': titleOffsets,
+        'titleData': np.frombuffer(b''.join(titles), dtype=np.uint8)}
+
+    header = {'format': FORMAT, 'name': name, 'arrays': dict()}
+    offset = 0
+    for key, array in arrays.items():
+        array = arrays[key] = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+        header['arrays'][key] = [offset, array.dtype.str, len(array)]
+        offset += _aligned(array.nbytes)
+    headerData = json.dumps(header).encode('utf-8')
+    start = _aligned(len(MAGIC) + 4 + len(headerData))
+
+    folder = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(MAGIC + len(headerData).to_bytes(4, 'little') + headerData)
+            file.write(bytes(start - file.tell()))
+            for array in arrays.values():
+                file.write(array.tobytes())
+                file.write(bytes(_aligned(array.nbytes) - array.nbytes))
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def loadGraph(path, mmap=True):
+    """
+    returns the graph and the name saved in the file path. Raises ValueError if path is not a graph file.
+    With mmap True (default), the arrays are mapped from the file instead of being read:
+    the file must not be modified in place while the graph is used (saveGraph replaces it).
+    """
+    data = np.memmap(path, dtype=np.uint8, mode='r') if mmap else np.fromfile(path, dtype=np.uint8)
+    if bytes(data[:len(MAGIC)]) != MAGIC:
+        raise ValueError('{} is not a workflow file'.format(path))
+    length = int.from_bytes(bytes(data[len(MAGIC):len(MAGIC) + 4]), 'little')
+    header = json.loads(bytes(data[len(MAGIC) + 4:len(MAGIC) + 4 + length]).decode('utf-8'))
+    if header.get('format') != FORMAT:
+        raise ValueError('{} has the unsupported format {}'.format(path, header.get('format')))
+    start = _aligned(len(MAGIC) + 4 + length)
+    arrays = dict()
+    for key, (offset, dtype, count) in header['arrays'].items():
+        dtype = np.dtype(dtype)
+        offset += start
+        arrays[key] = data[offset:offset + count * dtype.itemsize].view(dtype)
+    graph = Graph.fromArrays(arrays['ids'].tolist(), StringTable(arrays['titleOffsets'], arrays['titleData']),
+                             arrays['forwardOffsets'], arrays['forwardTargets'],
+                             arrays['reverseOffsets'], arrays['reverseSources'])
+    return graph, header.get('name')
+
+
+def _keep(offsets, nodes):
+    """returns the offsets of the given nodes, the removed nodes having no link"""
+    return np.append(offsets[nodes], offsets[-1]).astype(np.int64)
+
+
+def _renumber(values, renumber):
+    return values if renumber is None else renumber[values].astype(values.dtype)
+
+
+def _aligned(size):
+    return -(-size // _ALIGNMENT) * _ALIGNMENT
@@ -0,0 +1,116 @@
+"""
+This is a path cache module.
+
+It memoizes the descending paths (following next steps) and the ascending paths (following previous steps)
+starting from each node of a Graph. Paths are stored as shared tails: a path is a (node, tail) pair, tail being
+a path of the cached result of the following node, so that the paths of a node reuse the paths of its neighbours
+instead of copying them. The cache keeps the most recently used results and is cleared when the graph changes.
+
+"""
+from collections import OrderedDict
+from pycroaktools.workflow.graph import Graph
+
+
+class PathCache:
+    """
+    The PathCache class answers descending and ascending path queries on a Graph. Nodes are designated by their index.
+    """
+
+    def __init__(self, graph: Graph, maxTails=1000000):
+        """
+        builds the cache.
+        Parameters
+        ----------
+        graph: graph whose paths are cached
+
+        maxTails: maximum number of tails kept. When exceeded, the least recently used results are evicted.
+        Default value is 1000000.
+        """
+        self.graph = graph
+        self.maxTails = maxTails
+        self.hits = 0
+        """number of queries answered from the cache"""
+        self.misses = 0
+        """number of results computed"""
+        self.evictions = 0
+        """number of results evicted to respect maxTails"""
+        self.invalidations = 0
+        """number of times the cache was cleared because the graph changed"""
+        self._version = graph.version
+        self._results = OrderedDict()
+        self._tails = 0
+
+    def descending(self, index):
+        """returns the paths starting from the node index and following the successors down to the nodes without successor"""
+        return self._paths(index, self.graph.successors, True)
+
+    def ascending(self, index):
+        """returns the paths starting from the node index and following the predecessors up to the nodes without predecessor"""
+        return self._paths(index, self.graph.predecessors, False)
+
+    @staticmethod
+    def unfold(path):
+        """returns the list of the node indexes of a path given as (node, tail) pairs"""
+        indexes = []
+        while path:
+            index, path = path
+            indexes.append(index)
+        return indexes
+
+    def _paths(self, index, neighbours, forward):
+        if self._version != self.graph.version:
+            self.clear()
+            self.invalidations += 1
+            self._version = self.graph.version
+        key = (forward, index)
+        if key in self._results:
+            self.hits += 1
+            self._results.move_to_end(key)
+            return self._results[key]
+        computed = dict()
+        following = neighbours(index)
+        stack = [(index, following, iter(following))]
+        pending = {index}
+        while stack:
+            current, following, remaining = stack[-1]
+            node = next(remaining, None)
+            if node is not None:
+                if node in computed:
+                    continue
+                if (forward, node) in self._results:
+                    computed[node] = self._results[(forward, node)]
+                    continue
+                if node in pending:
+                    raise ValueError('the graph has a cycle through node {}'.format(self.graph.ids[node]))
+                pending.add(node)
+                nodeFollowing = neighbours(node)
+                stack.append((node, nodeFollowing, iter(nodeFollowing)))
+                continue
+            stack.pop()
+            pending.discard(current)
+            if not following:
+                paths = ((current, None),)
+            else:
+                paths = tuple((current, tail) for node in following for tail in computed[node])
+            computed[current] = paths
+            self._store((forward, current), paths)
+        return computed[index]
+
+    def _store(self, key, paths):
+        self.misses += 1
+        self._results[key] = paths
+        self._tails += len(paths)
+        while self._tails > self.maxTails and len(self._results) > 1:
+            _, evicted = self._results.popitem(last=False)
+            self._tails -= len(evicted)
+            self.evictions += 1
+
+    def stats(self):
+        """returns a dictionary with the number of hits, misses, evictions, invalidations, cached results and tails"""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations, 'entries': len(self._results), 'tails': self._tails}
+
+    def clear(self):
+        """removes all the cached results"""
+        self._results.clear()
+        self._tails = 0
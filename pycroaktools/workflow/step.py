@@ -1,58 +1,153 @@
+from collections.abc import MutableMapping
+from pycroaktools.workflow.graph import Graph
+
+
 class Step:
     """
-    The Step class defines a step in a workflow. 
+    The Step class defines a step in a workflow.
     It may be seen as a node in a graph with oriented edges: previous and next steps.
     Since a workflow is an oriented graph, step may be defined as first (ie without previous step)
     or last (ie wihtout next step)
+    A step is a lightweight view on a node of a Graph object, which stores the steps and their links.
+    A node has a single Step object (see Graph.views).
     """
+    __slots__ = ('graph', 'index')
 
     def __init__(self, stepId: int, title=None):
         """
-        Builds the object.
+        Builds the object. The step is stored in a new graph, which is merged with the graph of the steps it is linked to.
         ---
         Parameters:
         - stepId: unique id for a step in a workflow
         """
-        self.stepId = stepId
+        self.graph = Graph()
+        """graph storing the step"""
+        self.index = self.graph.addNode(stepId, title if title else 'step '+str(stepId))
+        """index of the step in the graph"""
+        self.graph.views[self.index] = self
+
+    @staticmethod
+    def view(graph: Graph, index: int):
+        """returns the step stored at index in graph"""
+        step = graph.views.get(index)
+        if step is None:
+            step = _new(Step)
+            step.graph = graph
+            step.index = index
+            graph.views[index] = step
+        return step
+
+    @property
+    def stepId(self):
         """ id of the step"""
-        self.nexts = dict()
-        """dictionary with keys = id of next steps and values = next steps as Step object"""
-        self.previouses = dict()
-        """dictionary with keys = id of previous steps and values = previous steps as Step object"""
-        self.title = title if title else 'step '+str(stepId)
+        return self.graph.ids[self.index]
+
+    @property
+    def title(self):
+        """title of the step"""
+        return self.graph.titles[self.index]
+
+    @title.setter
+    def title(self, title):
+        self.graph.titles[self.index] = title
+
+    @property
+    def nexts(self):
+        """dictionary with keys = id of next steps and values = next steps as Step object.
+        Adding or deleting an item adds or removes the link in the graph."""
+        return _Links(self, True)
+
+    @property
+    def previouses(self):
+        """dictionary with keys = id of previous steps and values = previous steps as Step object.
+        Adding or deleting an item adds or removes the link in the graph."""
+        return _Links(self, False)
+
+    def _linked(self, forward):
+        """returns the dictionary of the next (or previous) steps"""
+        linked = self.getNexts() if forward else self.getPreviouses()
+        return {step.stepId: step for step in linked}
 
     def getNexts(self):
         """
         get list of ids correponding to next steps
         """
-        return list(self.nexts.values())
+        return self.graph.nextViews(self.index, _view)
 
     def getPreviouses(self):
         """
         get list of ids correponding to previous steps
         """
-        return list(self.previouses.values())
+        return self.graph.previousViews(self.index, _view)
 
     def addNext(self, nextStep):
         """
-        add a next step to the nexts dictionary. Doing that, it adds this step as previous to the given nextStep
+        add a next step to the nexts dictionary. Doing that, it adds this step as previous to the given nextStep.
+        If the steps are stored in different graphs, the graph not owned by a workflow (or else the smaller one) is merged
+        into the other one (see Graph.merge). Steps of two different workflows can't be linked (ValueError).
         ---
         Parameters:
         - nextStep: next step as Step object
         """
-        if nextStep.stepId not in self.nexts:
-            self.nexts[nextStep.stepId] = nextStep
-        if self.stepId not in nextStep.previouses:
-            nextStep.previouses[self.stepId] = self
+        if nextStep.graph is not self.graph:
+            small, large = sorted((nextStep.graph, self.graph), key=lambda graph: (graph.owned, len(graph)))
+            large.merge(small)
+        self.graph.addEdge(self.index, nextStep.index)
 
     def isFirst(self):
         """
         tells if this step is first in a workflow (returns True), it means that it does not have any previous step
         """
-        return not self.previouses
+        return not self.graph.inDegree(self.index)
 
     def isLast(self):
         """
         tells if this step is last in a workflow (returns True), it means that it does not have any next step
         """
-        return not self.nexts
+        return not self.graph.outDegree(self.index)
+
+    def __repr__(self):
+        return 'Step({}, {!r})'.format(self.stepId, self.title)
+
+
+class _Links(MutableMapping):
+    """live dictionary of the next (or previous) steps of a step, changes are applied to the graph"""
+    __slots__ = ('step', 'forward')
+
+    def __init__(self, step: Step, forward: bool):
+        self.step = step
+        self.forward = forward
+
+    def __getitem__(self, stepId):
+        return self.step._linked(self.forward)[stepId]
+
+    def __iter__(self):
+        return iter(list(self.step._linked(self.forward)))
+
+    def __len__(self):
+        return len(self.step._linked(self.forward))
+
+    def __contains__(self, stepId):
+        return stepId in self.step._linked(self.forward)
+
+    def __setitem__(self, stepId, step: Step):
+        if stepId != step.stepId:
+            raise ValueError('key {} is not the id of step {}'.format(stepId, step.stepId))
+        if self.forward:
+            self.step.addNext(step)
+        else:
+            step.addNext(self.step)
+
+    def __delitem__(self, stepId):
+        step = self.step._linked(self.forward)[stepId]
+        if self.forward:
+            self.step.graph.removeEdge(self.step.index, step.index)
+        else:
+            self.step.graph.removeEdge(step.index, self.step.index)
+
+    def __repr__(self):
+        return repr(self.step._linked(self.forward))
+
+
+_new = object.__new__
+_view = Step.view
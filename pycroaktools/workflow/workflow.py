@@ -1,9 +1,31 @@
 import logging, sys
-from pandas import DataFrame
+from collections.abc import Mapping
+import numpy as np
+from pandas import DataFrame, Index, to_numeric
 from pycroaktools.applauncher import Configuration, error
+from pycroaktools.workflow.graph import Graph
+from pycroaktools.workflow.analytics import Analytics
+from pycroaktools.workflow.pathCache import PathCache
+from pycroaktools.workflow.graphFile import saveGraph, loadGraph
 from pycroaktools.workflow.step import Step
 
 
+class _Steps(Mapping):
+    """read-only dictionary of the steps of a graph, with key = step id and value = Step object built on demand"""
+
+    def __init__(self, graph: Graph):
+        self._graph = graph
+
+    def __getitem__(self, stepId):
+        return Step.view(self._graph, self._graph.indexes[stepId])
+
+    def __iter__(self):
+        return iter(self._graph.indexes)
+
+    def __len__(self):
+        return len(self._graph.indexes)
+
+
 
 class Workflow:
     """
@@ -23,6 +45,7 @@ class Workflow:
     Step 1 points to 2 next steps: steps 2 and 3, step 2 points to step 4, ...
     Steps have to be defined with a unique identifier. This identifier must be an integer. 
     But, as we can see, there is no need to define a continuous suite and the identifiers don't need to be sorted. 
+    Steps and links are stored in a compact Graph object (see pycroaktools.workflow.graph), steps are views on this graph.
     """
 
     def __init__(self, workflow: DataFrame, name='workflow'):
@@ -36,117 +59,304 @@ class Workflow:
         """
         self.name = name
         """name of the workflow"""
-        self.firstSteps = []
-        """steps without previous steps"""
-        self.steps = dict()
+        self.graph = None
+        """Graph object storing the steps and their links"""
+        self.steps = None
         """all steps as a dictionary. Key is the step id and value is a Step object"""
         self._build(workflow)
-        self._findFirsts()
+        self._setup()
+
+    def _setup(self):
+        self.graph.owned = True
+        self.steps = _Steps(self.graph)
+        self.analytics = Analytics(self.graph)
+        """Analytics object giving the structure of the graph (topological order, levels, cycles...)"""
+        self.pathCache = PathCache(self.graph)
+        """PathCache object memoizing the paths returned by getDescending and getAscendings"""
+        self._findEnds()
         self._order = self._getStepOrder()
 
-    def _build(self, workflow: DataFrame):
+    def save(self, path):
+        """
+        saves the workflow in a binary file: link arrays and string table of the titles (see pycroaktools.workflow.graphFile).
+        Removed steps are not saved.
+        """
+        saveGraph(self.graph, path, self.name)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        returns the workflow saved in the file path by Workflow.save. By default, the links are memory mapped from the file
+        instead of being read, so that loading a large workflow is almost immediate.
+        """
+        try:
+            graph, name = loadGraph(path, mmap)
+        except ValueError as e:
+            error('Workflow file error - {}'.format(e))
+        workflow = cls.__new__(cls)
+        workflow.name = name if name is not None else 'workflow'
+        workflow.graph = graph
+        workflow._setup()
+        return workflow
+
+    @property
+    def firstSteps(self):
+        """steps without previous steps. They may be set to other steps, used until the graph is changed out of the workflow"""
+        self._sync()
+        return [self._step(index) for index in self._firsts]
+
+    @firstSteps.setter
+    def firstSteps(self, steps):
+        self._sync()
+        self._firsts = self._indexes(steps)
+
+    @property
+    def lastSteps(self):
+        """steps without next steps. They may be set to other steps, used until the graph is changed out of the workflow"""
+        self._sync()
+        return [self._step(index) for index in self._lasts]
 
+    @lastSteps.setter
+    def lastSteps(self, steps):
+        self._sync()
+        self._lasts = self._indexes(steps)
+
+    def _indexes(self, steps):
+        """returns the steps as an ordered dictionary of indexes"""
+        steps = list(steps)
+        for step in steps:
+            self._check(step)
+        return dict.fromkeys(step.index for step in steps)
+
+    def _build(self, workflow: DataFrame):
+        """
+        builds the graph with column operations: nexts are split, exploded and converted in bulk.
+        All the definition errors are reported together.
+        """
         self._checkData(workflow)
+        errors = []
 
-        for index, stepId in enumerate(workflow.stepId):
-            try:
-                stepId = int(stepId)
-            except ValueError:
-                error('Workflow definition error - step id {} is not an integer'.format(stepId))
-
-            step = Step(stepId, workflow.title[index])
-            self.steps[stepId] = step
-
-        for index, stepId in enumerate(workflow.stepId):
-            stepId = int(stepId)
-            nexts = str(workflow.nexts[index]).split('-')
-            for nextStep in nexts:
-                try:
-                    nextStep = int(float(nextStep))
-                except ValueError:
-                    if not nextStep or nextStep == 'nan':
-                        continue
-                    error('Workflow definition error - next value {} is not an integer'.format(nextStep))
-                try:
-                    self.steps[stepId].addNext(self.steps[nextStep])
-                except KeyError:
-                    error('Workflow definition error - step {0} points to step {1} but no definition for step {1}'.format(stepId, nextStep))
+        rawIds = workflow.stepId.reset_index(drop=True)
+        numericIds = to_numeric(rawIds, errors='coerce')
+        invalid = numericIds.isna()
+        errors += ['Workflow definition error - step id {} is not an integer'.format(stepId) for stepId in rawIds[invalid]]
+        valid = ~invalid
+        stepIds = numericIds[valid].astype(np.int64)
 
+        titles = workflow.title.reset_index(drop=True)[valid].astype(object)
+        titles = titles.where(titles.notna() & (titles != ''), 'step ' + stepIds.astype(str))
+        titles.index = stepIds.values
+        titles = titles[~titles.index.duplicated(keep='last')]
+        ids = Index(stepIds.unique())
+        titles = titles.reindex(ids)
 
-    def _checkData(self, workflow: DataFrame):
-        if 'stepId' not in workflow:
-            error('Workflow definition error - no column named stepId')
+        nexts = workflow.nexts.reset_index(drop=True)[valid].astype(str).str.split('-').explode()
+        nexts = nexts[nexts.notna() & (nexts != '') & (nexts != 'nan')]
+        values = to_numeric(nexts, errors='coerce')
+        invalid = values.isna()
+        errors += ['Workflow definition error - next value {} is not an integer'.format(value) for value in nexts[invalid]]
+        values = np.trunc(values[~invalid].to_numpy(dtype=np.float64)).astype(np.int64)
+        rowIds = stepIds[nexts.index[~invalid]].to_numpy()
+
+        missing = set(values.tolist()) - set(ids.tolist())
+        if missing:
+            dangling = np.isin(values, list(missing))
+            errors += ['Workflow definition error - step {0} points to step {1} but no definition for step {1}'.format(stepId, nextId)
+                       for stepId, nextId in zip(rowIds[dangling].tolist(), values[dangling].tolist())]
+        if errors:
+            error('\n'.join(errors))
 
-        if 'nexts' not in workflow:
-            error('Workflow definition error - no column named nexts')
+        self.graph = Graph(ids.tolist(), titles.tolist(), ids.get_indexer(rowIds), ids.get_indexer(values))
+
+    def _checkData(self, workflow: DataFrame):
+        errors = ['Workflow definition error - no column named {}'.format(column)
+                  for column in ['stepId', 'nexts'] if column not in workflow]
+        if errors:
+            error('\n'.join(errors))
 
         if 'title' in workflow:
             return
 
-        titles = []
-        for stepId in workflow.stepId:
-            titles.append('step '+str(stepId))
-        workflow['title'] = titles
+        workflow['title'] = 'step ' + workflow.stepId.astype(str)
 
-    def _findFirsts(self):
-        for step in self.getSteps():
-            previouses = step.getPreviouses()
-            if not previouses:
-                self.firstSteps.append(step)
+    def _findEnds(self):
+        """finds the first and the last steps, kept as ordered dictionaries of indexes updated by each change"""
+        nodes = np.zeros(len(self.graph), dtype=bool)
+        nodes[list(self.graph.nodes())] = True
+        self._firsts = dict.fromkeys(np.flatnonzero(nodes & (self.graph.inDegrees() == 0)).tolist())
+        self._lasts = dict.fromkeys(np.flatnonzero(nodes & (self.graph.outDegrees() == 0)).tolist())
+        self._version = self.graph.version
+
+    def _sync(self):
+        """finds again the first and the last steps if the graph was changed out of the workflow (e.g. with Step.addNext)"""
+        if self._version != self.graph.version:
+            self._findEnds()
+            self._order = None
+
+    def _check(self, step: Step):
+        if step.graph is not self.graph or step.index in self.graph.removed:
+            raise ValueError('step {} is not in workflow {}'.format(step.stepId, self.name))
+
+    def addStep(self, stepId, title=None):
+        """adds a step without link to the workflow and returns it. Raises ValueError if the step id is already used"""
+        self._sync()
+        index = self.graph.addNode(stepId, title if title else 'step '+str(stepId))
+        self._firsts[index] = None
+        self._lasts[index] = None
+        if self._order is not None and self._order is not self.graph.indexes:
+            self._order[stepId] = len(self._order)
+        self._version = self.graph.version
+        return self._step(index)
+
+    def removeStep(self, step: Step):
+        """removes a step and its links from the workflow. Its next steps may become first steps and its previous steps last steps"""
+        self._check(step)
+        self._sync()
+        nexts, previouses = self.graph.successors(step.index), self.graph.predecessors(step.index)
+        self.graph.removeNode(step.index)
+        for index in nexts:
+            if not self.graph.inDegree(index):
+                self._firsts[index] = None
+        for index in previouses:
+            if not self.graph.outDegree(index):
+                self._lasts[index] = None
+        self._firsts.pop(step.index, None)
+        self._lasts.pop(step.index, None)
+        if self._order is not None and self._order.get(step.stepId) == len(self._order) - 1:
+            self._order.pop(step.stepId)
+        else:
+            self._order = None
+        self._version = self.graph.version
+
+    def addEdge(self, source: Step, target: Step):
+        """adds a link from the step source to the step target. Returns False if the link already exists"""
+        self._check(source)
+        self._check(target)
+        self._sync()
+        if not self.graph.addEdge(source.index, target.index):
+            return False
+        self._firsts.pop(target.index, None)
+        self._lasts.pop(source.index, None)
+        self._version = self.graph.version
+        return True
+
+    def removeEdge(self, source: Step, target: Step):
+        """removes the link from the step source to the step target. Returns False if there is no such link"""
+        self._check(source)
+        self._check(target)
+        self._sync()
+        if not self.graph.removeEdge(source.index, target.index):
+            return False
+        if not self.graph.inDegree(target.index):
+            self._firsts[target.index] = None
+        if not self.graph.outDegree(source.index):
+            self._lasts[source.index] = None
+        self._version = self.graph.version
+        return True
+
+    def _step(self, index):
+        return Step.view(self.graph, index)
+
+    def _toSteps(self, paths):
+        for path in paths:
+            yield [self._step(index) for index in path]
 
     def getAllPaths(self):
         """returns all possible paths (list of steps) starting from first steps, going to next steps down to last steps."""
-        return self.getDescending(self.firstSteps)
+        return list(self.iterPaths())
 
-    def getDescending(self, steps):
-        """returns descending sequences, starting from the given steps (list of Step objects), following the next steps down to the last steps."""
-        paths = []
-        for step in steps:
-            self._addPath([], step, paths)
-        return paths
+    def iterPaths(self, steps=None):
+        """
+        generates one by one the paths (list of steps) starting from the given steps (list of Step objects, first steps by default),
+        going to next steps down to last steps. Paths are generated depth first: paths sharing a prefix follow each other.
+        """
+        starts = [step.index for step in (self.firstSteps if steps is None else steps)]
+        return self._toSteps(self._iterPaths(starts, self.graph.successors))
 
-    def _addPath(self, root, step, paths):
-        path = [item for item in root]
-        path.append(step)
-        paths.append(path)
+    def countPaths(self):
+        """returns the number of paths returned by getAllPaths, without enumerating them"""
+        successors = self.graph.successors
+        counts = [0] * len(self.graph)
+        for index in reversed(self.analytics.topologicalOrder()):
+            nexts = successors(index)
+            counts[index] = sum(counts[nextIndex] for nextIndex in nexts) if nexts else 1
+        return sum(counts[step.index] for step in self.firstSteps)
 
-        while not step.isLast():
+    def getTopologicalOrder(self):
+        """returns the list of steps sorted so that each step comes before its next steps. Raises ValueError if the workflow has a cycle"""
+        return [self._step(index) for index in self.analytics.topologicalOrder()]
 
-            if len(step.getNexts()) < 2:
-                step = step.getNexts()[0]
-                path.append(step)
-            else:
-                root = [item for item in path]
-                for index, item in enumerate(step.getNexts()):
-                    if index == 0:
-                        step = item
-                        path.append(step)
-                    else:
-                        self._addPath(root, item, paths)
+    def getLevels(self):
+        """
+        returns a dictionary with key = step id and value = level of the step: 0 for first steps,
+        otherwise 1 + the highest level of its previous steps. Raises ValueError if the workflow has a cycle
+        """
+        ids, levels = self.graph.ids, self.analytics.levels()
+        return {ids[index]: levels[index] for index in self.graph.nodes()}
+
+    def findCycle(self):
+        """returns the steps of a cycle of the workflow, the first step being repeated at the end, or None if there is no cycle"""
+        cycle = self.analytics.findCycle()
+        return [self._step(index) for index in cycle] if cycle else None
+
+    def getStronglyConnectedComponents(self):
+        """returns the groups of steps that may be reached from each other (lists of steps), a step out of any cycle being alone"""
+        return [[self._step(index) for index in component] for component in self.analytics.stronglyConnectedComponents()]
+
+    def isReachable(self, source: Step, target: Step):
+        """tells if the step target may be reached from the step source by following the next steps"""
+        return self.analytics.isReachable(source.index, target.index)
+
+    def getDescending(self, steps):
+        """
+        returns descending sequences, starting from the given steps (list of Step objects), following the next steps down to the last steps.
+        Paths are memoized per step in pathCache and shared with the paths of the previous steps.
+        """
+        unfold = self.pathCache.unfold
+        return list(self._toSteps(unfold(path) for step in steps for path in self.pathCache.descending(step.index)))
 
     def getAscendings(self, step):
-        """returns ascencding sequences, starting from the given step, following the previous steps up to the first steps."""
-        paths = []
-        self._addAscending([], step, paths)
-        return paths
-
-    def _addAscending(self, root, step, paths):
-        path = [item for item in root]
-        path.append(step)
-        paths.append(path)
-
-        while not step.isFirst():
-            if len(step.getPreviouses()) < 2:
-                step = step.getPreviouses()[0]
+        """
+        returns ascencding sequences, starting from the given step, following the previous steps up to the first steps.
+        Paths are memoized per step in pathCache and shared with the paths of the next steps.
+        """
+        unfold = self.pathCache.unfold
+        return list(self._toSteps(unfold(path) for path in self.pathCache.ascending(step.index)))
+
+    def getPathCacheStats(self):
+        """returns the statistics of the path cache: hits, misses, evictions, invalidations, entries and tails"""
+        return self.pathCache.stats()
+
+    def _iterPaths(self, starts, neighbours):
+        """
+        walks the graph depth first with an explicit stack of neighbour iterators. 
+        The current path is shared by all the paths starting with it and copied only when a path is complete.
+        Raises ValueError when a step already in the current path is met again.
+        """
+        for start in starts:
+            following = neighbours(start)
+            if not following:
+                yield [start]
+                continue
+            path = [start]
+            onPath = {start}
+            stack = [iter(following)]
+            while stack:
+                step = next(stack[-1], None)
+                if step is None:
+                    stack.pop()
+                    onPath.discard(path.pop())
+                    continue
+                if step in onPath:
+                    raise ValueError('workflow {} has a cycle through step {}'.format(self.name, self.graph.ids[step]))
                 path.append(step)
-            else:
-                root = [item for item in path]
-                for index, item in enumerate(step.getPreviouses()):
-                    if index == 0:
-                        step = item
-                        path.append(step)
-                    else:
-                        self._addAscending(root, item, paths)
+                following = neighbours(step)
+                if following:
+                    onPath.add(step)
+                    stack.append(iter(following))
+                    continue
+                yield list(path)
+                path.pop()
 
     def printStatusPerStep(self):
         """prints with logging.info the step details for each step in the workflow"""
@@ -166,29 +376,34 @@ class Workflow:
 
     def getSteps(self):
         """returns the list of all step objects in the workflow"""
-        return list(self.steps.values())
+        return [self._step(index) for index in self.graph.nodes()]
 
     def _getStepOrder(self):
-        stepNumberPerId = dict()
-        stepNumber = 0
-        for step in self.getSteps():
-            if step.stepId in stepNumberPerId:
-                continue
-            stepNumberPerId[step.stepId] = stepNumber
-            stepNumber += 1
-        return stepNumberPerId
+        """returns the dictionary with key = step id and value = index of the step in the list returned by getSteps"""
+        if not self.graph.removed:
+            return self.graph.indexes
+        ids = self.graph.ids
+        return {ids[index]: position for position, index in enumerate(self.graph.nodes())}
 
-    def getLinksPerSteps(self):
-        """returns a dictionary with keys= stepID and value = the value return by Workflow.getLinks(step) where step correspond to stepID"""
-        links = dict()
-        for step in self.getSteps():
-            links[step.stepId] = self.getLinks(step)
-        return links
-
-    def getLinks(self, step: Step):
-        """returns a dictionary with keys = next step id and values = index of the next step in the list returned by Workflow.getSteps()"""
-        nextIds = [step.stepId for step in step.getNexts()]
-        links = dict()
-        for nextId in nextIds:
-            links[nextId] = self._order[nextId]
-        return links
+    def getLinksPerSteps(self, steps=None):
+        """
+        returns a dictionary with keys= stepID and value = the value return by Workflow.getLinks(step) where step correspond to stepID
+        If steps (ordered list of steps) is given, link values are the indexes of the next steps in this list instead.
+        """
+        if steps is None:
+            return {step.stepId: self.getLinks(step) for step in self.getSteps()}
+        order = {step.stepId: position for position, step in enumerate(steps)}
+        return {step.stepId: self.getLinks(step, order) for step in steps}
+
+    def getLinks(self, step: Step, order=None):
+        """
+        returns a dictionary with keys = next step id and values = index of the next step in the list returned by Workflow.getSteps(),
+        or the value given by the order dictionary (key = step id) if given
+        """
+        ids = self.graph.ids
+        if order is None:
+            self._sync()
+            if self._order is None:
+                self._order = self._getStepOrder()
+            order = self._order
+        return {ids[index]: order[ids[index]] for index in self.graph.successors(step.index)}
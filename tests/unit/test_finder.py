@@ -1,7 +1,27 @@
 import unittest
+import asyncio
 import os
+import re
+import tempfile
+import zipfile
+import threading
+import weakref
+from unittest import mock
+from datetime import datetime, timezone
+from ftplib import FTP, error_perm
 
-from pycroaktools.files import Finder
+from pycroaktools.files import Finder, DirectoryIndex, AsyncFinder, SharedListings
+from pycroaktools.files.ftpLister import FtpLister
+from pycroaktools.files.matcher import Matcher
+from pycroaktools.files.watcher import Watcher
+from pycroaktools.files.walker import listDirectory
+
+try:
+    from pyftpdlib.authorizers import DummyAuthorizer
+    from pyftpdlib.handlers import FTPHandler
+    from pyftpdlib.servers import ThreadedFTPServer
+except ImportError:
+    ThreadedFTPServer = None
 
 class TestFinder(unittest.TestCase):
 
@@ -32,10 +52,228 @@ class TestFinder(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertEqual(os.path.basename(results[0]), 'test1.txt')
 
+    def test_findFilesWithThreads(self):
+        """
+        Test that the threaded walker finds the same files than os.walk, in a sorted order
+        """
+        properties = {'parent': self.test_folder, 'regex': r'\.txt$', 'stopWhenFound': False, 'avoidFolders': ['other']}
+        expected = sorted(self._findFiles(properties))
+        properties['threads'] = 4
+        results = self._findFiles(properties)
+        self.assertEqual(sorted(results), expected)
+        self.assertEqual(len(results), 4)
+        self.assertEqual([os.path.basename(result) for result in results],
+                         ['level1.txt', 'test1.txt', 'level2.txt', 'level3.txt'])
+
+        properties['depth'] = 1
+        results = self._findFiles(properties)
+        self.assertEqual([os.path.basename(result) for result in results],
+                         ['level1.txt', 'test1.txt', 'level2.txt'])
+
+    def test_iterFiles(self):
+        """
+        Test that files are generated one by one and that the search stops after the first one when stopWhenFound is set
+        """
+        properties = {'parent': self.test_folder, 'regex': r'\.txt$', 'stopWhenFound': False, 'threads': 2}
+        found = Finder(properties).iterFiles()
+        self.assertEqual(os.path.basename(next(found)), 'level1.txt')
+        self.assertEqual(len(list(found)), 5)
+
+        properties['stopWhenFound'] = True
+        self.assertEqual(len(list(Finder(properties).iterFiles())), 1)
+
+    def test_findMany(self):
+        """
+        Test that a single search finds the same files than one search per pattern
+        """
+        patterns = {'levels': r'level\d\.txt$', 'test': r'^test1', 'inFolder': r'(in)\w+\1', 'none': r'\.csv$'}
+        for stopWhenFound in [True, False]:
+            properties = {'parent': self.test_folder, 'stopWhenFound': stopWhenFound, 'threads': 2}
+            results = Finder(properties).findMany(patterns)
+            for name, regex in patterns.items():
+                properties['regex'] = regex
+                self.assertEqual(results[name], self._findFiles(properties))
+        self.assertEqual(len(results['levels']), 3)
+
+    def test_matcher(self):
+        """
+        Test that the name matcher selects the same names than re.search, whatever the strategy it applies
+        """
+        patterns = {r'.*\.csv$': 'suffix', r'\.(csv|txt)$': 'suffix', r'^report': 'prefix', r'^a\.b$': 'equal',
+                    r'^(a|b\.c)$': 'equal', r'data': 'contains', r'.*': 'any', r'^data.*': 'prefix',
+                    r'\d+\.csv$': 'regex', r'(in)\w+\1': 'regex', r'a|b': 'regex', r'^$': 'regex',
+                    r'^.*.*': 'any', r'^.*.*$': 'regex', r'^.*$': 'regex'}
+        names = ['a.b', 'A.B', 'a', 'b.c', 'aXb', 'report.csv', 'REPORT.TXT', 'data1.csv', 'mydata.txt', 'x.csv\n',
+                 'x.csv\ny', 'report\nfoo', 'ſ.csv', 'K.CSV', 'Ä.txt', 'inputin', '', 'x.CsV', '.csv']
+        for regex, kind in patterns.items():
+            for caseSensitive in [True, False]:
+                matcher = Matcher(regex, caseSensitive)
+                self.assertEqual(matcher.kind, kind)
+                compiled = re.compile(regex, 0 if caseSensitive else re.IGNORECASE)
+                self.assertEqual(matcher.filter(names), [name for name in names if compiled.search(name)], regex)
+
+    def test_watch(self):
+        """
+        Test that a watcher reports the added, modified and removed files, with inotify and by polling directories
+        """
+        for inotify in [None, False]:
+            with tempfile.TemporaryDirectory() as temp:
+                os.makedirs(os.path.join(temp, 'sub', 'avoid'))
+                first = os.path.join(temp, 'first.csv')
+                open(first, 'w').close()
+                open(os.path.join(temp, 'first.txt'), 'w').close()
+                finder = Finder({'parent': temp, 'regex': r'\.csv$', 'avoidFolders': ['avoid']})
+                with finder.watch(inotify) as watcher:
+                    self.assertEqual(watcher.files, [first])
+                    self.assertEqual(watcher.poll(), [])
+
+                    added = os.path.join(temp, 'sub', 'new', 'added.csv')
+                    os.makedirs(os.path.dirname(added))
+                    open(added, 'w').close()
+                    open(os.path.join(temp, 'sub', 'avoid', 'avoided.csv'), 'w').close()
+                    open(os.path.join(temp, 'sub', 'other.txt'), 'w').close()
+                    os.utime(first, ns=(0, 10 ** 9))
+                    self.assertEqual(sorted(watcher.poll(0.1)), [('added', added), ('modified', first)])
+                    self.assertEqual(watcher.files, [first, added])
+
+                    moved = os.path.join(temp, 'moved.csv')
+                    os.rename(added, moved)
+                    os.remove(first)
+                    self.assertEqual(sorted(watcher.poll(0.1)), [('added', moved), ('removed', first), ('removed', added)])
+                    self.assertEqual(watcher.files, [moved])
+
+        with tempfile.TemporaryDirectory() as temp:
+            first = os.path.join(temp, 'first.csv')
+            open(first, 'w').close()
+            os.utime(temp, ns=(0, 10 ** 9))
+            finder = Finder({'parent': temp, 'regex': r'\.csv$'})
+            for pollFiles in [False, True]:
+                with Watcher(finder, False, minAge=0, pollFiles=pollFiles) as watcher:
+                    os.utime(first, ns=(0, (2 + pollFiles) * 10 ** 9))
+                    with mock.patch('os.stat', wraps=os.stat) as stat:
+                        self.assertEqual(watcher.poll(), [('modified', first)] if pollFiles else [])
+                    self.assertEqual(stat.call_count, 1 + pollFiles)
+
+    def test_findFilesAsync(self):
+        """
+        Test that concurrent asynchronous searches find the same files than Finder and share directory listings
+        """
+        properties = {'parent': self.test_folder, 'regex': r'\.txt$', 'stopWhenFound': False, 'threads': 1}
+        expected = self._findFiles(properties)
+        folderProperties = {'parent': self.test_folder, 'regex': r'^folder', 'stopWhenFound': False, 'threads': 1}
+        expectedFolders = self._findFolders(folderProperties)
+
+        async def search():
+            listings = SharedListings(concurrency=2)
+            properties['listings'] = listings
+            folderProperties['listings'] = listings
+            files, folders = await asyncio.gather(AsyncFinder(properties).findFilesAsync(),
+                                                  AsyncFinder(folderProperties).findFoldersAsync())
+            first = [file async for file in AsyncFinder(dict(properties, stopWhenFound=True)).iterFilesAsync()]
+            walk = AsyncFinder(dict(properties, listings=SharedListings(concurrency=1)))._walk(listDirectory, self.test_folder)
+            await walk.__anext__()
+            await walk.__anext__()
+            await walk.aclose()
+            await asyncio.sleep(0)
+            pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            return files, folders, first, listings.shared, pending
+
+        files, folders, first, shared, pending = asyncio.run(search())
+        self.assertEqual(pending, [])
+        self.assertEqual(files, expected)
+        self.assertEqual(folders, expectedFolders)
+        self.assertEqual(first, expected[:1])
+        self.assertGreater(shared, 0)
+
+    def test_findFilesWithCache(self):
+        """
+        Test that directory listings are read from the cache, except for modified directories
+        """
+        with tempfile.TemporaryDirectory() as temp:
+            folder = os.path.join(temp, 'tree')
+            os.makedirs(os.path.join(folder, 'sub'))
+            open(os.path.join(folder, 'sub', 'a.csv'), 'w').close()
+            cache = DirectoryIndex(os.path.join(temp, 'index.db'), minAge=0)
+            properties = {'parent': folder, 'regex': r'\.csv$', 'stopWhenFound': False, 'cache': cache}
+
+            self.assertEqual(len(self._findFiles(properties)), 1)
+            self.assertEqual(cache.stats()['misses'], 2)
+            self.assertEqual(len(self._findFiles(properties)), 1)
+            self.assertEqual(cache.stats()['hits'], 2)
+
+            open(os.path.join(folder, 'sub', 'b.csv'), 'w').close()
+            os.utime(os.path.join(folder, 'sub'), ns=(0, 10**9))
+            self.assertEqual(len(self._findFiles(properties)), 2)
+            self.assertEqual(cache.stats()['hits'], 3)
+            cache.close()
+
+            cache = DirectoryIndex(os.path.join(temp, 'index.db'), maxEntries=1, minAge=0)
+            properties['cache'] = cache
+            self.assertEqual(len(self._findFiles(properties)), 2)
+            self.assertEqual(cache.stats()['entries'], 1)
+            cache.close()
+
+            properties['cache'] = os.path.join(temp, 'shared.db')
+            first, second = Finder(properties), Finder(properties)
+            self.assertIs(first.cache, second.cache)
+            self.assertEqual(len(first.findFiles()), 2)
+            index = weakref.ref(first.cache)
+            del first, second
+            self.assertIsNone(index())
+
+            with open(os.path.join(folder, 'sub', 'a.csv'), 'w') as file:
+                file.write('content')
+            properties = {'parent': folder, 'regex': r'\.csv$', 'stopWhenFound': False, 'cache': DirectoryIndex(minAge=0),
+                          'minSize': 1, 'modifiedSince': 0}
+            threads, stat = [], Finder._stat
+            with mock.patch.object(AsyncFinder, '_stat', autospec=True,
+                                   side_effect=lambda finder, path: threads.append(threading.current_thread()) or stat(finder, path)):
+                found = asyncio.run(AsyncFinder(properties).findFilesAsync())
+            self.assertEqual(found, self._findFiles(properties))
+            self.assertEqual(len(found), 1)
+            self.assertTrue(threads)
+            self.assertNotIn(threading.main_thread(), threads)
+
     def _findFilesInZip(self, properties):
         finder = Finder(properties)
         return finder.findFilesInZip()
 
+    def test_findFilesWithMetadata(self):
+        """
+        Test that files are selected by size and modification date in os directories and zip archives
+        """
+        sizes = {'a.csv': 10, 'b.csv': 300, 'sub/c.csv': 200, 'sub/d.csv': 0, 'sub/e.txt': 500}
+        dates = {'a.csv': 1.4e9, 'b.csv': 1.1e9, 'sub/c.csv': 1.3e9, 'sub/d.csv': 1.2e9, 'sub/e.txt': 1.5e9}
+        with tempfile.TemporaryDirectory() as temp:
+            tree = os.path.join(temp, 'tree')
+            archive = os.path.join(temp, 'tree.zip')
+            os.makedirs(os.path.join(tree, 'sub'))
+            with zipfile.ZipFile(archive, 'w') as zipFile:
+                for name, size in sizes.items():
+                    file = os.path.join(tree, name)
+                    with open(file, 'wb') as stream:
+                        stream.write(b'x' * size)
+                    os.utime(file, (dates[name], dates[name]))
+                    zipFile.write(file, name)
+            cases = [({'minSize': 100}, ['b.csv', 'sub/c.csv']),
+                     ({'minSize': 1, 'maxSize': 200}, ['a.csv', 'sub/c.csv']),
+                     ({'modifiedSince': datetime.fromtimestamp(1.25e9)}, ['a.csv', 'sub/c.csv']),
+                     ({'modifiedSince': 1.25e9, 'newest': 1}, ['a.csv']),
+                     ({'newest': 3}, ['a.csv', 'sub/c.csv', 'sub/d.csv']),
+                     ({'largest': 2, 'maxSize': 250}, ['sub/c.csv', 'a.csv'])]
+            for filters, names in cases:
+                expected = [os.path.join(tree, *name.split('/')) for name in names]
+                for settings in [{}, {'threads': 2}, {'cache': DirectoryIndex(minAge=0)}]:
+                    properties = dict(filters, parent=tree, regex=r'\.csv$', stopWhenFound=False, **settings)
+                    self.assertEqual(Finder(properties).findFiles(), expected, properties)
+                properties = dict(filters, parent=tree, regex=r'\.csv$', stopWhenFound=False)
+                self.assertEqual(asyncio.run(AsyncFinder(properties).findFilesAsync()), expected)
+                properties['parent'] = archive
+                self.assertEqual(Finder(properties).findFilesInZip(), [archive + '/' + name for name in names])
+            properties = {'parent': tree, 'regex': r'\.csv$', 'newest': 1, 'stopWhenFound': True}
+            self.assertEqual(Finder(properties).findFiles(), [os.path.join(tree, 'a.csv')])
+            self.assertEqual(Finder().getLastModificationDate(os.path.join(tree, 'a.csv')), '2014-05-13 16:53:20')
+
     def test_findFilesInZip(self):
         """
         Test that it can retrieve 1 specific file in zip file
@@ -45,5 +283,129 @@ class TestFinder(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertEqual(os.path.basename(results[0]), 'mytextinlevel2.txt')
 
+    def test_findFilesInNestedZip(self):
+        """
+        Test that zip archives are walked folder by folder, including nested archives, and that found files can be read
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            inner = os.path.join(folder, 'inner.zip')
+            with zipfile.ZipFile(inner, 'w') as archive:
+                archive.writestr('deep/data.csv', 'nested')
+            outer = os.path.join(folder, 'outer.zip')
+            with zipfile.ZipFile(outer, 'w') as archive:
+                archive.writestr('a/b/data.csv', 'level2')
+                archive.writestr('data.csv', 'level0')
+                archive.write(inner, 'a/inner.zip')
+
+            properties = {'parent': outer, 'regex': r'\.csv$', 'stopWhenFound': False}
+            results = self._findFilesInZip(properties)
+            self.assertEqual(results, [os.path.join(outer, 'data.csv'), os.path.join(outer, 'a/b/data.csv')])
+
+            properties['nestedZips'] = True
+            finder = Finder(properties)
+            results = finder.findFilesInZip()
+            self.assertEqual(len(results), 3)
+            self.assertEqual(results[-1], os.path.join(outer, 'a/inner.zip/deep/data.csv'))
+            with finder.openInZip(results[-1]) as stream:
+                self.assertEqual(stream.read(), b'nested')
+
+            properties['depth'] = 1
+            self.assertEqual(len(self._findFilesInZip(properties)), 1)
+            properties['depth'] = -1
+            properties['avoidFolders'] = ['b']
+            self.assertEqual(len(self._findFilesInZip(properties)), 2)
+
+    @unittest.skipUnless(ThreadedFTPServer, 'pyftpdlib is not installed')
+    def test_findFilesInFtp(self):
+        """
+        Test that ftp directories are listed with a pool of connections, with MLSD or LIST, as os directories
+        """
+        authorizer = DummyAuthorizer()
+        authorizer.add_anonymous(self.test_folder)
+        handler = type('Handler', (FTPHandler,), {'authorizer': authorizer})
+        server = ThreadedFTPServer(('127.0.0.1', 0), handler)
+        thread = threading.Thread(target=server.serve_forever, kwargs={'timeout': 0.1})
+        thread.start()
+        try:
+            port = server.socket.getsockname()[1]
+
+            def connect():
+                connection = FTP()
+                connection.connect('127.0.0.1', port)
+                connection.login()
+                return connection
+
+            properties = {'parent': self.test_folder, 'regex': r'\.txt$', 'stopWhenFound': False, 'threads': 1}
+            expected = [file[len(self.test_folder):].replace(os.path.sep, '/') for file in self._findFiles(properties)]
+
+            properties = {'parent': '/', 'regex': r'\.txt$', 'stopWhenFound': False,
+                          'ftpFactory': connect, 'ftpConnections': 3}
+            finder = Finder(properties)
+            self.assertEqual(finder.findFilesInFtp(), expected)
+            self.assertTrue(finder._getFtpLister().useMlsd)
+
+            lister = FtpLister(connect())
+            lister.useMlsd = False
+            properties = {'parent': '/', 'regex': r'\.txt$', 'stopWhenFound': False, 'ftpConnection': lister,
+                          'avoidFolders': ['other']}
+            self.assertEqual(Finder(properties).findFilesInFtp(), [file for file in expected if '/other/' not in file])
+            properties['minSize'] = 0
+            self.assertEqual(Finder(properties).findFilesInFtp(), [])
+
+            properties = {'parent': '/', 'regex': r'\.txt$', 'ftpConnection': finder._getFtpLister(), 'largest': 100}
+            self.assertEqual(sorted(Finder(properties).findFilesInFtp()), sorted(expected))
+            lister.close()
+            finder._getFtpLister().close()
+        finally:
+            server.close_all()
+            thread.join()
+
+    def test_ftpListerRetries(self):
+        """
+        Test that a failed reconnection is retried and that the connection given to the lister is never closed
+        """
+        given, opened = mock.Mock(), mock.Mock()
+        given.mlsd.side_effect = EOFError()
+        opened.mlsd.return_value = [('a.txt', {'type': 'file'})]
+        factory = mock.Mock(side_effect=[OSError('connection refused'), opened])
+        lister = FtpLister(given, factory)
+        self.assertEqual(lister('/').files, ['a.txt'])
+        self.assertEqual(factory.call_count, 2)
+        given.close.assert_not_called()
+        self.assertIsNone(FtpLister(given)('/'))
+        self.assertEqual(given.mlsd.call_count, 2)
+
+    def test_ftpListerParsing(self):
+        """
+        Test that MLSD and LIST outputs are parsed, without ftp server, and that listings are cached for a limited time
+        """
+        connection = mock.Mock()
+        connection.mlsd.return_value = [('.', {'type': 'cdir'}), ('..', {'type': 'pdir'}), ('sub', {'type': 'dir'}),
+                                        ('b.txt', {'type': 'file', 'size': '12', 'modify': '20200102030405.5'}),
+                                        ('a.txt', {'type': 'file'})]
+        lister = FtpLister(connection, maxEntries=1)
+        listing = lister('/')
+        self.assertEqual((listing.dirs, listing.files), (['sub'], ['a.txt', 'b.txt']))
+        self.assertEqual(listing.infos, {'b.txt': (12, datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc).timestamp() + 0.5)})
+        self.assertIs(lister('/'), listing)
+        lister('/sub')
+        self.assertIsNot(lister('/'), listing)
+        self.assertEqual(connection.mlsd.call_count, 3)
+        lister.cacheTime = 0
+        lister('/')
+        self.assertEqual(connection.mlsd.call_count, 4)
+
+        lines = ['total 4', 'drwxr-xr-x 1 owner group 0 Jan 1 2020 sub dir', '-rw-r--r-- 1 owner group 12 Jan 1 2020 a file.txt',
+                 'lrwxrwxrwx 1 owner group 5 Jan 1 2020 link -> target', '01-02-20  03:04AM       <DIR>          dos dir',
+                 '01-02-20  03:04AM                  12 dos file.txt']
+        connection = mock.Mock()
+        connection.mlsd.side_effect = error_perm('500 MLSD not understood')
+        connection.retrlines.side_effect = lambda command, callback: [callback(line) for line in lines]
+        lister = FtpLister(connection)
+        listing = lister('/')
+        self.assertFalse(lister.useMlsd)
+        self.assertEqual((listing.dirs, listing.files), (['dos dir', 'sub dir'], ['a file.txt', 'dos file.txt', 'link']))
+        connection.retrlines.assert_called_once_with('LIST /', mock.ANY)
+
     if __name__ == '__main__':
         unittest.main()
@@ -0,0 +1,219 @@
+import unittest
+import gzip
+import io
+import re
+from unittest import mock
+import os
+import shutil
+import tempfile
+from pandas import read_csv
+
+from pycroaktools.presentation import Presentation, Slide, Slides, RenderCache, SlideGenerator, HtmlWriter
+from pycroaktools.workflow import Workflow
+from pycroaktools.easyPresentation.workflowToPresentation import WorkflowToPresentation
+
+
+class TestPresentation(unittest.TestCase):
+
+    workflow_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources/test_workflow/workflow.csv')
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.slides = Slides()
+        for slideId in (1, 2, 3, 4, 9, 12):
+            slide = Slide(slideId, 'slide {}'.format(slideId))
+            slide.setContent('# content {}'.format(slideId))
+            self.slides.addSlide(slide)
+        self.workflow = Workflow(read_csv(self.workflow_file), 'myWorkflow')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _read(self, name):
+        with open(os.path.join(self.folder, name)) as file:
+            return file.read()
+
+    def test_linearPresentations(self):
+        names = ['myWorkflow_v0_1-2-4.html', 'myWorkflow_v0_1-3-12.html', 'myWorkflow_v0_9-12.html', 'myWorkflow_v0_9-4.html']
+        with mock.patch.object(Presentation, 'copyAssets') as copyAssets:
+            sequential = WorkflowToPresentation(self.workflow, self.slides, self.folder)
+            self.assertEqual(sequential.createLinearPresentations(0), os.path.join(self.folder, names[-1]))
+            expected = {name: self._read(name) for name in names}
+            sequential.createWorkflowPresentation(0)
+            self.assertEqual(copyAssets.call_count, 1)
+
+            pooled = WorkflowToPresentation(self.workflow, self.slides, self.folder, workers=3)
+            for name in names:
+                os.remove(os.path.join(self.folder, name))
+            pooled.createLinearPresentations(0)
+            pooled.createLinearPresentations(1)
+            self.assertEqual(copyAssets.call_count, 2)
+        self.assertEqual({name: self._read(name) for name in names}, expected)
+        self.assertEqual(len(pooled.timings), 8)
+        self.assertIn('content 12', expected['myWorkflow_v0_9-12.html'])
+        self.assertNotIn('content 4', expected['myWorkflow_v0_9-12.html'])
+
+    def test_renderCache(self):
+        slideFile = os.path.join(self.folder, '4_file slide.md')
+        with open(slideFile, 'w') as file:
+            file.write('first text')
+        slide = Slide(4, 'file slide')
+        slide.associateFile(slideFile)
+        self.slides.addSlide(slide)
+        cacheFolder = os.path.join(self.folder, 'cache')
+        cache = RenderCache(folder=cacheFolder)
+        presentation = Presentation(cache)
+        for name in ('a.html', 'b.html'):
+            presentation.writePresentation(name, self.slides, [1, 4], self.folder)
+        self.assertEqual(self._read('a.html'), self._read('b.html'))
+        self.assertEqual(cache.stats()['misses'], 2)
+        self.assertEqual(cache.stats()['hits'], 2)
+
+        with open(slideFile, 'w') as file:
+            file.write('second text, longer')
+        presentation.writePresentation('c.html', self.slides, [1, 4], self.folder, links={1: {4: 1}, 4: None})
+        self.assertIn('second text', self._read('c.html'))
+        self.assertIn('[file slide](#/1)', self._read('c.html'))
+        self.assertEqual(cache.stats()['misses'], 4)
+
+        nextRun = RenderCache(folder=cacheFolder)
+        Presentation(nextRun).writePresentation('d.html', self.slides, [1, 4], self.folder)
+        self.assertEqual(nextRun.stats()['diskHits'], 2)
+        Presentation().writePresentation('e.html', self.slides, [1, 4], self.folder)
+        self.assertEqual(self._read('d.html'), self._read('e.html'))
+
+        Presentation(RenderCache()).writePresentation('g.html', self.slides, [1, 30, 31], self.folder)
+        self.assertIn('slide 30 is missing', self._read('g.html'))
+        self.assertIn('slide 31 is missing', self._read('g.html'))
+
+        small = RenderCache(maxBytes=100)
+        Presentation(small).writePresentation('f.html', self.slides, [1, 2, 3, 4], self.folder)
+        self.assertLessEqual(small.stats()['size'], 100)
+
+    def test_catalog(self):
+        slideFolder = os.path.join(self.folder, 'slides', 'chapter')
+        os.makedirs(slideFolder)
+        with open(os.path.join(slideFolder, 'header.md'), 'w') as file:
+            file.write('---\ntitle: from header\nid: 5\nversion: 1\n---\n# header slide')
+        with open(os.path.join(slideFolder, '6_from name_0_2.md'), 'w') as file:
+            file.write('# named slide')
+        with open(os.path.join(slideFolder, 'notes.txt'), 'w') as file:
+            file.write('no slide')
+        slides = Slides()
+        slides.catalog(os.path.join(self.folder, 'slides'), workers=2)
+        self.assertEqual(sorted(slides.slides), [5, 6])
+        self.assertEqual(slides.getSlideTitle(5, 1), 'from header')
+        self.assertEqual(slides.versions, [0, 1.0, 2.0])
+        shutil.rmtree(slideFolder)
+        self.assertEqual(slides.getSlideContents(5, 1), ['\n# header slide'])
+        self.assertEqual(slides.getSlideContents(6, 2), ['# named slide'])
+
+    def test_catalogManifest(self):
+        slideFolder = os.path.join(self.folder, 'slides')
+        os.makedirs(os.path.join(slideFolder, 'chapter'))
+        files = {'header.md': '---\ntitle: from header\nid: 5\n---\n# header slide', os.path.join('chapter', '6_from name.md'): '# named',
+                 'notes.txt': 'no slide'}
+        for name, text in files.items():
+            with open(os.path.join(slideFolder, name), 'w') as file:
+                file.write(text)
+        manifest = os.path.join(self.folder, 'manifest', 'slides.json')
+        slides = Slides()
+        slides.catalog(slideFolder, manifest=manifest)
+        self.assertTrue(os.path.exists(manifest))
+
+        with mock.patch('pycroaktools.presentation.slides.Slides._fileSlides', side_effect=Slides._fileSlides) as parse:
+            warm = Slides()
+            warm.catalog(slideFolder, manifest=manifest)
+            self.assertEqual(parse.call_count, 0)
+            self.assertEqual(sorted(warm.slides), [5, 6])
+            self.assertEqual(warm.getSlideTitle(6), 'from name')
+            self.assertEqual(warm.getSlideContents(5), ['\n# header slide'])
+
+            with open(os.path.join(slideFolder, 'header.md'), 'w') as file:
+                file.write('---\ntitle: new title\nid: 7\n---\n# changed')
+            os.remove(os.path.join(slideFolder, 'chapter', '6_from name.md'))
+            changed = Slides()
+            changed.catalog(slideFolder, manifest=manifest)
+            self.assertEqual(parse.call_count, 1)
+            self.assertEqual(parse.call_args[0][0], [os.path.join(slideFolder, 'header.md')])
+            self.assertEqual(sorted(changed.slides), [7])
+
+        for text in ('[]', '{"format": 1}'):
+            with open(manifest, 'w') as file:
+                file.write(text)
+            ignored = Slides()
+            ignored.catalog(slideFolder, manifest=manifest)
+            self.assertEqual(sorted(ignored.slides), [7])
+
+    def test_header(self):
+        texts = ['no header', '---\ntitle: a\nid: 1\n---\nbody\n---\nnext ----- part', 'intro\n--- title: b\nid: 2 ---body',
+                 '---\ntitle: c\nid: 3\n', '----\n---', '---\ntitle: d\nid: 4\npart: x\n---\nbody', '']
+        for text in texts:
+            groups = re.split('---+', text)
+            header, offset = Slide.splitHeader(io.StringIO(text))
+            self.assertEqual(header, groups[1] if len(groups) > 1 else None)
+            self.assertEqual(Slide.splitHeader((text,)), (header, offset))
+            self.assertEqual(Slide.getBody(text), ''.join(groups[2:]) if len(groups) > 1 else text)
+
+            slideFile = os.path.join(self.folder, 'slide.md')
+            with open(slideFile, 'w') as file:
+                file.write(text)
+            slide = SlideGenerator().fromHeader(slideFile)
+            self.assertEqual(slide is not None, text.startswith(('---\ntitle: a', '---\ntitle: c', 'intro')))
+            if slide:
+                self.assertEqual(slide._getFileContent(), SlideGenerator().fromText(slideFile, text).body)
+
+        with mock.patch.object(Slide, '_marker', wraps=Slide._marker) as marker:
+            Slide.splitHeader(iter(['---\n', 'id: 1\n', '---\n', 'body\n']))
+            Slide.splitHeader(iter(['---\n', 'id: 1\n', '---\n']))
+            self.assertEqual(marker.finditer.call_count, 6)
+
+    def test_versions(self):
+        for version, part in ((1, 0), (1, 1), (3, 0), (0.5, 0)):
+            slide = Slide(9, 'slide 9 v{}'.format(version), part, version)
+            slide.setContent('# v{} part {}'.format(version, part))
+            self.slides.addSlide(slide)
+        self.slides.addSlide(Slide(20, 'slide 20', version=2))
+        self.assertEqual(self.slides.versions, [0, 0.5, 1.0, 2.0, 3.0])
+        self.assertEqual(self.slides.slideVersions[9], [0, 0.5, 1.0, 3.0])
+        expected = {0: 'slide 9', 0.7: 'slide 9 v0.5', 1: 'slide 9 v1', 2.5: 'slide 9 v1', 3: 'slide 9 v3', 7: 'slide 9 v3'}
+        for version, title in expected.items():
+            self.assertEqual(self.slides.getSlideTitle(9, version), title)
+        self.assertEqual(self.slides.getSlideTitle(20, 0), 'slide 20')
+        self.assertIsNone(self.slides.getSlide(99, 1))
+
+        resolved = self.slides.getSlides([9, 20, 99, 9], 1.5)
+        self.assertEqual(sorted(resolved), [9, 20, 99])
+        self.assertIsNone(resolved[99])
+        with mock.patch.object(Slides, 'getSlide') as getSlide:
+            self.assertEqual(self.slides.getSlideContents(9, 1.5, resolved), ['# v1 part 0', '# v1 part 1'])
+            self.assertEqual(self.slides.getSlideContents(99, 1.5, resolved), ['slide 99 is missing.'])
+            self.assertEqual(self.slides.getMarkdownLinks({9: 1, 20: 2}, 1.5, resolved), ['  \n', '[slide 9 v1](#/1)', '[slide 20](#/2)'])
+            self.assertEqual(getSlide.call_count, 0)
+
+    def test_htmlWriter(self):
+        plain = Presentation().writePresentation('plain.html', self.slides, [1, 2], self.folder)
+        self.assertEqual(plain, os.path.join(self.folder, 'plain.html'))
+        text = self._read('plain.html')
+        self.assertTrue(text.startswith('<!doctype html>'))
+        self.assertIn('<section data-markdown>\n<textarea data-template># content 2\n</textarea>\n</section>', text)
+
+        compressed = Presentation(writer=HtmlWriter(compress=True)).writePresentation('plain.html', self.slides, [1, 2], self.folder)
+        self.assertEqual(compressed, plain + '.gz')
+        with gzip.open(compressed, 'rt') as file:
+            self.assertEqual(file.read(), text)
+
+        Presentation(writer=HtmlWriter(minify=True)).writePresentation('minified.html', self.slides, [1, 2], self.folder)
+        minified = self._read('minified.html')
+        self.assertLess(len(minified), len(text))
+        self.assertNotIn('<!-- Theme', minified)
+        self.assertIn('<!--[if lt IE 9]>', minified)
+        self.assertIn('<textarea data-template># content 1\n</textarea>', minified)
+
+        def failing():
+            yield '<section>'
+            raise RuntimeError('rendering failed')
+        with self.assertRaises(RuntimeError):
+            HtmlWriter().write(plain, failing(), (plain, plain))
+        self.assertEqual(self._read('plain.html'), text)
+        self.assertEqual(sorted(os.listdir(self.folder)), ['minified.html', 'plain.html', 'plain.html.gz'])
@@ -1,9 +1,14 @@
 import unittest
+from unittest import mock
 import os.path as path
+import shutil, tempfile
+from xml.etree import ElementTree
 from pandas import read_csv, DataFrame
 
 from pycroaktools.workflow import Workflow
 from pycroaktools.workflow import Step
+from pycroaktools.workflow import Flowchart
+from pycroaktools.workflow.graph import Graph
 
 
 class TestWorkflow(unittest.TestCase):
@@ -47,4 +52,247 @@ class TestWorkflow(unittest.TestCase):
             self.assertEqual(len(set(nextSteps) & set(nexts[step.stepId])), len(nexts[step.stepId]))
             self.assertEqual(len(set(previousSteps) & set(previouses[step.stepId])), len(previouses[step.stepId]))
 
-    
\ No newline at end of file
+    
+    def test_iterPaths(self):
+        data = read_csv(path.join(self.test_folder, 'workflow.csv'))
+        workflow = Workflow(data, 'myWorkflow')
+        paths = [[step.stepId for step in steps] for steps in workflow.iterPaths()]
+        self.assertEqual(paths, [[1, 2, 4], [1, 3, 12], [9, 12], [9, 4]])
+        self.assertEqual(workflow.countPaths(), 4)
+        ascendings = [[step.stepId for step in steps] for steps in workflow.getAscendings(workflow.steps[4])]
+        self.assertEqual(ascendings, [[4, 2, 1], [4, 9]])
+        descendings = [[step.stepId for step in steps] for steps in workflow.getDescending([workflow.steps[3]])]
+        self.assertEqual(descendings, [[3, 12]])
+
+    def test_countPaths(self):
+        levels = 40
+        stepId = [1] + [step for level in range(1, levels + 1) for step in (2 * level, 2 * level + 1)]
+        following = ['{}-{}'.format(2 * level + 2, 2 * level + 3) if level < levels else '' for level in range(1, levels + 1)]
+        nexts = ['2-3'] + [value for value in following for _ in range(2)]
+        workflow = Workflow(DataFrame({'stepId': stepId, 'nexts': nexts}), 'ladder')
+        self.assertEqual(workflow.countPaths(), 2 ** levels)
+        first = next(workflow.iterPaths())
+        self.assertEqual([step.stepId for step in first], [1] + [2 * level for level in range(1, levels + 1)])
+
+    def test_graph(self):
+        graph = Graph([1, 2, 3], ['a', 'b', 'c'], [0, 0, 2, 0], [2, 1, 1, 2])
+        self.assertEqual(graph.successors(0), [2, 1])
+        self.assertEqual(graph.predecessors(1), [0, 2])
+        graph.addNode(4, 'd')
+        self.assertTrue(graph.addEdge(3, 0))
+        self.assertFalse(graph.addEdge(0, 1))
+        graph.addEdge(1, 3)
+        before = [(graph.successors(index), graph.predecessors(index)) for index in range(len(graph))]
+        graph.compact()
+        self.assertEqual([(graph.successors(index), graph.predecessors(index)) for index in range(len(graph))], before)
+        self.assertEqual([array.tolist() for array in graph.edges()], [[0, 0, 1, 2, 3], [2, 1, 3, 1, 0]])
+
+        step = Step.view(graph, 0)
+        self.assertEqual(step, Step.view(graph, 0))
+        self.assertEqual(list(step.nexts), [3, 2])
+        self.assertEqual(step.previouses[4].title, 'd')
+        self.assertIs(step, Step.view(graph, 0))
+
+        first, second, third, fourth = Step(1), Step(2), Step(3), Step(4)
+        second.addNext(third)
+        first.addNext(second)
+        fourth.nexts[1] = first
+        self.assertIs(first.graph, third.graph)
+        self.assertIs(fourth.graph, third.graph)
+        self.assertEqual([step.stepId for step in third.getPreviouses()], [2])
+        self.assertIs(third.previouses[2].previouses[1].previouses[4], fourth)
+        del third.previouses[2]
+        self.assertEqual(second.nexts, {})
+        self.assertTrue(third.isFirst())
+        with self.assertRaises(ValueError):
+            first.addNext(Step(2))
+
+        workflow = Workflow(DataFrame({'stepId': [1, 2], 'nexts': ['2', None]}))
+        Step(99).addNext(workflow.steps[1])
+        workflow.steps[2].addNext(Step(100))
+        self.assertEqual([step.stepId for step in workflow.getSteps()], [1, 2, 99, 100])
+        self.assertEqual([step.stepId for step in workflow.firstSteps], [99])
+        self.assertEqual([[step.stepId for step in path] for path in workflow.getAllPaths()], [[99, 1, 2, 100]])
+        other = Workflow(DataFrame({'stepId': [5], 'nexts': [None]}))
+        with self.assertRaises(ValueError):
+            other.steps[5].addNext(workflow.steps[1])
+
+    def test_definitionErrors(self):
+        data = DataFrame({'stepId': ['1', 'x', '3', '3'], 'title': ['one', 'two', None, 'three'], 'nexts': ['3-y', '1', '99-1', '']})
+        with mock.patch('pycroaktools.workflow.workflow.error', side_effect=SystemExit) as error:
+            with self.assertRaises(SystemExit):
+                Workflow(data, 'wrong')
+        error.assert_called_once_with('\n'.join([
+            'Workflow definition error - step id x is not an integer',
+            'Workflow definition error - next value y is not an integer',
+            'Workflow definition error - step 3 points to step 99 but no definition for step 99']))
+
+        data = DataFrame({'stepId': [1, 3, 3, 4], 'title': ['one', None, 'three', ''], 'nexts': ['3-4', '1.0', None, '']})
+        workflow = Workflow(data, 'duplicates')
+        self.assertEqual([(step.stepId, step.title) for step in workflow.getSteps()], [(1, 'one'), (3, 'three'), (4, 'step 4')])
+        self.assertEqual(workflow.getLinksPerSteps(), {1: {3: 1, 4: 2}, 3: {1: 0}, 4: {}})
+
+    def test_analytics(self):
+        workflow = Workflow(read_csv(path.join(self.test_folder, 'workflow.csv')), 'myWorkflow')
+        steps = workflow.steps
+        self.assertEqual([step.stepId for step in workflow.getTopologicalOrder()], [1, 9, 2, 3, 4, 12])
+        self.assertEqual(workflow.getLevels(), {1: 0, 2: 1, 3: 1, 4: 2, 9: 0, 12: 2})
+        self.assertIsNone(workflow.findCycle())
+        self.assertEqual(len(workflow.getStronglyConnectedComponents()), 6)
+        self.assertTrue(workflow.isReachable(steps[1], steps[12]))
+        self.assertFalse(workflow.isReachable(steps[9], steps[2]))
+        self.assertFalse(workflow.isReachable(steps[2], steps[1]))
+        links = workflow.getLinksPerSteps(workflow.getTopologicalOrder())
+        self.assertEqual(links[9], {12: 5, 4: 4})
+
+        steps[4].addNext(steps[1])
+        self.assertEqual([step.stepId for step in workflow.findCycle()], [1, 2, 4, 1])
+        components = [sorted(step.stepId for step in component) for component in workflow.getStronglyConnectedComponents()]
+        self.assertIn([1, 2, 4], components)
+        self.assertTrue(workflow.isReachable(steps[2], steps[1]))
+        with self.assertRaises(ValueError):
+            workflow.getTopologicalOrder()
+        with self.assertRaises(ValueError):
+            workflow.countPaths()
+        with self.assertRaises(ValueError):
+            workflow.getAllPaths()
+
+    def test_pathCache(self):
+        workflow = Workflow(read_csv(path.join(self.test_folder, 'workflow.csv')), 'myWorkflow')
+        steps = workflow.steps
+        descendings = [[step.stepId for step in steps] for steps in workflow.getDescending(workflow.firstSteps)]
+        self.assertEqual(descendings, [[step.stepId for step in steps] for steps in workflow.iterPaths()])
+        stats = workflow.getPathCacheStats()
+        self.assertEqual((stats['hits'], stats['misses']), (0, 6))
+        workflow.getDescending([steps[1]])
+        workflow.getDescending([steps[2]])
+        self.assertEqual(workflow.getPathCacheStats()['hits'], 2)
+        first, second = workflow.pathCache.descending(steps[1].index)
+        self.assertIs(first[1], workflow.pathCache.descending(steps[2].index)[0])
+
+        steps[12].addNext(steps[4])
+        descendings = [[step.stepId for step in steps] for steps in workflow.getDescending([steps[3]])]
+        self.assertEqual(descendings, [[3, 12, 4]])
+        ascendings = [[step.stepId for step in steps] for steps in workflow.getAscendings(steps[4])]
+        self.assertEqual(ascendings, [[4, 2, 1], [4, 9], [4, 12, 3, 1], [4, 12, 9]])
+        self.assertEqual(workflow.getPathCacheStats()['invalidations'], 1)
+
+        workflow.pathCache.maxTails = 2
+        workflow.getDescending(workflow.firstSteps)
+        stats = workflow.getPathCacheStats()
+        self.assertLessEqual(stats['tails'], 2)
+        self.assertGreater(stats['evictions'], 0)
+        steps[4].addNext(steps[1])
+        with self.assertRaises(ValueError):
+            workflow.getDescending([steps[1]])
+
+    def test_mutations(self):
+        workflow = Workflow(read_csv(path.join(self.test_folder, 'workflow.csv')), 'myWorkflow')
+        steps = workflow.steps
+        ids = lambda steps: [step.stepId for step in steps]
+        self.assertEqual(ids(workflow.firstSteps), [1, 9])
+        self.assertEqual(ids(workflow.lastSteps), [4, 12])
+
+        step = workflow.addStep(20, 'new step')
+        self.assertEqual(ids(workflow.firstSteps), [1, 9, 20])
+        self.assertTrue(workflow.addEdge(steps[12], step))
+        self.assertFalse(workflow.addEdge(steps[12], step))
+        self.assertEqual(ids(workflow.firstSteps), [1, 9])
+        self.assertEqual(ids(workflow.lastSteps), [4, 20])
+        self.assertEqual(workflow.getLinks(steps[12]), {20: 6})
+        self.assertEqual(workflow.countPaths(), 4)
+        with self.assertRaises(ValueError):
+            workflow.addStep(1)
+
+        workflow.removeStep(steps[1])
+        self.assertEqual(ids(workflow.firstSteps), [9, 2, 3])
+        self.assertEqual(ids(workflow.getSteps()), [2, 3, 4, 9, 12, 20])
+        self.assertNotIn(1, steps)
+        self.assertEqual(len(steps), 6)
+        self.assertEqual(workflow.getLinks(steps[12]), {20: 5})
+        self.assertEqual(ids(workflow.getTopologicalOrder()), [2, 3, 9, 12, 4, 20])
+        self.assertEqual(workflow.getLevels()[20], 2)
+        self.assertEqual([ids(path) for path in workflow.getAllPaths()], [[9, 12, 20], [9, 4], [2, 4], [3, 12, 20]])
+        with self.assertRaises(ValueError):
+            workflow.removeStep(Step.view(workflow.graph, 0))
+
+        self.assertTrue(workflow.removeEdge(steps[9], steps[4]))
+        self.assertFalse(workflow.removeEdge(steps[9], steps[4]))
+        self.assertEqual(ids(workflow.lastSteps), [4, 20])
+        workflow.removeEdge(steps[12], steps[20])
+        self.assertEqual(ids(workflow.lastSteps), [4, 20, 12])
+        self.assertEqual(ids(workflow.firstSteps), [9, 2, 3, 20])
+        workflow.graph.compact()
+        self.assertEqual(ids(steps[12].getPreviouses()), [3, 9])
+        steps[20].addNext(steps[2])
+        self.assertEqual(ids(workflow.firstSteps), [3, 9, 20])
+        self.assertEqual(workflow.getLinks(steps[20]), {2: 0})
+        workflow.firstSteps = [steps[9]]
+        workflow.lastSteps = [steps[4]]
+        self.assertEqual(ids(workflow.firstSteps), [9])
+        self.assertEqual(ids(workflow.lastSteps), [4])
+        self.assertEqual([ids(path) for path in workflow.getAllPaths()], [[9, 12]])
+
+    def test_saveLoad(self):
+        workflow = Workflow(read_csv(path.join(self.test_folder, 'workflow.csv')), 'myWorkflow')
+        workflow.steps[3].title = 'étape 3'
+        folder = tempfile.mkdtemp()
+        file = path.join(folder, 'workflow.bin')
+        try:
+            workflow.save(file)
+            for mmap in (True, False):
+                loaded = Workflow.load(file, mmap)
+                self.assertEqual(loaded.name, 'myWorkflow')
+                self.assertEqual([(step.stepId, step.title) for step in loaded.getSteps()],
+                                 [(step.stepId, step.title) for step in workflow.getSteps()])
+                self.assertEqual(loaded.getLinksPerSteps(), workflow.getLinksPerSteps())
+                self.assertEqual([[step.stepId for step in path] for path in loaded.iterPaths()],
+                                 [[step.stepId for step in path] for path in workflow.iterPaths()])
+            self.assertEqual([step.stepId for step in loaded.steps[12].getPreviouses()], [3, 9])
+
+            step = loaded.addStep(20, 'new step')
+            loaded.addEdge(loaded.steps[4], step)
+            loaded.steps[1].title = 'first'
+            loaded.removeStep(loaded.steps[2])
+            loaded.save(file)
+            reloaded = Workflow.load(file)
+            self.assertEqual([(step.stepId, step.title) for step in reloaded.getSteps()],
+                             [(1, 'first'), (3, 'étape 3'), (4, 'step4'), (9, 'step9'), (12, 'step12'), (20, 'new step')])
+            self.assertEqual(reloaded.getLinksPerSteps(), loaded.getLinksPerSteps())
+            self.assertEqual([step.stepId for step in reloaded.firstSteps], [1, 9])
+
+            with open(file, 'wb') as out:
+                out.write(b'stepId,title,nexts\n')
+            with mock.patch('pycroaktools.workflow.workflow.error', side_effect=SystemExit):
+                with self.assertRaises(SystemExit):
+                    Workflow.load(file)
+        finally:
+            shutil.rmtree(folder)
+
+    def test_flowchart(self):
+        data = DataFrame({'stepId': [1, 2, 3, 4], 'title': ['start', 'same', 'same', 'end'], 'nexts': ['2-3-4', '4', '4', None]})
+        flowchart = Flowchart(Workflow(data, 'chart'))
+        self.assertEqual(sorted(flowchart.graph.nodes), [1, 2, 3, 4])
+        self.assertEqual(sorted(flowchart.graph.edges), [(1, 2), (1, 3), (1, 4), (2, 4), (3, 4)])
+        layout = flowchart.layout()
+        self.assertEqual({stepId: y for stepId, (_, y) in layout.items()}, {1: 0, 2: 1, 3: 1, 4: 2})
+        self.assertIs(flowchart.layout(), layout)
+
+        folder = tempfile.mkdtemp()
+        try:
+            flowchart.toSvg(path.join(folder, 'chart.svg'))
+            svg = ElementTree.parse(path.join(folder, 'chart.svg')).getroot()
+            self.assertEqual(len(svg.findall('{http://www.w3.org/2000/svg}g')), 4)
+            self.assertEqual(len(svg.findall('{http://www.w3.org/2000/svg}polyline')), 5)
+            flowchart.toDot(path.join(folder, 'chart.dot'))
+            with open(path.join(folder, 'chart.dot')) as file:
+                dot = file.read()
+            self.assertIn('"1" -> "4";', dot)
+            self.assertIn('{rank=same; "2"; "3";}', dot)
+        finally:
+            shutil.rmtree(folder)
+
+        workflow = Workflow(data, 'cycle')
+        workflow.steps[4].addNext(workflow.steps[1])
+        layout = Flowchart(workflow).layout()
+        self.assertEqual(layout[4][1], 2)